@@ -0,0 +1,206 @@
+"""
+Bitmask board state shared by the backtracking solvers.
+
+Every row, column and box keeps an occupancy mask where bit d-1 is set when
+digit d is placed in that unit. Assigning or clearing a cell updates three
+masks, and the candidates of a cell are the digits missing from the union of
+its row, column and box masks, so validity checks and domain sizes no longer
+rescan the board.
+
+Boards are N*N x N*N for a box order N of 2 to 5 (4x4 up to 25x25). The
+unit and peer tables, as tuples of flat cell indices, are built once per
+board size by geometry(); the module-level tables are those of the standard
+9x9 board.
+"""
+
+# Supported board sizes: order 2 (4x4) to order 5 (25x25)
+SIZES = (4, 9, 16, 25)
+
+# Largest size whose mask tables are built in full; larger sizes fill them lazily
+MAX_TABLE_SIZE = 9
+
+
+class LazyMaskTable(dict):
+    """Mask table computing each entry on first use, for sizes whose full table is too big."""
+
+    def __init__(self, compute):
+        super().__init__()
+        self.compute = compute
+
+    def __missing__(self, mask):
+        value = self[mask] = self.compute(mask)
+        return value
+
+
+class Geometry:
+    """Cell, unit and peer tables of one board size.
+
+    Cells are flat indices r * size + c. popcount[mask] and mask_digits[mask]
+    give the number of set bits and the digits (ascending) of a candidate mask.
+    """
+
+    def __init__(self, size):
+        if size not in SIZES:
+            raise ValueError(f"Unsupported board size: {size}. Supported sizes: {', '.join(map(str, SIZES))}")
+        order = round(size ** 0.5)
+        self.size = size
+        self.order = order
+        self.cells = size * size
+        self.all_digits = (1 << size) - 1
+
+        # Box index of every (row, col)
+        self.box_of = [[order * (r // order) + c // order for c in range(size)] for r in range(size)]
+        self.row_of = tuple(i // size for i in range(self.cells))
+        self.col_of = tuple(i % size for i in range(self.cells))
+        # Row units, then column units, then box units
+        self.units = tuple(
+            [tuple(r * size + c for c in range(size)) for r in range(size)] +
+            [tuple(r * size + c for r in range(size)) for c in range(size)] +
+            [tuple((br + i) * size + bc + j for i in range(order) for j in range(order))
+             for br in range(0, size, order) for bc in range(0, size, order)]
+        )
+        # The row, column and box unit of every cell, and the other cells sharing one of them
+        self.units_of = tuple(
+            (self.units[self.row_of[i]], self.units[size + self.col_of[i]],
+             self.units[2 * size + self.box_of[self.row_of[i]][self.col_of[i]]])
+            for i in range(self.cells)
+        )
+        self.peers = tuple(tuple(sorted(set().union(*self.units_of[i]) - {i})) for i in range(self.cells))
+
+        def digits(mask):
+            return [d + 1 for d in range(size) if mask >> d & 1]
+
+        if size <= MAX_TABLE_SIZE:
+            self.popcount = [bin(mask).count("1") for mask in range(1 << size)]
+            self.mask_digits = [digits(mask) for mask in range(1 << size)]
+        else:
+            self.popcount = LazyMaskTable(int.bit_count)
+            self.mask_digits = LazyMaskTable(digits)
+
+
+_GEOMETRIES = {}
+
+def geometry(size):
+    """
+    The Geometry of size x size boards, built on first use.
+
+    Raises:
+        ValueError: If size is not one of SIZES
+    """
+    geo = _GEOMETRIES.get(size)
+    if geo is None:
+        geo = _GEOMETRIES[size] = Geometry(size)
+    return geo
+
+# Tables of the standard 9x9 board
+STANDARD = geometry(9)
+ALL_DIGITS = STANDARD.all_digits
+BOX_OF = STANDARD.box_of
+ROW_OF = STANDARD.row_of
+COL_OF = STANDARD.col_of
+UNITS = STANDARD.units
+UNITS_OF = STANDARD.units_of
+PEERS = STANDARD.peers
+POPCOUNT = STANDARD.popcount
+MASK_DIGITS = STANDARD.mask_digits
+
+
+class BoardState:
+    """Occupancy masks and empty-cell counts for a board of any supported size.
+
+    The board passed in is used (and modified) in place, so the solver's
+    board_copy always reflects the current assignment.
+    """
+
+    def __init__(self, board):
+        geo = geometry(len(board))
+        self.board = board
+        self.size = size = geo.size
+        self.box_of = geo.box_of
+        self.all_digits = geo.all_digits
+        self.popcount = geo.popcount
+        self.mask_digits = geo.mask_digits
+        self.rows = [0] * size
+        self.cols = [0] * size
+        self.boxes = [0] * size
+        # Empty cells per unit, used by the degree heuristic
+        self.row_empty = [0] * size
+        self.col_empty = [0] * size
+        self.box_empty = [0] * size
+
+        for r in range(size):
+            for c in range(size):
+                b = self.box_of[r][c]
+                d = board[r][c]
+                if d:
+                    bit = 1 << (d - 1)
+                    self.rows[r] |= bit
+                    self.cols[c] |= bit
+                    self.boxes[b] |= bit
+                else:
+                    self.row_empty[r] += 1
+                    self.col_empty[c] += 1
+                    self.box_empty[b] += 1
+
+    def assign(self, r, c, d):
+        """Place digit d in the empty cell (r, c)."""
+        bit = 1 << (d - 1)
+        b = self.box_of[r][c]
+        self.board[r][c] = d
+        self.rows[r] |= bit
+        self.cols[c] |= bit
+        self.boxes[b] |= bit
+        self.row_empty[r] -= 1
+        self.col_empty[c] -= 1
+        self.box_empty[b] -= 1
+
+    def unassign(self, r, c):
+        """Clear the digit previously placed in (r, c) with assign()."""
+        bit = ~(1 << (self.board[r][c] - 1))
+        b = self.box_of[r][c]
+        self.board[r][c] = 0
+        self.rows[r] &= bit
+        self.cols[c] &= bit
+        self.boxes[b] &= bit
+        self.row_empty[r] += 1
+        self.col_empty[c] += 1
+        self.box_empty[b] += 1
+
+    def candidates(self, r, c):
+        """Bitmask of digits that can still be placed in (r, c)."""
+        return self.all_digits & ~(self.rows[r] | self.cols[c] | self.boxes[self.box_of[r][c]])
+
+    def is_valid(self, r, c, d):
+        """Check whether digit d conflicts with the row, column or box of (r, c)."""
+        return not (self.rows[r] | self.cols[c] | self.boxes[self.box_of[r][c]]) >> (d - 1) & 1
+
+    def domain(self, r, c):
+        """Legal digits for (r, c) in ascending order, or [] if the cell is filled."""
+        if self.board[r][c] != 0:
+            return []
+        return self.mask_digits[self.candidates(r, c)]
+
+    def domain_size(self, r, c):
+        """Number of legal digits for (r, c)."""
+        if self.board[r][c] != 0:
+            return 0
+        return self.popcount[self.candidates(r, c)]
+
+    def degree(self, r, c):
+        """Count the other empty cells in the row, column and box of the empty cell (r, c).
+
+        Box cells that also share the row or column are counted twice, which
+        matches the original scan-based count_constraints().
+        """
+        return (self.row_empty[r] + self.col_empty[c] + self.box_empty[self.box_of[r][c]]) - 3
+
+    def find_empty(self):
+        """First empty cell in row-major order, or None if the board is full."""
+        board = self.board
+        size = self.size
+        for i in range(size):
+            row = board[i]
+            for j in range(size):
+                if row[j] == 0:
+                    return (i, j)
+        return None
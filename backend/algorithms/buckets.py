@@ -0,0 +1,74 @@
+"""
+Bucket queue of empty cells by number of remaining values, for MRV selection.
+
+buckets[k] holds the flat indices of the queued cells with k values left.
+The solvers keep it up to date as they assign and undo: an assignment
+removes its cell and shifts every queued peer that loses the digit down a
+bucket, and undoing it shifts them back. Picking the most constrained cell
+then scans at most size + 1 buckets instead of recomputing the domain of
+every empty cell, and takes any cell of the first non-empty one rather
+than scanning it for a tie-break.
+"""
+
+
+class BucketQueue:
+    """Cells bucketed by remaining-value count; count[cell] is -1 for cells not queued."""
+
+    def __init__(self, size, counts):
+        """
+        Args:
+            size: Board size; counts range from 0 to size
+            counts: Remaining values of every cell by flat index, None for filled cells
+        """
+        self.buckets = [set() for _ in range(size + 1)]
+        self.count = [-1] * len(counts)
+        for cell, count in enumerate(counts):
+            if count is not None:
+                self.add(cell, count)
+
+    def add(self, cell, count):
+        self.count[cell] = count
+        self.buckets[count].add(cell)
+
+    def remove(self, cell):
+        self.buckets[self.count[cell]].remove(cell)
+        self.count[cell] = -1
+
+    def shift(self, cell, delta):
+        """Change the count of cell by delta if it is queued; filled cells are ignored."""
+        count = self.count[cell]
+        if count < 0:
+            return
+        self.buckets[count].remove(cell)
+        count += delta
+        self.count[cell] = count
+        self.buckets[count].add(cell)
+
+    def fewest(self, start=0):
+        """
+        The cells with the fewest remaining values, counting from start up.
+
+        Returns:
+            Tuple (count, cells) with the set of those cells (not a copy), or
+            None if no cell with start or more values is queued
+        """
+        buckets = self.buckets
+        for count in range(start, len(buckets)):
+            if buckets[count]:
+                return count, buckets[count]
+        return None
+
+    def pick(self, start=0):
+        """
+        Any one of the cells with the fewest remaining values, counting from start up.
+
+        Sets of cell indices iterate in an order fixed by their contents, so
+        the same queue always gives the same cell.
+
+        Returns:
+            Tuple (count, cell), or None if no cell with start or more values is queued
+        """
+        fewest = self.fewest(start)
+        if fewest is None:
+            return None
+        return fewest[0], next(iter(fewest[1]))
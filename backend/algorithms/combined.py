@@ -1,132 +1,86 @@
-import time
 from ..metrics import Metrics
+from .board_state import BoardState, geometry
+from .buckets import BucketQueue
+from .search import run_search
 
-def solve(board):
+def solve(board, budget=None, progress=None, level=None):
     """Combined MRV + Degree heuristic solver."""
     board_copy = [row[:] for row in board]
-    metrics = Metrics("Combined")
-    start_time = time.time()
+    metrics = Metrics("Combined", budget, progress, level)
+    metrics.set_board_size(len(board))
+    metrics.start_phase("setup")
+    state = BoardState(board_copy)
+    size = state.size
+    metrics.set_board_source(lambda: board_copy)
     
-    def get_domain(r, c):
-        """Get possible values for cell (r,c)."""
-        if board_copy[r][c] != 0:
-            return []
-        
-        domain = set(range(1, 10))
-        
-        # Remove values that appear in the same row
-        for j in range(9):
-            if board_copy[r][j] in domain:
-                domain.remove(board_copy[r][j])
-        
-        # Remove values that appear in the same column
-        for i in range(9):
-            if board_copy[i][c] in domain:
-                domain.remove(board_copy[i][c])
-        
-        # Remove values that appear in the same 3x3 box
-        box_row, box_col = 3 * (r // 3), 3 * (c // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if board_copy[i][j] in domain:
-                    domain.remove(board_copy[i][j])
-        
+    geo = geometry(size)
+    peers, row_of, col_of = geo.peers, geo.row_of, geo.col_of
+    
+    # Empty cells bucketed by domain size, kept up to date by apply() and undo()
+    queue = BucketQueue(size, [
+        state.domain_size(row_of[i], col_of[i]) if board_copy[row_of[i]][col_of[i]] == 0 else None
+        for i in range(geo.cells)
+    ])
+    
+    def get_domain(cell):
+        """Get possible values for the flat cell index cell."""
         metrics.count_check()
-        return list(domain)
+        return state.domain(row_of[cell], col_of[cell])
     
-    def count_constraints(r, c):
+    def count_constraints(cell):
         """Count the number of empty cells in same row, column, and box."""
-        count = 0
-        
-        # Count empty cells in the same row
-        for j in range(9):
-            if j != c and board_copy[r][j] == 0:
-                count += 1
-        
-        # Count empty cells in the same column
-        for i in range(9):
-            if i != r and board_copy[i][c] == 0:
-                count += 1
-        
-        # Count empty cells in the same 3x3 box
-        box_row, box_col = 3 * (r // 3), 3 * (c // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if (i != r or j != c) and board_copy[i][j] == 0:
-                    count += 1
-        
         metrics.count_check()
-        return count
+        return state.degree(row_of[cell], col_of[cell])
     
     def find_cell():
-        """Find the empty cell with MRV, breaking ties with degree."""
-        min_remaining = 10  # More than possible values
-        candidates = []
-        
-        # First pass: find cells with minimum remaining values
-        for i in range(9):
-            for j in range(9):
-                if board_copy[i][j] == 0:
-                    domain = get_domain(i, j)
-                    domain_size = len(domain)
-                    
-                    if domain_size == 0:
-                        return (i, j, [])  # No valid values, fail quickly
-                    
-                    if domain_size < min_remaining:
-                        min_remaining = domain_size
-                        candidates = [(i, j, domain)]
-                    elif domain_size == min_remaining:
-                        candidates.append((i, j, domain))
-        
-        if not candidates:
+        """
+        Find the empty cell with MRV, breaking ties with degree and then row-major order.
+        
+        The degree tie-break is the heuristic itself, so it looks at every tied
+        cell; a dead end (a cell without values) needs no choice and takes any.
+        """
+        fewest = queue.fewest()
+        if fewest is None:
             return None  # No empty cells
         
-        if len(candidates) == 1:
-            return candidates[0]  # No tie to break
-        
-        # Break ties using degree heuristic
-        max_degree = -1
-        best_candidate = None
+        domain_size, candidates = fewest
+        if domain_size == 0:
+            return next(iter(candidates)), []  # No valid values, fail quickly
         
-        for r, c, domain in candidates:
-            degree = count_constraints(r, c)
-            if degree > max_degree:
-                max_degree = degree
-                best_candidate = (r, c, domain)
+        if len(candidates) == 1:
+            best_candidate = next(iter(candidates))  # No tie to break
+        else:
+            # Break ties using degree heuristic
+            best_candidate = min(candidates, key=lambda cell: (-count_constraints(cell), cell))
         
-        return best_candidate
+        return best_candidate, get_domain(best_candidate)
     
-    def backtrack():
-        metrics.count_node()
-        # Find cell with combined heuristic
-        cell_info = find_cell()
-        
-        # If no empty cell found, we've solved the puzzle
-        if not cell_info:
-            return True
-        
-        row, col, domain = cell_info
-        
-        # If domain is empty, this branch is invalid
-        if not domain:
-            return False
-        
-        # Try each value in the domain
-        for num in domain:
-            board_copy[row][col] = num
-            metrics.count_assignment()
-            
-            if backtrack():
-                return True
-            
-            # If recursive call fails, backtrack
-            board_copy[row][col] = 0
-            metrics.count_backtrack()
-        
-        return False
+    def shift_peers(cell, num, delta):
+        """Move the empty peers of cell that have num as a candidate by delta buckets."""
+        bit = 1 << (num - 1)
+        count = queue.count
+        for peer in peers[cell]:
+            if count[peer] >= 0 and state.candidates(row_of[peer], col_of[peer]) & bit:
+                queue.shift(peer, delta)
+    
+    def choose():
+        # Find cell with combined heuristic; None once the puzzle is solved
+        # (an empty domain makes this branch a dead end)
+        return find_cell()
+    
+    def apply(cell, num):
+        queue.remove(cell)
+        shift_peers(cell, num, -1)
+        state.assign(row_of[cell], col_of[cell], num)
+        return True
+    
+    def undo(cell, num):
+        state.unassign(row_of[cell], col_of[cell])
+        shift_peers(cell, num, 1)
+        queue.add(cell, state.domain_size(row_of[cell], col_of[cell]))
     
-    result = backtrack()
-    metrics.set_time(time.time() - start_time)
+    metrics.start_phase("search")
+    result = run_search(metrics, size * size, choose, apply, undo)
+    metrics.finish()
     
     return board_copy, metrics.to_dict(), result
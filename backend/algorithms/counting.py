@@ -0,0 +1,65 @@
+"""
+Solution counting shared by the solvers that support count mode.
+
+A normal solve stops at the first solution. In count mode the search keeps
+going after each solution until max_solutions have been found or the search
+space is exhausted, so max_solutions=2 tells a unique puzzle (one solution,
+search exhausted) from an ambiguous one (stopped at the second) for the
+price of one solve plus the proof that no other branch succeeds.
+"""
+
+
+class SolutionCounter:
+    """Counts the solutions a search reaches and keeps the first one.
+
+    Without max_solutions the counter only tells the search to stop at the
+    first solution, leaving the solve exactly as it was. With max_solutions
+    it records the number found so far in the "solutions" metric, so the
+    count survives a search stopped by its budget.
+    """
+
+    def __init__(self, metrics, get_board, max_solutions=None):
+        """
+        Args:
+            metrics: The solver's Metrics
+            get_board: Callable returning the board of the solution just reached
+            max_solutions: Solutions after which the search stops, or None to
+                stop at the first one without counting
+
+        Raises:
+            ValueError: If max_solutions is not a positive integer
+        """
+        if max_solutions is not None and (not isinstance(max_solutions, int) or max_solutions < 1):
+            raise ValueError("max_solutions must be a positive integer.")
+        self.metrics = metrics
+        self.get_board = get_board
+        self.max_solutions = max_solutions
+        self.count = 0
+        self.first = None
+        if max_solutions is not None:
+            metrics.add_extra("solutions", 0)
+            metrics.add_extra("max_solutions", max_solutions)
+
+    def record(self):
+        """Count the solution just reached; returns True if the search should stop."""
+        self.count += 1
+        if self.max_solutions is None:
+            return True
+        if self.first is None:
+            self.first = [row[:] for row in self.get_board()]
+        self.metrics.add_extra("solutions", self.count)
+        return self.count >= self.max_solutions
+
+    def finish(self, board, result):
+        """
+        Settle the outcome of the search.
+
+        Returns:
+            Tuple (board, success): unchanged without max_solutions; in count
+            mode the first solution found and whether there was one
+        """
+        if self.max_solutions is None:
+            return board, result
+        if self.first is None:
+            return board, False
+        return self.first, True
@@ -1,253 +1,272 @@
-import time
+from array import array
 from ..metrics import Metrics
+from .board_state import geometry
+from .counting import SolutionCounter
+from .search import run_search
+
+# Exact cover layout for an n x n Sudoku (n = 9: 324 columns, 729 rows).
+# There are 4 constraints for each placement, n*n columns each:
+# 1. Each cell must contain exactly one number          (columns 0 .. n*n-1)
+# 2. Each row must contain each number exactly once     (columns n*n .. 2*n*n-1)
+# 3. Each column must contain each number exactly once  (columns 2*n*n .. 3*n*n-1)
+# 4. Each box must contain each number exactly once     (columns 3*n*n .. 4*n*n-1)
+# Matrix row (r * n + c) * n + d - 1 places digit d in cell (r, c).
+#
+# The root header follows the column headers, at index 4*n*n. The 4 nodes of
+# matrix row k are first + 4*k .. first + 4*k + 3, where first = 4*n*n + 1.
+
+def row_id(r, c, d, n=9):
+    """Matrix row placing digit d in cell (r, c) of an n x n board."""
+    return (r * n + c) * n + (d - 1)
+
+def row_columns(r, c, d, n=9):
+    """The 4 constraint columns covered by placing digit d in cell (r, c) of an n x n board."""
+    cells = n * n
+    order = geometry(n).order
+    return (
+        r * n + c,
+        cells + r * n + (d - 1),
+        2 * cells + c * n + (d - 1),
+        3 * cells + (r // order * order + c // order) * n + (d - 1)
+    )
+
+def build_template(n=9):
+    """
+    Build the full exact cover matrix of an n x n Sudoku as flat link arrays.
+
+    Returns:
+        Tuple (left, right, up, down, column, size) of array('i'); node k's
+        neighbours are left[k], right[k], up[k], down[k], column[k] is the
+        header of its column and size[c] counts the nodes in column c
+    """
+    header = 4 * n * n
+    first_node = header + 1
+    num_nodes = first_node + 4 * n * n * n
+    left = array('i', range(num_nodes))
+    right = array('i', range(num_nodes))
+    up = array('i', range(num_nodes))
+    down = array('i', range(num_nodes))
+    column = array('i', range(num_nodes))
+    size = array('i', [0] * first_node)
+
+    # Circular header list: root <-> column 0 <-> ... <-> last column <-> root
+    for c in range(first_node):
+        left[c] = c - 1 if c > 0 else header
+        right[c] = c + 1 if c < header else 0
+
+    for r in range(n):
+        for c in range(n):
+            for d in range(1, n + 1):
+                first = first_node + 4 * row_id(r, c, d, n)
+                for i, col in enumerate(row_columns(r, c, d, n)):
+                    node = first + i
+                    # Circular row list of the 4 nodes
+                    left[node] = first + (i - 1) % 4
+                    right[node] = first + (i + 1) % 4
+                    # Append to the bottom of the column
+                    column[node] = col
+                    up[node] = up[col]
+                    down[node] = col
+                    down[up[col]] = node
+                    up[col] = node
+                    size[col] += 1
+
+    return left, right, up, down, column, size
+
+# Templates by board size; every solve works on a copy of the mutable arrays.
+# The 9x9 one is built at import, the others on first use.
+TEMPLATES = {9: build_template(9)}
+
+def template(n):
+    """The link arrays of the n x n exact cover matrix, built on first use."""
+    if n not in TEMPLATES:
+        TEMPLATES[n] = build_template(n)
+    return TEMPLATES[n]
+
+def solve(board, budget=None, progress=None, level=None, max_solutions=None):
+    """
+    Dancing Links (Algorithm X) solver for Sudoku.
+
+    With max_solutions set the search runs in count mode (see SolutionCounter).
+    """
+    metrics = Metrics("DancingLinks", budget, progress, level)
+    metrics.set_board_size(len(board))
+    metrics.start_phase("setup")
 
-class DancingNode:
-    def __init__(self, column=None, row_id=None):
-        self.left = self
-        self.right = self
-        self.up = self
-        self.down = self
-        self.column = column
-        self.row_id = row_id
-
-class ColumnNode(DancingNode):
-    def __init__(self, name):
-        super().__init__(self)
-        self.name = name
-        self.size = 0
-
-def solve(board):
-    """Dancing Links (Algorithm X) solver for Sudoku."""
-    metrics = Metrics("DancingLinks")
-    start_time = time.time()
-    
     # Copy board to avoid modifying original
     board_copy = [row[:] for row in board]
-    
+
     # Encode the Sudoku as an exact cover problem
-    matrix, row_info = encode_exact_cover(board_copy)
-    
+    links, solution_rows = encode_exact_cover(board_copy)
+
+    def partial_board():
+        partial = [row[:] for row in board_copy]
+        decode_solution(partial, solution_rows)
+        return partial
+
+    if solution_rows is not None:
+        metrics.set_board_source(partial_board)
+    counter = SolutionCounter(metrics, partial_board, max_solutions)
+
     # Solve with Algorithm X using Dancing Links
-    solution_rows = algorithm_x(matrix, metrics)
-    
-    if solution_rows:
+    metrics.start_phase("search")
+    if solution_rows is not None and algorithm_x(links, metrics, solution_rows, counter.record):
         # Decode the solution back to a Sudoku board
-        decode_solution(board_copy, row_info, solution_rows)
+        metrics.start_phase("decode")
+        decode_solution(board_copy, solution_rows)
         result = True
     else:
         result = False
-    
-    metrics.set_time(time.time() - start_time)
+
+    board_copy, result = counter.finish(board_copy, result)
+    metrics.finish()
     return board_copy, metrics.to_dict(), result
 
 def encode_exact_cover(board):
     """
     Encode a Sudoku board as an exact cover problem.
-    Returns the sparse matrix and information about what each row represents.
+
+    Copies the prebuilt template links of the board's size and selects the
+    row of every given by covering its columns, instead of building a new matrix.
+
+    Returns:
+        Tuple (links, solution_rows) where links is (left, right, up, down, size, column)
+        and solution_rows lists the rows of the givens, or None if two givens conflict
     """
-    # There are 4 constraints for each cell:
-    # 1. Each cell must contain exactly one number
-    # 2. Each row must contain each number exactly once
-    # 3. Each column must contain each number exactly once
-    # 4. Each 3x3 box must contain each number exactly once
-    
-    # Create column headers
-    header = ColumnNode("header")
-    column_nodes = []
-    
-    # Cell constraints: 9x9 = 81 columns
-    for i in range(81):
-        column = ColumnNode(f"cell_r{i//9}c{i%9}")
-        column_nodes.append(column)
-        append_column(header, column)
-    
-    # Row constraints: 9 rows x 9 digits = 81 columns
-    for i in range(81):
-        column = ColumnNode(f"row_r{i//9}d{i%9+1}")
-        column_nodes.append(column)
-        append_column(header, column)
-    
-    # Column constraints: 9 columns x 9 digits = 81 columns
-    for i in range(81):
-        column = ColumnNode(f"col_c{i//9}d{i%9+1}")
-        column_nodes.append(column)
-        append_column(header, column)
-    
-    # Box constraints: 9 boxes x 9 digits = 81 columns
-    for i in range(81):
-        box_row, box_col = (i // 9) // 3, (i // 9) % 3
-        column = ColumnNode(f"box_b{box_row*3+box_col}d{i%9+1}")
-        column_nodes.append(column)
-        append_column(header, column)
-    
-    # Now create the rows - each row represents placing digit d in cell (r,c)
-    row_info = []  # Store information about what each row represents
-    
-    for r in range(9):
-        for c in range(9):
-            # If the cell is already filled, only create a row for that digit
-            if board[r][c] != 0:
-                d = board[r][c]
-                add_row(column_nodes, row_info, r, c, d)
-            else:
-                # Otherwise, create a row for each possible digit 1-9
-                for d in range(1, 10):
-                    add_row(column_nodes, row_info, r, c, d)
-    
-    return header, row_info
-
-def add_row(column_nodes, row_info, r, c, d):
-    """Add a row to the exact cover matrix for placing digit d in cell (r,c)."""
-    # Create a unique identifier for this row
-    row_id = len(row_info)
-    row_info.append((r, c, d))
-    
-    # Create 4 nodes for the constraints this placement satisfies
-    cell_node = DancingNode(column_nodes[r*9 + c], row_id)
-    row_node = DancingNode(column_nodes[81 + r*9 + (d-1)], row_id)
-    col_node = DancingNode(column_nodes[162 + c*9 + (d-1)], row_id)
-    box_node = DancingNode(column_nodes[243 + (r//3*3 + c//3)*9 + (d-1)], row_id)
-    
-    # Connect the 4 nodes horizontally
-    connect_horizontal(cell_node, row_node)
-    connect_horizontal(row_node, col_node)
-    connect_horizontal(col_node, box_node)
-    
-    # Add nodes to their respective columns
-    append_to_column(cell_node)
-    append_to_column(row_node)
-    append_to_column(col_node)
-    append_to_column(box_node)
-
-def connect_horizontal(left_node, right_node):
-    """Connect two nodes horizontally in the linked list."""
-    left_node.right = right_node
-    right_node.left = left_node
-
-def append_column(header, column):
-    """Add a column to the header row."""
-    column.right = header
-    column.left = header.left
-    header.left.right = column
-    header.left = column
-
-def append_to_column(node):
-    """Add a node to the bottom of its column."""
-    column = node.column
-    node.up = column.up
-    node.down = column
-    column.up.down = node
-    column.up = node
-    column.size += 1
-
-def cover_column(column):
+    n = len(board)
+    left, right, up, down, column, size = template(n)
+    # The column of a node never changes, so the template's array is shared
+    links = (array('i', left), array('i', right), array('i', up), array('i', down), array('i', size), column)
+    covered = bytearray(len(size) - 1)
+    solution_rows = []
+
+    for r in range(n):
+        for c in range(n):
+            d = board[r][c]
+            if d == 0:
+                continue
+            columns = row_columns(r, c, d, n)
+            # A covered column means an earlier given already satisfies this constraint
+            if any(covered[col] for col in columns):
+                return links, None
+            for col in columns:
+                covered[col] = 1
+                cover_column(links, col)
+            solution_rows.append(row_id(r, c, d, n))
+
+    return links, solution_rows
+
+def cover_column(links, col):
     """
     Remove a column from the header row and all rows that have a 1 in this column
     from other columns.
     """
-    column.right.left = column.left
-    column.left.right = column.right
-    
-    row = column.down
-    while row != column:
-        right = row.right
-        while right != row:
-            right.up.down = right.down
-            right.down.up = right.up
-            right.column.size -= 1
-            right = right.right
-        row = row.down
-
-def uncover_column(column):
+    left, right, up, down, size, column = links
+
+    right[left[col]] = right[col]
+    left[right[col]] = left[col]
+
+    row = down[col]
+    while row != col:
+        node = right[row]
+        while node != row:
+            up[down[node]] = up[node]
+            down[up[node]] = down[node]
+            size[column[node]] -= 1
+            node = right[node]
+        row = down[row]
+
+def uncover_column(links, col):
     """Undo a column cover operation."""
-    row = column.up
-    while row != column:
-        left = row.left
-        while left != row:
-            left.column.size += 1
-            left.up.down = left
-            left.down.up = left
-            left = left.left
-        row = row.up
-    
-    column.right.left = column
-    column.left.right = column
-
-def algorithm_x(header, metrics):
+    left, right, up, down, size, column = links
+
+    row = up[col]
+    while row != col:
+        node = left[row]
+        while node != row:
+            size[column[node]] += 1
+            up[down[node]] = node
+            down[up[node]] = node
+            node = left[node]
+        row = up[row]
+
+    right[left[col]] = col
+    left[right[col]] = col
+
+def algorithm_x(links, metrics, solution, found=None):
     """
     Solve the exact cover problem using Algorithm X with Dancing Links.
-    Returns a list of row IDs that form the solution.
+    Appends the row IDs of the solution to solution and returns True if one exists.
+
+    found, if given, is called at every solution and returns whether to stop
+    there; returning False makes the search backtrack and look for another.
     """
-    solution = []
-    
-    def search():
-        metrics.count_node()
-        
+    left, right, up, down, size, column = links
+    header = len(size) - 1
+    first_node = header + 1
+
+    def rows_of(col):
+        """Rows of the covered column col, walked lazily so each is read after the previous is undone."""
+        row = down[col]
+        while row != col:
+            yield row
+            row = down[row]
+
+    def choose():
         # If the header is empty, we've found a solution
-        if header.right == header:
-            return True
-        
-        # Choose column with smallest size (most constraints)
-        column = select_column()
-        
-        # Cover the chosen column
-        cover_column(column)
-        
-        # Try each row in this column
-        row = column.down
-        while row != column:
-            # Add this row to the solution
-            solution.append(row.row_id)
-            metrics.count_assignment()
-            
-            # Cover all columns in this row
-            right = row.right
-            while right != row:
-                cover_column(right.column)
-                right = right.right
-            
-            # Recursively search
-            if search():
-                return True
-            
-            # If this row didn't lead to a solution, backtrack
-            metrics.count_backtrack()
-            solution.pop()
-            
-            # Uncover columns in reverse order
-            left = row.left
-            while left != row:
-                uncover_column(left.column)
-                left = left.left
-            
-            row = row.down
-        
-        # Uncover the column for the next iteration
-        uncover_column(column)
-        return False
-    
+        if right[header] == header:
+            return None
+
+        # Choose column with smallest size (most constraints) and cover it
+        col = select_column()
+        cover_column(links, col)
+        return col, rows_of(col)
+
+    def apply(col, row):
+        # Add this row to the solution and cover all columns in this row
+        solution.append((row - first_node) // 4)
+        node = right[row]
+        while node != row:
+            cover_column(links, column[node])
+            node = right[node]
+        return True
+
+    def undo(col, row):
+        solution.pop()
+
+        # Uncover columns in reverse order
+        node = left[row]
+        while node != row:
+            uncover_column(links, column[node])
+            node = left[node]
+
     def select_column():
         """Select the column with the smallest size (most constrained)."""
-        min_size = float('inf')
+        min_size = len(column)
         chosen_column = None
-        
-        column = header.right
-        while column != header:
-            if column.size < min_size:
-                min_size = column.size
-                chosen_column = column
-            column = column.right
-        
+
+        col = right[header]
+        while col != header:
+            if size[col] < min_size:
+                min_size = size[col]
+                chosen_column = col
+                if min_size <= 1:
+                    break  # Cannot do better than a forced (or dead) column
+            col = right[col]
+
         return chosen_column
-    
-    search()
-    return solution
 
-def decode_solution(board, row_info, solution_rows):
+    # Every level covers at least one column, so the search is at most header deep
+    return run_search(metrics, header, choose, apply, undo,
+                      lambda col: uncover_column(links, col), found)
+
+def decode_solution(board, solution_rows):
     """
     Convert the solution rows back to a Sudoku board.
     Modifies the board in-place.
     """
-    for row_id in solution_rows:
-        r, c, d = row_info[row_id]
-        board[r][c] = d
+    n = len(board)
+    for row in solution_rows:
+        cell, digit = divmod(row, n)
+        r, c = divmod(cell, n)
+        board[r][c] = digit + 1
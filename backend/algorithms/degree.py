@@ -1,53 +1,25 @@
-import time
 from ..metrics import Metrics
+from .board_state import BoardState
+from .search import run_search
 
-def solve(board):
+def solve(board, budget=None, progress=None, level=None):
     """Degree heuristic solver - selects cells with most constraints."""
     board_copy = [row[:] for row in board]
-    metrics = Metrics("Degree")
-    start_time = time.time()
+    metrics = Metrics("Degree", budget, progress, level)
+    metrics.set_board_size(len(board))
+    metrics.start_phase("setup")
+    state = BoardState(board_copy)
+    size = state.size
+    metrics.set_board_source(lambda: board_copy)
     
     def count_constraints(r, c):
         """Count the number of empty cells in same row, column, and box."""
-        count = 0
-        
-        # Count empty cells in the same row
-        for j in range(9):
-            if j != c and board_copy[r][j] == 0:
-                count += 1
-        
-        # Count empty cells in the same column
-        for i in range(9):
-            if i != r and board_copy[i][c] == 0:
-                count += 1
-        
-        # Count empty cells in the same 3x3 box
-        box_row, box_col = 3 * (r // 3), 3 * (c // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if (i != r or j != c) and board_copy[i][j] == 0:
-                    count += 1
-        
         metrics.count_check()
-        return count
+        return state.degree(r, c)
     
     def is_valid(r, c, num):
-        # Check row
-        for j in range(9):
-            if board_copy[r][j] == num:
-                return False
-        
-        # Check column
-        for i in range(9):
-            if board_copy[i][c] == num:
-                return False
-        
-        # Check 3x3 box
-        box_row, box_col = 3 * (r // 3), 3 * (c // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if board_copy[i][j] == num:
-                    return False
+        if not state.is_valid(r, c, num):
+            return False
         
         metrics.count_check()
         return True
@@ -57,8 +29,8 @@ def solve(board):
         max_degree = -1
         degree_cell = None
         
-        for i in range(9):
-            for j in range(9):
+        for i in range(size):
+            for j in range(size):
                 if board_copy[i][j] == 0:
                     degree = count_constraints(i, j)
                     if degree > max_degree:
@@ -67,33 +39,28 @@ def solve(board):
         
         return degree_cell
     
-    def backtrack():
-        metrics.count_node()
-        # Find cell with highest degree
+    def valid_numbers(row, col):
+        """Numbers that fit (row, col), checked one at a time as the search asks for them."""
+        for num in range(1, size + 1):
+            if is_valid(row, col, num):
+                yield num
+    
+    def choose():
+        # Find cell with highest degree; None once the puzzle is solved
         cell = find_degree_cell()
-        
-        # If no empty cell found, we've solved the puzzle
         if not cell:
-            return True
-        
-        row, col = cell
-        
-        # Try each number
-        for num in range(1, 10):
-            if is_valid(row, col, num):
-                board_copy[row][col] = num
-                metrics.count_assignment()
-                
-                if backtrack():
-                    return True
-                
-                # If recursive call fails, backtrack
-                board_copy[row][col] = 0
-                metrics.count_backtrack()
-        
-        return False
+            return None
+        return cell, valid_numbers(*cell)
+    
+    def apply(cell, num):
+        state.assign(cell[0], cell[1], num)
+        return True
+    
+    def undo(cell, num):
+        state.unassign(cell[0], cell[1])
     
-    result = backtrack()
-    metrics.set_time(time.time() - start_time)
+    metrics.start_phase("search")
+    result = run_search(metrics, size * size, choose, apply, undo)
+    metrics.finish()
     
     return board_copy, metrics.to_dict(), result
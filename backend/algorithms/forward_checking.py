@@ -1,107 +1,110 @@
-import time
+from ..metrics import Metrics
+from .board_state import geometry
+from .buckets import BucketQueue
+from .search import run_search
 
-def solve(board):
+def solve(board, budget=None, progress=None, level=None):
     """Forward Checking solver for Sudoku."""
     board_copy = [row[:] for row in board]
-    start_time = time.time()
+    metrics = Metrics("ForwardChecking", budget, progress, level)
+    metrics.set_board_size(len(board))
+    metrics.set_board_source(lambda: board_copy)
+    metrics.start_phase("setup")
     
-    # Initialize domains for all cells
-    domains = {}
-    for i in range(9):
-        for j in range(9):
+    geo = geometry(len(board_copy))
+    size, peers, row_of, col_of = geo.size, geo.peers, geo.row_of, geo.col_of
+    
+    # Initialize domains for all cells, indexed by flat cell index r * size + c
+    domains = []
+    for i in range(size):
+        for j in range(size):
             if board_copy[i][j] == 0:
-                domains[(i, j)] = set(range(1, 10))
+                domains.append(set(range(1, size + 1)))
             else:
-                domains[(i, j)] = {board_copy[i][j]}
+                domains.append({board_copy[i][j]})
+    
+    # Undo trail of (cell, value) domain removals; backtracking pops it back to a saved length
+    trail = []
+    max_trail_length = 0
     
-    def get_related_cells(r, c):
-        """Get all cells in the same row, column, and box."""
-        related = set()
-        # Add cells in the same row
-        for j in range(9):
-            if j != c:
-                related.add((r, j))
-        # Add cells in the same column
-        for i in range(9):
-            if i != r:
-                related.add((i, c))
-        # Add cells in the same 3x3 box
-        box_row, box_col = 3 * (r // 3), 3 * (c // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if i != r or j != c:
-                    related.add((i, j))
-        return related
+    # Empty cells bucketed by domain size; every domain change below shifts its cell
+    queue = BucketQueue(size, [len(domains[i]) if board_copy[row_of[i]][col_of[i]] == 0 else None
+                               for i in range(geo.cells)])
     
-    def update_domains(doms, r, c, val):
+    def update_domains(doms, cell, val):
         """Remove value from domains of related cells. Return False if domain wipeout occurs."""
-        for cell in get_related_cells(r, c):
-            if cell in doms and val in doms[cell]:
-                doms[cell].remove(val)
-                if len(doms[cell]) == 0:
+        for peer in peers[cell]:
+            if val in doms[peer]:
+                doms[peer].remove(val)
+                trail.append((peer, val))
+                queue.shift(peer, -1)
+                metrics.count_prune()
+                if len(doms[peer]) == 0:
                     return False  # Domain wipeout
         return True
     
+    def restore(doms, mark):
+        """Restore every domain removal recorded after the trail had length mark."""
+        while len(trail) > mark:
+            cell, val = trail.pop()
+            doms[cell].add(val)
+            queue.shift(cell, 1)
+    
     # Initial domain update based on filled cells
-    for i in range(9):
-        for j in range(9):
-            if board_copy[i][j] != 0:
-                if not update_domains(domains, i, j, board_copy[i][j]):
-                    return board_copy, {"algorithm": "ForwardChecking", "time": 0, "nodes": 0, "assignments": 0, "backtracks": 0, "prunes": 0}, False
+    metrics.start_phase("propagation")
+    for cell in range(geo.cells):
+        metrics.tick()
+        val = board_copy[row_of[cell]][col_of[cell]]
+        if val != 0:
+            if not update_domains(domains, cell, val):
+                metrics.finish()
+                return board_copy, metrics.to_dict(), False
+    
+    # The initial removals are never undone, so they need not stay on the trail
+    trail.clear()
+    
+    def select_cell():
+        """Select an empty cell with minimum remaining values (MRV heuristic), skipping wiped-out ones."""
+        fewest = queue.pick(1)
+        return None if fewest is None else fewest[1]
     
-    def select_cell(doms):
-        """Select empty cell with minimum remaining values (MRV heuristic)."""
-        min_remaining = 10
-        mrv_cell = None
-        for i in range(9):
-            for j in range(9):
-                if board_copy[i][j] == 0:
-                    cell = (i, j)
-                    domain_size = len(doms[cell])
-                    if domain_size > 0 and domain_size < min_remaining:
-                        min_remaining = domain_size
-                        mrv_cell = cell
-        return mrv_cell
+    # Trail length before each assignment on the current search path
+    marks = []
     
-    def backtrack(doms):
-        """Recursive backtracking with forward checking."""
+    def choose():
         # Check if board is complete
-        cell = select_cell(doms)
-        if not cell:
-            # Verify if board is actually solved
-            for i in range(9):
-                for j in range(9):
-                    if board_copy[i][j] == 0:
-                        return False
-            return True
-        
-        row, col = cell
-        domain_copy = list(doms[cell])  # Copy current domain to try values
+        cell = select_cell()
+        if cell is None:
+            # Verify if board is actually solved; an empty cell left means a dead end
+            return None if queue.fewest() is None else (None, ())
+        return cell, list(domains[cell])  # Copy current domain to try values
+    
+    def apply(cell, num):
+        nonlocal max_trail_length
+        marks.append(len(trail))
+        board_copy[row_of[cell]][col_of[cell]] = num
+        queue.remove(cell)
         
-        for num in domain_copy:
-            domains_backup = {k: v.copy() for k, v in doms.items()}  # Backup domains for backtracking
-            board_copy[row][col] = num
-            doms[cell] = {num}
-            
-            if update_domains(doms, row, col, num):
-                if backtrack(doms):
-                    return True
-            
-            # Backtrack if solution not found
-            board_copy[row][col] = 0
-            doms.update(domains_backup)
+        # Narrow the cell's own domain to num
+        for other in list(domains[cell]):
+            if other != num:
+                domains[cell].remove(other)
+                trail.append((cell, other))
         
-        return False
+        if not update_domains(domains, cell, num):
+            return False
+        max_trail_length = max(max_trail_length, len(trail))
+        return True
+    
+    def undo(cell, num):
+        board_copy[row_of[cell]][col_of[cell]] = 0
+        restore(domains, marks.pop())
+        queue.add(cell, len(domains[cell]))
     
-    result = backtrack(domains)
-    time_taken = time.time() - start_time
+    metrics.start_phase("search")
+    result = run_search(metrics, geo.cells, choose, apply, undo)
+    metrics.add_extra("max_trail_length", max_trail_length)
+    metrics.finish()
     
     # Return in the format expected by solver.py
-    return board_copy, {
-        "algorithm": "ForwardChecking",
-        "time": time_taken,
-        "nodes": 0,
-        "assignments": 0,
-        "backtracks": 0,
-        "prunes": 0
-    }, result
+    return board_copy, metrics.to_dict(), result
@@ -1,63 +1,58 @@
-import time
 from collections import deque
 from ..metrics import Metrics
+from .board_state import geometry
+from .counting import SolutionCounter
+from .search import run_search
 
-def solve(board):
-    """Maintaining Arc Consistency (MAC) solver."""
+def solve(board, budget=None, progress=None, level=None, max_solutions=None):
+    """
+    Maintaining Arc Consistency (MAC) solver.
+    
+    With max_solutions set the search runs in count mode (see SolutionCounter).
+    """
     board_copy = [row[:] for row in board]
-    metrics = Metrics("MAC")
-    start_time = time.time()
+    metrics = Metrics("MAC", budget, progress, level)
+    metrics.set_board_size(len(board))
+    metrics.set_board_source(lambda: board_copy)
+    counter = SolutionCounter(metrics, lambda: board_copy, max_solutions)
+    # Budget checks inside the AC-3 loop, which can run long between nodes (None without a budget)
+    tick = metrics.tick if budget is not None else None
+    metrics.start_phase("setup")
+    
+    geo = geometry(len(board_copy))
+    size, peers, row_of, col_of = geo.size, geo.peers, geo.row_of, geo.col_of
     
-    # Initialize domains for all cells
-    domains = {}
-    for i in range(9):
-        for j in range(9):
+    # Initialize domains for all cells, indexed by flat cell index r * size + c
+    domains = []
+    for i in range(size):
+        for j in range(size):
             if board_copy[i][j] == 0:
-                domains[(i, j)] = set(range(1, 10))
+                domains.append(set(range(1, size + 1)))
             else:
-                domains[(i, j)] = {board_copy[i][j]}
+                domains.append({board_copy[i][j]})
     
-    def get_related_cells(r, c):
-        """Get all cells that share a constraint with (r,c)."""
-        related = set()
-        
-        # Add cells in the same row
-        for j in range(9):
-            if j != c:
-                related.add((r, j))
-        
-        # Add cells in the same column
-        for i in range(9):
-            if i != r:
-                related.add((i, c))
-        
-        # Add cells in the same 3x3 box
-        box_row, box_col = 3 * (r // 3), 3 * (c // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if i != r or j != c:
-                    related.add((i, j))
-        
-        return related
+    # Undo trail of (cell, value) domain removals; backtracking pops it back to a saved length
+    trail = []
+    max_trail_length = 0
     
     def establish_arc_consistency(doms, start_cell):
         """AC-3 algorithm to establish arc consistency."""
-        # Queue of arcs (i,j) where i and j are cells
+        # Queue of arcs (xi, xj): revise the domain of xi against xj
         queue = deque()
         
-        # Add arcs from start_cell to its neighbors
-        if start_cell:
-            for neighbor in get_related_cells(*start_cell):
-                queue.append((start_cell, neighbor))
+        # Add arcs from the neighbors of start_cell to start_cell
+        if start_cell is not None:
+            for neighbor in peers[start_cell]:
+                queue.append((neighbor, start_cell))
         else:
             # Initialize with all arcs for first run
-            for i in range(9):
-                for j in range(9):
-                    cell = (i, j)
-                    for neighbor in get_related_cells(i, j):
-                        queue.append((cell, neighbor))
+            for cell in range(geo.cells):
+                for neighbor in peers[cell]:
+                    queue.append((cell, neighbor))
         
         while queue:
+            if tick:
+                tick()
             (xi, xj) = queue.popleft()
             
             if revise(doms, xi, xj):
@@ -65,7 +60,7 @@ def solve(board):
                     return False  # Domain wipeout
                 
                 # Add neighbors of xi back to queue
-                for xk in get_related_cells(*xi):
+                for xk in peers[xi]:
                     if xk != xj:  # Avoid redundant check
                         queue.append((xk, xi))
         
@@ -80,64 +75,86 @@ def solve(board):
             xj_value = next(iter(doms[xj]))
             if xj_value in doms[xi]:
                 doms[xi].remove(xj_value)
+                trail.append((xi, xj_value))
                 metrics.count_prune()
                 revised = True
         
         return revised
     
+    def restore(doms, mark):
+        """Restore every domain removal recorded after the trail had length mark."""
+        while len(trail) > mark:
+            cell, val = trail.pop()
+            doms[cell].add(val)
+    
     def select_cell(doms):
         """Find the empty cell with the fewest legal values (MRV)."""
-        min_remaining = 10  # More than possible values
+        min_remaining = size + 1  # More than possible values
         mrv_cell = None
         
-        for cell, domain in doms.items():
-            if board_copy[cell[0]][cell[1]] == 0 and 1 < len(domain) < min_remaining:
+        for cell, domain in enumerate(doms):
+            if board_copy[row_of[cell]][col_of[cell]] == 0 and 1 < len(domain) < min_remaining:
                 min_remaining = len(domain)
                 mrv_cell = cell
         
         return mrv_cell
     
     # Initial arc consistency
+    metrics.start_phase("propagation")
     if not establish_arc_consistency(domains, None):
-        metrics.set_time(time.time() - start_time)
+        metrics.finish()
         return board_copy, metrics.to_dict(), False
     
-    def backtrack(doms):
-        metrics.count_node()
-        # Find cell with minimum remaining values
-        cell = select_cell(doms)
-        
-        # If no empty cell found, we've solved the puzzle
-        if not cell:
+    # The initial removals are never undone, so they need not stay on the trail
+    trail.clear()
+    
+    # Trail length before each assignment on the current search path
+    marks = []
+    
+    def choose():
+        # Find cell with minimum remaining values; None once no cell has a choice left
+        cell = select_cell(domains)
+        if cell is None:
+            return None
+        return cell, list(domains[cell])
+    
+    def found():
+        # Every empty cell is down to one arc-consistent value, so write those values to the board
+        filled = [i for i in range(geo.cells) if board_copy[row_of[i]][col_of[i]] == 0]
+        for i in filled:
+            board_copy[row_of[i]][col_of[i]] = next(iter(domains[i]))
+        if counter.record():
             return True
+        # Count mode: clear the filled cells and look for the next solution
+        for i in filled:
+            board_copy[row_of[i]][col_of[i]] = 0
+        return False
+    
+    def apply(cell, num):
+        nonlocal max_trail_length
+        marks.append(len(trail))
         
-        row, col = cell
-        domain_copy = doms[cell].copy()
-        
-        # Try each value in the domain
-        for num in domain_copy:
-            # Save domains for backtracking
-            domains_backup = {k: v.copy() for k, v in doms.items()}
-            
-            # Assign value
-            board_copy[row][col] = num
-            metrics.count_assignment()
-            doms[cell] = {num}
-            
-            # Establish arc consistency
-            if establish_arc_consistency(doms, cell):
-                # Recurse
-                if backtrack(doms):
-                    return True
-            
-            # If consistency fails or recursive call fails, backtrack
-            board_copy[row][col] = 0
-            doms.update(domains_backup)
-            metrics.count_backtrack()
+        # Assign value
+        board_copy[row_of[cell]][col_of[cell]] = num
+        for other in list(domains[cell]):
+            if other != num:
+                domains[cell].remove(other)
+                trail.append((cell, other))
         
-        return False
+        # Establish arc consistency
+        if not establish_arc_consistency(domains, cell):
+            return False
+        max_trail_length = max(max_trail_length, len(trail))
+        return True
+    
+    def undo(cell, num):
+        board_copy[row_of[cell]][col_of[cell]] = 0
+        restore(domains, marks.pop())
     
-    result = backtrack(domains)
-    metrics.set_time(time.time() - start_time)
+    metrics.start_phase("search")
+    result = run_search(metrics, geo.cells, choose, apply, undo, found=found)
+    board_copy, result = counter.finish(board_copy, result)
+    metrics.add_extra("max_trail_length", max_trail_length)
+    metrics.finish()
     
     return board_copy, metrics.to_dict(), result
@@ -1,86 +1,73 @@
-import time
 from ..metrics import Metrics
+from .board_state import BoardState, geometry
+from .buckets import BucketQueue
+from .counting import SolutionCounter
+from .search import run_search
 
-def solve(board):
-    """Minimum Remaining Values heuristic solver."""
+def solve(board, budget=None, progress=None, level=None, max_solutions=None):
+    """
+    Minimum Remaining Values heuristic solver.
+    
+    With max_solutions set the search runs in count mode (see SolutionCounter).
+    """
     board_copy = [row[:] for row in board]
-    metrics = Metrics("MRV")
-    start_time = time.time()
+    metrics = Metrics("MRV", budget, progress, level)
+    metrics.set_board_size(len(board))
+    metrics.start_phase("setup")
+    state = BoardState(board_copy)
+    size = state.size
+    metrics.set_board_source(lambda: board_copy)
+    counter = SolutionCounter(metrics, lambda: board_copy, max_solutions)
+    
+    geo = geometry(size)
+    peers, row_of, col_of = geo.peers, geo.row_of, geo.col_of
+    
+    # Empty cells bucketed by domain size, kept up to date by apply() and undo()
+    queue = BucketQueue(size, [
+        state.domain_size(row_of[i], col_of[i]) if board_copy[row_of[i]][col_of[i]] == 0 else None
+        for i in range(geo.cells)
+    ])
     
-    def get_domain(r, c):
-        """Get possible values for cell (r,c)."""
-        if board_copy[r][c] != 0:
-            return []
-        
-        domain = set(range(1, 10))
-        
-        # Remove values that appear in the same row
-        for j in range(9):
-            if board_copy[r][j] in domain:
-                domain.remove(board_copy[r][j])
-        
-        # Remove values that appear in the same column
-        for i in range(9):
-            if board_copy[i][c] in domain:
-                domain.remove(board_copy[i][c])
-        
-        # Remove values that appear in the same 3x3 box
-        box_row, box_col = 3 * (r // 3), 3 * (c // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if board_copy[i][j] in domain:
-                    domain.remove(board_copy[i][j])
-        
+    def get_domain(cell):
+        """Get possible values for the flat cell index cell."""
         metrics.count_check()
-        return list(domain)
+        return state.domain(row_of[cell], col_of[cell])
     
     def find_mrv_cell():
-        """Find the empty cell with the fewest legal values (MRV)."""
-        min_remaining = 10  # More than possible values
-        mrv_cell = None
-        
-        for i in range(9):
-            for j in range(9):
-                if board_copy[i][j] == 0:
-                    domain = get_domain(i, j)
-                    if len(domain) < min_remaining:
-                        min_remaining = len(domain)
-                        mrv_cell = (i, j, domain)
-                        if min_remaining == 0:
-                            return mrv_cell  # No valid values, fail quickly
-        
-        return mrv_cell
+        """Find an empty cell with the fewest legal values (MRV); ties go to whichever the queue picks."""
+        fewest = queue.pick()
+        if fewest is None:
+            return None
+        cell = fewest[1]
+        return cell, get_domain(cell)
+    
+    def shift_peers(cell, num, delta):
+        """Move the empty peers of cell that have num as a candidate by delta buckets."""
+        bit = 1 << (num - 1)
+        count = queue.count
+        for peer in peers[cell]:
+            if count[peer] >= 0 and state.candidates(row_of[peer], col_of[peer]) & bit:
+                queue.shift(peer, delta)
+    
+    def choose():
+        # Find cell with minimum remaining values; None once the puzzle is solved
+        # (an empty domain makes this branch a dead end)
+        return find_mrv_cell()
+    
+    def apply(cell, num):
+        queue.remove(cell)
+        shift_peers(cell, num, -1)
+        state.assign(row_of[cell], col_of[cell], num)
+        return True
     
-    def backtrack():
-        metrics.count_node()
-        # Find cell with minimum remaining values
-        mrv_result = find_mrv_cell()
-        
-        # If no empty cell found, we've solved the puzzle
-        if not mrv_result:
-            return True
-        
-        row, col, domain = mrv_result
-        
-        # If domain is empty, this branch is invalid
-        if not domain:
-            return False
-        
-        # Try each value in the domain
-        for num in domain:
-            board_copy[row][col] = num
-            metrics.count_assignment()
-            
-            if backtrack():
-                return True
-            
-            # If recursive call fails, backtrack
-            board_copy[row][col] = 0
-            metrics.count_backtrack()
-        
-        return False
+    def undo(cell, num):
+        state.unassign(row_of[cell], col_of[cell])
+        shift_peers(cell, num, 1)
+        queue.add(cell, state.domain_size(row_of[cell], col_of[cell]))
     
-    result = backtrack()
-    metrics.set_time(time.time() - start_time)
+    metrics.start_phase("search")
+    result = run_search(metrics, size * size, choose, apply, undo, found=counter.record)
+    board_copy, result = counter.finish(board_copy, result)
+    metrics.finish()
     
     return board_copy, metrics.to_dict(), result
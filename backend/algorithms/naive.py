@@ -1,67 +1,40 @@
-import time
 from ..metrics import Metrics
+from .board_state import BoardState
+from .search import run_search
 
-def solve(board):
+def solve(board, budget=None, progress=None, level=None):
     """Basic backtracking solver without heuristics."""
     # Create a copy of the board to avoid modifying the original
     board_copy = [row[:] for row in board]
-    metrics = Metrics("Naive")
-    start_time = time.time()
+    metrics = Metrics("Naive", budget, progress, level)
+    metrics.set_board_size(len(board))
+    metrics.start_phase("setup")
+    state = BoardState(board_copy)
+    metrics.set_board_source(lambda: board_copy)
     
-    def backtrack():
-        metrics.count_node()
-        # Find an empty cell
-        empty_cell = find_empty(board_copy)
-        if not empty_cell:
-            return True  # Puzzle solved
-        
-        row, col = empty_cell
-        
-        # Try each number
-        for num in range(1, 10):
+    def valid_numbers(row, col):
+        """Numbers that fit (row, col), checked one at a time as the search asks for them."""
+        for num in range(1, state.size + 1):
             metrics.count_check()
-            if is_valid(board_copy, row, col, num):
-                # Place number and recurse
-                board_copy[row][col] = num
-                metrics.count_assignment()
-                
-                if backtrack():
-                    return True
-                
-                # If recursive call fails, backtrack
-                board_copy[row][col] = 0
-                metrics.count_backtrack()
-        
-        return False
+            if state.is_valid(row, col, num):
+                yield num
     
-    result = backtrack()
-    metrics.set_time(time.time() - start_time)
+    def choose():
+        # Find an empty cell; None once the puzzle is solved
+        empty_cell = state.find_empty()
+        if not empty_cell:
+            return None
+        return empty_cell, valid_numbers(*empty_cell)
     
-    return board_copy, metrics.to_dict(), result
-
-def find_empty(board):
-    for i in range(9):
-        for j in range(9):
-            if board[i][j] == 0:
-                return (i, j)
-    return None
-
-def is_valid(board, row, col, num):
-    # Check row
-    for j in range(9):
-        if board[row][j] == num:
-            return False
+    def apply(cell, num):
+        state.assign(cell[0], cell[1], num)
+        return True
     
-    # Check column
-    for i in range(9):
-        if board[i][col] == num:
-            return False
+    def undo(cell, num):
+        state.unassign(cell[0], cell[1])
     
-    # Check 3x3 box
-    box_row, box_col = 3 * (row // 3), 3 * (col // 3)
-    for i in range(box_row, box_row + 3):
-        for j in range(box_col, box_col + 3):
-            if board[i][j] == num:
-                return False
+    metrics.start_phase("search")
+    result = run_search(metrics, state.size * state.size, choose, apply, undo)
+    metrics.finish()
     
-    return True
+    return board_copy, metrics.to_dict(), result
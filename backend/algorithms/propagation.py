@@ -0,0 +1,252 @@
+from ..metrics import Metrics
+from .board_state import geometry
+from .search import run_search
+
+# Inference rules in the order they are tried; cheaper rules run first and
+# the loop starts over from the top whenever one of them changes something
+RULES = ("naked_singles", "hidden_singles", "naked_pairs", "hidden_pairs", "pointing", "claiming")
+
+def solve(board, budget=None, progress=None, level=None):
+    """Constraint propagation solver: singles, pairs and pointing/claiming at every node."""
+    board_copy = [row[:] for row in board]
+    metrics = Metrics("Propagation", budget, progress, level)
+    metrics.set_board_size(len(board))
+    metrics.start_phase("setup")
+    firings = dict.fromkeys(RULES, 0)
+    # Budget checks inside the propagation loops, which can run long between nodes
+    tick = metrics.tick
+
+    geo = geometry(len(board_copy))
+    size, order, cells = geo.size, geo.order, geo.cells
+    all_digits, popcount, mask_digits = geo.all_digits, geo.popcount, geo.mask_digits
+    units, peers, cell_row, cell_col = geo.units, geo.peers, geo.row_of, geo.col_of
+    row_units = units[0:size]
+    col_units = units[size:2 * size]
+    box_units = units[2 * size:3 * size]
+
+    # Candidate bitmask of every cell (bit d-1 for digit d) and the placed digits
+    cands = [all_digits] * cells
+    values = [0] * cells
+
+    # Undo trail of (cell, candidates, value) before each change; backtracking pops it back to a saved length
+    trail = []
+
+    def assign(cell, digit):
+        """Place digit in cell and remove it from the peers. Return False on a wipeout."""
+        bit = 1 << (digit - 1)
+        if not cands[cell] & bit:
+            return False
+        trail.append((cell, cands[cell], values[cell]))
+        values[cell] = digit
+        cands[cell] = bit
+        for peer in peers[cell]:
+            if cands[peer] & bit:
+                trail.append((peer, cands[peer], 0))
+                cands[peer] &= ~bit
+                metrics.count_prune()
+                if not cands[peer]:
+                    return False
+        return True
+
+    def eliminate(cell, mask):
+        """Remove the digits in mask from an empty cell. Return None on a wipeout, else whether anything changed."""
+        removed = cands[cell] & mask
+        if not removed:
+            return False
+        trail.append((cell, cands[cell], 0))
+        cands[cell] &= ~mask
+        metrics.count_prune()
+        return None if not cands[cell] else True
+
+    def naked_singles():
+        changed = False
+        for cell in range(cells):
+            if values[cell] == 0 and popcount[cands[cell]] == 1:
+                metrics.count_assignment()
+                if not assign(cell, mask_digits[cands[cell]][0]):
+                    return None
+                firings["naked_singles"] += 1
+                changed = True
+        return changed
+
+    def hidden_singles():
+        changed = False
+        for unit in units:
+            tick()
+            for digit in range(1, size + 1):
+                bit = 1 << (digit - 1)
+                places = [cell for cell in unit if cands[cell] & bit]
+                if not places:
+                    return None  # Digit has nowhere to go in this unit
+                if len(places) == 1 and values[places[0]] == 0:
+                    metrics.count_assignment()
+                    if not assign(places[0], digit):
+                        return None
+                    firings["hidden_singles"] += 1
+                    changed = True
+        return changed
+
+    def naked_pairs():
+        changed = False
+        for unit in units:
+            tick()
+            pairs = {}
+            for cell in unit:
+                if values[cell] == 0 and popcount[cands[cell]] == 2:
+                    pairs.setdefault(cands[cell], []).append(cell)
+            for mask, pair in pairs.items():
+                if len(pair) != 2:
+                    continue
+                fired = False
+                for cell in unit:
+                    if cell not in pair and values[cell] == 0:
+                        result = eliminate(cell, mask)
+                        if result is None:
+                            return None
+                        fired = fired or result
+                if fired:
+                    firings["naked_pairs"] += 1
+                    changed = True
+        return changed
+
+    def hidden_pairs():
+        changed = False
+        for unit in units:
+            tick()
+            # Digits that can go in exactly two cells of the unit, keyed by those cells
+            by_cells = {}
+            for digit in range(1, size + 1):
+                bit = 1 << (digit - 1)
+                places = tuple(cell for cell in unit if values[cell] == 0 and cands[cell] & bit)
+                if len(places) == 2:
+                    by_cells.setdefault(places, []).append(bit)
+            for places, bits in by_cells.items():
+                if len(bits) != 2:
+                    continue
+                keep = bits[0] | bits[1]
+                fired = False
+                for cell in places:
+                    result = eliminate(cell, all_digits & ~keep)
+                    if result is None:
+                        return None
+                    fired = fired or result
+                if fired:
+                    firings["hidden_pairs"] += 1
+                    changed = True
+        return changed
+
+    def box_line(crossed, lines_of, rule):
+        """
+        Locked candidates: if a digit's places in each unit all fall in one
+        line crossing it, remove the digit from the rest of that line.
+        Boxes against rows/columns is pointing; rows/columns against boxes is claiming.
+        """
+        changed = False
+        for unit in crossed:
+            tick()
+            unit_cells = set(unit)
+            for digit in range(1, size + 1):
+                bit = 1 << (digit - 1)
+                places = [cell for cell in unit if values[cell] == 0 and cands[cell] & bit]
+                if len(places) < 2:
+                    continue
+                for lines in lines_of:
+                    line = lines(places[0])
+                    if all(lines(cell) == line for cell in places[1:]):
+                        fired = False
+                        for cell in line:
+                            if cell not in unit_cells and values[cell] == 0:
+                                result = eliminate(cell, bit)
+                                if result is None:
+                                    return None
+                                fired = fired or result
+                        if fired:
+                            firings[rule] += 1
+                            changed = True
+        return changed
+
+    def row_of(cell):
+        return row_units[cell_row[cell]]
+
+    def col_of(cell):
+        return col_units[cell_col[cell]]
+
+    def box_of(cell):
+        return box_units[cell_row[cell] // order * order + cell_col[cell] // order]
+
+    def pointing():
+        return box_line(box_units, (row_of, col_of), "pointing")
+
+    def claiming():
+        return box_line(row_units + col_units, (box_of,), "claiming")
+
+    rules = (naked_singles, hidden_singles, naked_pairs, hidden_pairs, pointing, claiming)
+
+    def propagate():
+        """Apply the rules until none of them changes anything. Return False on a contradiction."""
+        rule_index = 0
+        while rule_index < len(rules):
+            tick()
+            changed = rules[rule_index]()
+            if changed is None:
+                return False
+            rule_index = 0 if changed else rule_index + 1
+        return True
+
+    # Trail length before each assignment on the current search path
+    marks = []
+
+    def choose():
+        metrics.start_phase("propagation")
+        consistent = propagate()
+        metrics.start_phase("search")
+        if not consistent:
+            return None, ()
+
+        # Branch on the empty cell with the fewest candidates
+        cell = None
+        min_remaining = size + 1
+        for i in range(cells):
+            if values[i] == 0 and popcount[cands[i]] < min_remaining:
+                min_remaining = popcount[cands[i]]
+                cell = i
+        if cell is None:
+            return None  # Every cell is placed
+        return cell, mask_digits[cands[cell]]
+
+    def apply(cell, digit):
+        marks.append(len(trail))
+        return assign(cell, digit)
+
+    def undo(cell, digit):
+        # Restore every change recorded after the mark, newest first
+        mark = marks.pop()
+        while len(trail) > mark:
+            changed, mask, value = trail.pop()
+            cands[changed] = mask
+            values[changed] = value
+
+    # Place the givens
+    result = True
+    for cell in range(cells):
+        tick()
+        digit = board_copy[cell_row[cell]][cell_col[cell]]
+        if digit and not assign(cell, digit):
+            result = False
+            break
+    # The givens are never undone, so they need not stay on the trail
+    trail.clear()
+
+    if result:
+        metrics.set_board_source(lambda: [values[r * size:r * size + size] for r in range(size)])
+        result = run_search(metrics, cells, choose, apply, undo)
+        if result:
+            metrics.start_phase("decode")
+            for cell in range(cells):
+                board_copy[cell_row[cell]][cell_col[cell]] = values[cell]
+
+    for rule in RULES:
+        metrics.add_extra(rule, firings[rule])
+    metrics.finish()
+
+    return board_copy, metrics.to_dict(), result
@@ -1,11 +1,13 @@
-import time
 import random
 from ..metrics import Metrics
+from .board_state import BoardState
+from .search import run_search
 
-def solve(board):
+def solve(board, budget=None, progress=None, level=None):
     """Random restart backtracking solver."""
-    metrics = Metrics("RandomRestart")
-    start_time = time.time()
+    metrics = Metrics("RandomRestart", budget, progress, level)
+    metrics.set_board_size(len(board))
+    metrics.start_phase("setup")
     
     # Parameters for random restart
     max_attempts = 5
@@ -13,45 +15,46 @@ def solve(board):
     
     # Clone board each time to avoid modifying original
     board_copy = [row[:] for row in board]
+    state = BoardState(board_copy)
+    metrics.set_board_source(lambda: board_copy)
     
-    def backtrack(restarts, max_backtracks):
-        current_backtracks = 0
-        metrics.count_node()
+    def shuffled_values(cell):
+        """
+        The valid values of cell in random order, up to max_backtracks_per_attempt of them.
         
-        # Find an empty cell
-        empty_cell = find_empty(board_copy)
-        if not empty_cell:
-            return True  # Puzzle solved
-        
-        row, col = empty_cell
-        
-        # Use a shuffled order of values
-        values = list(range(1, 10))
+        Each value after the first is only asked for once the previous one
+        was backtracked, so stopping early gives up on the cell, and with it
+        on the attempt, after that many backtracks.
+        """
+        row, col = cell
+        values = list(range(1, state.size + 1))
         random.shuffle(values)
         
-        # Try each number in random order
+        tries = 0
         for num in values:
             metrics.count_check()
-            if is_valid(board_copy, row, col, num):
-                # Place number and recurse
-                board_copy[row][col] = num
-                metrics.count_assignment()
-                
-                if backtrack(restarts, max_backtracks):
-                    return True
-                
-                # If recursive call fails, backtrack
-                board_copy[row][col] = 0
-                metrics.count_backtrack()
-                current_backtracks += 1
-                
-                # If we've hit the backtrack limit, signal restart
-                if current_backtracks >= max_backtracks:
-                    return False
-        
-        return False
+            if state.is_valid(row, col, num):
+                yield num
+                tries += 1
+                if tries >= max_backtracks_per_attempt:
+                    return
+    
+    def choose():
+        # Find an empty cell
+        empty_cell = state.find_empty()
+        if not empty_cell:
+            return None  # Puzzle solved
+        return empty_cell, shuffled_values(empty_cell)
+    
+    def apply(cell, num):
+        state.assign(cell[0], cell[1], num)
+        return True
+    
+    def undo(cell, num):
+        state.unassign(cell[0], cell[1])
     
     # Try solving with random restarts
+    metrics.start_phase("search")
     solved = False
     attempts = 0
     
@@ -59,38 +62,12 @@ def solve(board):
         attempts += 1
         # Reset board to original state
         board_copy = [row[:] for row in board]
+        state = BoardState(board_copy)
         
         # Try to solve
-        solved = backtrack(attempts, max_backtracks_per_attempt)
+        solved = run_search(metrics, state.size * state.size, choose, apply, undo)
     
     metrics.add_extra("restarts", attempts - 1)
-    metrics.set_time(time.time() - start_time)
+    metrics.finish()
     
     return board_copy, metrics.to_dict(), solved
-
-def find_empty(board):
-    for i in range(9):
-        for j in range(9):
-            if board[i][j] == 0:
-                return (i, j)
-    return None
-
-def is_valid(board, row, col, num):
-    # Check row
-    for j in range(9):
-        if board[row][j] == num:
-            return False
-    
-    # Check column
-    for i in range(9):
-        if board[i][col] == num:
-            return False
-    
-    # Check 3x3 box
-    box_row, box_col = 3 * (row // 3), 3 * (col // 3)
-    for i in range(box_row, box_row + 3):
-        for j in range(box_col, box_col + 3):
-            if board[i][j] == num:
-                return False
-    
-    return True
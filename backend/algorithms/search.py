@@ -0,0 +1,138 @@
+"""
+Depth-first search engine shared by the backtracking solvers.
+
+A solver describes its search with callbacks instead of a recursive
+backtrack() closure:
+
+    choose()             -> None when the current state is a solution, else
+                            (point, options): the choice point to branch on
+                            and an iterable of its options (empty at a dead end)
+    apply(point, option) -> True to descend into the option, False if it is
+                            inconsistent; undo() reverts it either way
+    undo(point, option)  -> revert apply(point, option)
+    release(point)       -> optional, called once the options of a choice
+                            point are exhausted (e.g. to uncover a DLX column)
+
+recursive_depth_first drives them by recursion, one Python frame per node.
+depth_first drives the same callbacks with an explicit stack of choice
+points, so it is not bounded by the recursion limit. Python 3.11 runs
+Python-to-Python calls without growing the C stack, and a frame per node
+then costs less than the stack's push, pop and iterator calls: about 0.2 us
+per node, a percent or two of a real solver's node. run_search therefore
+recurses whenever the search fits well under the recursion limit (every
+supported board size does), and only falls back to the explicit stack for
+deeper searches. python -m backend.bench.search compares the two.
+
+Both count a node per choose(), an assignment per apply() and a backtrack
+per undo().
+"""
+
+import sys
+
+# Marks an exhausted option iterator
+_NONE = object()
+
+def depth_first(metrics, choose, apply, undo, release=None, found=None):
+    """
+    Run a depth-first search on an explicit stack.
+
+    The deepest open choice point lives in local variables and only its
+    ancestors are on the stack, so descending is one tuple push and the
+    common step, trying the next option of the same point, touches no list.
+
+    Args:
+        metrics: Metrics counting the search's nodes, assignments and backtracks
+        choose, apply, undo, release: Search callbacks (see the module docstring)
+        found: Called at every solution; returns True to stop there or False
+            to backtrack and look for another. None stops at the first one.
+
+    Returns:
+        True if the search stopped at a solution, False once it is exhausted
+    """
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    count_node = metrics.count_node
+    count_assignment = metrics.count_assignment
+    count_backtrack = metrics.count_backtrack
+
+    count_node()
+    branch = choose()
+    if branch is None:
+        return found is None or found()
+    point, options = branch
+    options = iter(options)
+
+    while True:
+        # Try the next option of the deepest open choice point
+        value = next(options, _NONE)
+        if value is _NONE:
+            # Exhausted: close it and move on from the option its parent is on
+            if release is not None:
+                release(point)
+            if not stack:
+                return False
+            point, options, value = pop()
+        else:
+            count_assignment()
+            if apply(point, value):
+                # Expand the state the option led to
+                count_node()
+                branch = choose()
+                if branch is None:
+                    if found is None or found():
+                        return True
+                else:
+                    push((point, options, value))
+                    point, options = branch
+                    options = iter(options)
+                    continue
+        undo(point, value)
+        count_backtrack()
+
+def recursive_depth_first(metrics, choose, apply, undo, release=None, found=None):
+    """depth_first by recursion, one Python frame per node (see the module docstring)."""
+
+    def search():
+        metrics.count_node()
+        branch = choose()
+        if branch is None:
+            return found is None or found()
+
+        point, options = branch
+        for value in options:
+            metrics.count_assignment()
+            if apply(point, value) and search():
+                return True
+            undo(point, value)
+            metrics.count_backtrack()
+
+        if release is not None:
+            release(point)
+        return False
+
+    return search()
+
+# Frames kept free below the recursion limit for the caller and the callbacks
+RECURSION_HEADROOM = 200
+
+# Engine run_search uses, None to pick one by depth; the search benchmark switches it to compare the two
+engine = None
+
+def run_search(metrics, max_depth, choose, apply, undo, release=None, found=None):
+    """
+    Run a solver's search on the current engine.
+
+    Unless the engine was switched, searches up to RECURSION_HEADROOM frames
+    short of the recursion limit recurse and deeper ones use depth_first.
+
+    Args:
+        metrics, choose, apply, undo, release, found: As for depth_first
+        max_depth: Most choice points open at once, e.g. the number of cells;
+            only used to pick the engine
+    """
+    run = engine
+    if run is None:
+        deep = max_depth + RECURSION_HEADROOM >= sys.getrecursionlimit()
+        run = depth_first if deep else recursive_depth_first
+    return run(metrics, choose, apply, undo, release, found)
@@ -0,0 +1,239 @@
+import time
+import numpy as np
+from ..budget import BudgetExceeded, current_memory
+from ..metrics import Metrics
+from . import dancing_links
+from .board_state import geometry
+
+# Boards propagated together. The working arrays of a chunk hold
+# 3 * size * size * size cells per board (about 9 MB of them for 4096 9x9
+# boards), so chunking bounds the memory of any batch size.
+CHUNK_SIZE = 4096
+
+_BATCH_TABLES = {}
+
+def batch_tables(size):
+    """
+    Index and bit tables of the vectorized propagation for size x size boards.
+
+    Returns:
+        Tuple (dtype, all_digits, unit_index, cell_units, bit_of): the mask
+        dtype, the all-digits mask, the cells of each of the 3*size units,
+        the row, column and box unit of each cell, and the bit of each digit
+        (index 0 is the empty cell)
+    """
+    tables = _BATCH_TABLES.get(size)
+    if tables is None:
+        geo = geometry(size)
+        # Unit bit sums must not overflow, so boards above 9x9 use 32-bit masks
+        dtype = np.uint16 if size <= 9 else np.uint32
+        cell_units = [[geo.row_of[i], size + geo.col_of[i], 2 * size + geo.box_of[geo.row_of[i]][geo.col_of[i]]]
+                      for i in range(geo.cells)]
+        tables = _BATCH_TABLES[size] = (
+            dtype,
+            dtype(geo.all_digits),
+            np.array(geo.units, dtype=np.intp),
+            np.array(cell_units, dtype=np.intp),
+            np.array([0] + [1 << d for d in range(size)], dtype=dtype)
+        )
+    return tables
+
+def propagate(values):
+    """
+    Run candidate elimination, naked singles and hidden singles on every board at once.
+
+    Args:
+        values: (N, size * size) uint8 array of digits (0 = empty), filled in place
+
+    Returns:
+        Tuple (status, rounds): status is 1 for solved, -1 for a contradiction
+        and 0 for boards that stalled and need search; rounds counts the
+        propagation rounds each board took part in
+    """
+    dtype, all_digits, unit_index, cell_units, bit_of = batch_tables(round(values.shape[1] ** 0.5))
+    digit_bits = bit_of[1:]
+    n = len(values)
+    status = np.zeros(n, dtype=np.int8)
+    rounds = np.zeros(n, dtype=np.int32)
+    active = np.arange(n)
+
+    while len(active):
+        rounds[active] += 1
+        v = values[active]
+        placed = v > 0
+        empty = ~placed
+
+        # Digits placed in every unit; a unit whose bit sum differs from its OR holds a duplicate
+        unit_bits = bit_of[v][:, unit_index]
+        unit_or = np.bitwise_or.reduce(unit_bits, axis=2)
+        dead = (unit_bits.sum(axis=2, dtype=dtype) != unit_or).any(axis=1)
+
+        # Candidates: digits not placed in any of the cell's three units
+        seen = np.bitwise_or.reduce(unit_or[:, cell_units], axis=2)
+        cands = np.where(empty, all_digits & ~seen, 0).astype(dtype)
+        dead |= (empty & (cands == 0)).any(axis=1)
+
+        # For every unit and digit, which of its cells can still take the digit
+        has = (cands[:, unit_index][..., None] & digit_bits) != 0
+        places = has.sum(axis=2)
+        in_unit = (unit_or[..., None] & digit_bits) != 0
+        dead |= ((places == 0) & ~in_unit).any(axis=(1, 2))
+
+        solved = placed.all(axis=1) & ~dead
+        new_v = v.copy()
+
+        # Naked singles: empty cells with exactly one candidate, whose digit
+        # is one more than the number of bits below that candidate's bit
+        naked = empty & (np.bitwise_count(cands) == 1) & ~dead[:, None]
+        new_v[naked] = np.bitwise_count(cands[naked] - 1) + 1
+
+        # Hidden singles: digits with exactly one place left in a unit. Two
+        # singles competing for one cell mean a contradiction, which the
+        # duplicate and wipeout checks catch on the next round.
+        boards, units, digits = np.nonzero((places == 1) & ~in_unit & ~dead[:, None, None])
+        cells = unit_index[units, has[boards, units, :, digits].argmax(axis=1)]
+        new_v[boards, cells] = digits + 1
+
+        progressed = (new_v != v).any(axis=1)
+        values[active] = new_v
+        status[active[dead]] = -1
+        status[active[solved]] = 1
+        active = active[progressed & ~dead & ~solved]
+
+    return status, rounds
+
+def overrun(budget, start_time, start_memory):
+    """
+    The limit of budget a batch has gone past since it started, or None.
+
+    Args:
+        budget: The batch's Budget, or None
+        start_time: time.perf_counter() when the batch started
+        start_memory: current_memory() when the batch started, None if not measured
+    """
+    if budget is None:
+        return None
+    if budget.max_time is not None and time.perf_counter() - start_time > budget.max_time:
+        return "max_time"
+    if budget.max_memory is not None and start_memory is not None:
+        memory = current_memory()
+        if memory is not None and memory - start_memory > budget.max_memory:
+            return "max_memory"
+    return None
+
+def solve_batch(puzzles, budget=None, progress=None, level=None):
+    """
+    Solve many puzzles together, vectorizing propagation across the batch.
+
+    Boards are propagated in chunks of CHUNK_SIZE, and the budget's time and
+    memory limits are checked between chunks for the batch as a whole: once
+    it has run past one, the boards of the remaining chunks are reported as
+    unsolved with status "budget_exceeded" without being propagated. Boards
+    that propagation alone cannot finish fall back to per-board Dancing
+    Links search from their propagated state.
+
+    Args:
+        puzzles: (N, size * size) array of digits with 0 for empty cells, for
+            one of the supported board sizes
+        budget: Budget of the propagation phase and of each fallback search;
+            boards that exceed it are reported as unsolved with status
+            "budget_exceeded"
+        progress: ProgressListener receiving the fallback searches' events
+        level: Metrics counting level of the reported metrics and the fallback searches
+
+    Returns:
+        Tuple (solutions, metrics, success): an (N, size * size) uint8 array, a list
+        of per-board metrics dicts and an (N,) bool array
+    """
+    start_time = time.perf_counter()
+    values = np.array(puzzles, dtype=np.uint8)
+    values = values.reshape(len(values), -1)
+    size = round(values.shape[1] ** 0.5)
+    givens = np.count_nonzero(values, axis=1)
+    n = len(values)
+
+    status = np.zeros(n, dtype=np.int8)
+    rounds = np.zeros(n, dtype=np.int32)
+    start_memory = current_memory() if budget is not None and budget.max_memory is not None else None
+    reached, reason = n, None
+    for chunk in range(0, n, CHUNK_SIZE):
+        reason = overrun(budget, start_time, start_memory) if chunk else None
+        if reason is not None:
+            reached = chunk
+            break
+        end = chunk + CHUNK_SIZE
+        # values[chunk:end] is a view, so propagate fills the batch in place
+        status[chunk:end], rounds[chunk:end] = propagate(values[chunk:end])
+    vector_time = time.perf_counter() - start_time
+    success = status == 1
+
+    metrics_list = []
+    for i in range(n):
+        metrics = Metrics("VectorizedBatch", level=level)
+        metrics.set_board_size(size)
+        elapsed = vector_time / n
+        metrics.add_phase_time("propagation", round(elapsed * 1e9))
+        filled = int(np.count_nonzero(values[i]) - givens[i])
+        metrics.add_extra("vector_rounds", int(rounds[i]))
+        metrics.add_extra("fallback", bool(status[i] == 0 and i < reached))
+
+        if i >= reached:
+            metrics.add_extra("status", "budget_exceeded")
+            metrics.add_extra("budget_reason", reason)
+        elif status[i] == 0:
+            board = values[i].reshape(size, size).tolist()
+            try:
+                solved_board, fallback, ok = dancing_links.solve(board, budget, progress, level)
+            except BudgetExceeded as e:
+                e.metrics.finish()
+                fallback = e.metrics.to_dict()
+                metrics.add_extra("status", "budget_exceeded")
+                metrics.add_extra("budget_reason", e.reason)
+                ok = False
+            elapsed += fallback["time"]
+            for phase, seconds in fallback.get("phases", {}).items():
+                metrics.add_phase_time(phase, round(seconds * 1e9))
+            metrics.nodes = fallback["nodes"]
+            metrics.backtracks = fallback["backtracks"]
+            filled += fallback["assignments"] or 0  # None when counting is off
+            if ok:
+                values[i] = np.array(solved_board, dtype=np.uint8).reshape(-1)
+                success[i] = True
+
+        metrics.assignments = filled
+        metrics.set_time(elapsed)
+        metrics_list.append(metrics)
+
+    total_time = time.perf_counter() - start_time
+    aggregate = {
+        "batch_size": n,
+        "batch_time": total_time,
+        "batch_puzzles_per_sec": n / total_time if total_time else None,
+        "batch_fallbacks": int(np.count_nonzero(status[:reached] == 0))
+    }
+    results = []
+    for metrics in metrics_list:
+        for key, value in aggregate.items():
+            metrics.add_extra(key, value)
+        results.append(metrics.to_dict())
+
+    return values, results, success
+
+def solve_boards(boards, budget=None, progress=None, level=None):
+    """
+    Solve a list of boards as one batch, returning (solved_board, metrics, success) tuples.
+
+    Raises:
+        ValueError: If the boards are not all the same size
+    """
+    if not boards:
+        return []
+    size = len(boards[0])
+    if any(len(board) != size for board in boards):
+        raise ValueError("Boards in a batch must all have the same size.")
+    solutions, metrics, success = solve_batch([[cell for row in board for cell in row] for board in boards], budget, progress, level)
+    return [(solutions[i].reshape(size, size).tolist(), metrics[i], bool(success[i])) for i in range(len(boards))]
+
+def solve(board, budget=None, progress=None, level=None):
+    """Solve a single board through the batch path (a batch of one)."""
+    return solve_boards([board], budget, progress, level)[0]
@@ -1,12 +1,21 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
-from .solver import solve_sudoku_board
+from .solver import (SOLVERS, COUNTING_SOLVERS, solve_sudoku_board, solve_sudoku_batch, parse_puzzles, format_puzzle,
+                     prebuild_tables, warm_up)
+from .parallel import DEFAULT_TIMEOUT, run_comparison
+from .metrics_store import SQLiteMetricsStore
+from .metrics import LEVELS as METRICS_LEVELS
+from .algorithms.board_state import SIZES as BOARD_SIZES
+from .budget import Budget
+from .progress import DEFAULT_EVERY, ProgressListener
+from .profiling import profile_call
+from .stats import RELATIVE_ACCURACY as STATS_RELATIVE_ACCURACY
+from .wire import METRICS_HEADER, compact_type, decode_board, encode_board
+from .generator import DEFAULT_POOL_SIZE, DEFAULT_RATE, DIFFICULTIES, PuzzlePool
 import json
-import pandas as pd
 import os
-import matplotlib
-matplotlib.use('Agg')  # Set non-interactive backend before importing plt
-import matplotlib.pyplot as plt
+import queue
+import threading
 
 # Initialize Flask app with proper static folder configuration
 app = Flask(__name__, static_folder='results', static_url_path='/static_results')
@@ -14,79 +23,675 @@ CORS(app)  # Allows requests from the React app
 
 # Directory for storing results
 RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
-if not os.path.exists(RESULTS_DIR):
-    os.makedirs(RESULTS_DIR, exist_ok=True)
 
-@app.route('/solve-sudoku', methods=['POST'])
-def handle_solve_sudoku():
-    data = request.get_json()
+_metrics_store = None
+_metrics_store_lock = threading.Lock()
+
+def get_metrics_store():
+    """
+    Return the solver metrics history, opening it on first use.
+    
+    The store starts a writer thread, so it is not opened on import: solver
+    pool workers are spawned and re-import this module (as __mp_main__ when
+    the server runs as python -m backend.app), and they never record metrics.
+    The legacy results.csv seeds a fresh database.
+    """
+    global _metrics_store
+    with _metrics_store_lock:
+        if _metrics_store is None:
+            os.makedirs(RESULTS_DIR, exist_ok=True)
+            _metrics_store = SQLiteMetricsStore(
+                os.path.join(RESULTS_DIR, 'metrics.db'),
+                legacy_csv=os.path.join(RESULTS_DIR, 'results.csv')
+            )
+        return _metrics_store
+
+# Default and maximum page size for /results
+RESULTS_PAGE_SIZE = 100
+MAX_RESULTS_PAGE_SIZE = 1000
+
+# Upper bound on the number of puzzles accepted by a single /solve-batch call
+MAX_BATCH_SIZE = 100000
+
+# /count-solutions defaults: two solutions are enough to tell a unique puzzle apart
+DEFAULT_MAX_SOLUTIONS = 2
+DEFAULT_COUNT_ALGORITHM = "DancingLinks"
+
+# Graded puzzles served by /generate; GENERATOR_POOL_SIZE puzzles are kept per
+# difficulty and refilled at up to GENERATOR_RATE puzzles per second
+puzzle_pool = PuzzlePool(
+    int(os.environ.get('GENERATOR_POOL_SIZE') or DEFAULT_POOL_SIZE),
+    float(os.environ.get('GENERATOR_RATE') or DEFAULT_RATE)
+)
+
+# Seconds a /generate client is asked to wait while the requested pool is empty
+GENERATE_RETRY_AFTER = 2
+
+# Metrics drawn by /visualize, one plot each
+VISUALIZED_METRICS = ['time', 'nodes']
+
+def load_plotter():
+    """
+    Import the plotter, and with it matplotlib, on first use.
+    
+    Only /visualize needs it, and matplotlib takes about a second to import,
+    so it stays out of the import of this module and the server's cold start.
+    """
+    from .visualization import plotter
+    return plotter
+
+def prepare_solvers():
+    """
+    Get the solvers ready for the first request; call once at server startup.
+    
+    Builds the solver tables of the board sizes listed in SOLVER_TABLE_SIZES
+    (comma-separated, default 9) and, if SOLVER_WARMUP is set to 1, also
+    pre-solves the warm-up corpus with every algorithm.
+    """
+    sizes = [int(size) for size in (os.environ.get('SOLVER_TABLE_SIZES') or "9").split(",") if size.strip()]
+    prebuild_tables(sizes)
+    if os.environ.get('SOLVER_WARMUP') == '1':
+        print(f"Solver warm-up took {warm_up():.2f} s")
+
+def validate_board(board):
+    """
+    Return an error message if board is not an n x n grid of ints 0-n, else None.
+    
+    n is one of the supported board sizes: 4, 9 (the standard board), 16 or 25.
+    """
+    if not isinstance(board, list) or len(board) not in BOARD_SIZES:
+        return f"Board must be a list of {', '.join(map(str, BOARD_SIZES[:-1]))} or {BOARD_SIZES[-1]} rows."
+    size = len(board)
+    for row in board:
+        if not isinstance(row, list) or len(row) != size:
+            return f"Each row must be a list of {size} cells."
+        for cell in row:
+            if not isinstance(cell, int) or not (0 <= cell <= size):
+                return f"Cells must be integers between 0 and {size}."
+    return None
+
+def parse_budget(data):
+    """
+    Read the optional 'budget' object of a request.
+    
+    Limits the request leaves out fall back to the server default, so every
+    solve is bounded by at least DEFAULT_TIMEOUT seconds of search.
+    
+    Raises:
+        ValueError: If the budget is malformed
+    """
+    budget = Budget.from_dict(data.get('budget') or {})
+    if budget.max_time is None:
+        budget.max_time = DEFAULT_TIMEOUT
+    return budget
+
+def parse_metrics_level(data):
+    """
+    Read the optional 'metrics_level' of a request: "full" (default), "sampled" or "off".
+    
+    Raises:
+        ValueError: If the level is not one of these
+    """
+    level = data.get('metrics_level')
+    if level is not None and level not in METRICS_LEVELS:
+        raise ValueError(f"'metrics_level' must be one of: {', '.join(METRICS_LEVELS)}.")
+    return level
+
+def parse_cache_flag(data):
+    """
+    Read the optional 'cache' flag of a request (default false).
+    
+    A cached solve answers from the solution cache when the puzzle, or a
+    symmetric variant of it, was solved before, by any algorithm; such hits
+    come back with status "cached" and are not recorded in the metrics
+    history. Query strings give it as "true"/"false" or "1"/"0".
+    
+    Raises:
+        ValueError: If the flag is not a boolean
+    """
+    flag = data.get('cache', False)
+    if isinstance(flag, str):
+        flag = {"true": True, "1": True, "false": False, "0": False}.get(flag.lower(), flag)
+    if not isinstance(flag, bool):
+        raise ValueError("'cache' must be true or false.")
+    return flag
+
+def query_number(args, key):
+    """
+    Read a numeric query parameter.
+    
+    Raises:
+        ValueError: If it is not a number
+    """
+    try:
+        return float(args[key])
+    except ValueError:
+        raise ValueError(f"'{key}' must be a number.")
+
+def read_compact_request(mimetype, body, args):
+    """
+    Build the request dict of a solve endpoint whose body is a compact puzzle.
+    
+    The board is validated and decoded in its wire form (see wire.py). The
+    fields a JSON body would carry come from the query string: algorithm,
+    algorithms (comma-separated), difficulty, metrics_level, cache, timeout
+    and the budget limits max_time, max_nodes and max_memory.
+    
+    Raises:
+        ValueError: With the message for a 400 response
+    """
+    data = {"board": decode_board(mimetype, body)}
+    for key in ("algorithm", "difficulty", "metrics_level", "cache"):
+        if key in args:
+            data[key] = args[key]
+    if "algorithms" in args:
+        data["algorithms"] = [name for name in args["algorithms"].split(",") if name]
+    if "timeout" in args:
+        data["timeout"] = query_number(args, "timeout")
+    budget = {key: query_number(args, key) for key in Budget.LIMITS if key in args}
+    if budget:
+        data["budget"] = budget
+    return data
+
+def read_solve_body():
+    """
+    The body of a Flask solve request as a dict, and its compact format.
+    
+    Returns:
+        Tuple (data, mimetype) where mimetype is the compact format of the
+        body, or None for JSON
+    
+    Raises:
+        ValueError: With the message for a 400 response
+    """
+    mimetype = compact_type(request.content_type)
+    if mimetype is None:
+        return request.get_json(), None
+    return read_compact_request(mimetype, request.get_data(), request.args.to_dict()), mimetype
+
+def compact_response(mimetype, payload):
+    """The solution of a successful solve in the request's compact format, with the metrics in a header."""
+    return Response(encode_board(mimetype, payload["solution"]), mimetype=mimetype,
+                    headers={METRICS_HEADER: json.dumps(payload["metrics"])})
+
+def parse_solve_request(data, validated=False):
+    """
+    Validate a /solve-sudoku request body.
+    
+    validated skips the board check for boards already validated in a
+    compact wire form.
     
+    Returns:
+        Tuple (board, algorithm, budget, metrics_level)
+    
+    Raises:
+        ValueError: With the message for a 400 response
+    """
     if not data or 'board' not in data:
-        return jsonify({"error": "Invalid request: 'board' is required."}), 400
+        raise ValueError("Invalid request: 'board' is required.")
     
     board = data['board']
     algorithm = data.get('algorithm', 'Naive')
     
     # Basic validation of the board structure
-    if not isinstance(board, list) or len(board) != 9:
-        return jsonify({"error": "Board must be a list of 9 rows."}), 400
-    for row in board:
-        if not isinstance(row, list) or len(row) != 9:
-            return jsonify({"error": "Each row must be a list of 9 cells."}), 400
-        for cell in row:
-            if not isinstance(cell, int) or not (0 <= cell <= 9):
-                return jsonify({"error": "Cells must be integers between 0 and 9."}), 400
+    error = None if validated else validate_board(board)
+    if error:
+        raise ValueError(error)
+    return board, algorithm, parse_budget(data), parse_metrics_level(data)
 
-    # Create a mutable copy for the solver
-    board_to_solve = [row[:] for row in board]
+def solve_response(data, board, budget, outcome):
+    """
+    Record a /solve-sudoku outcome and build its response.
     
-    try:
-        solved_board, metrics, success = solve_sudoku_board(board_to_solve, algorithm)
+    Returns:
+        Tuple (payload, status_code)
+    """
+    solved_board, metrics, success = outcome
+    if success:
+        # Save metrics for visualization; cache hits did not run the solver
+        difficulty = data.get('difficulty', 'Unknown')
+        if metrics.get('status') != 'cached':
+            get_metrics_store().add(metrics, difficulty)
         
-        if success:
-            # Save metrics to CSV for visualization
-            difficulty = data.get('difficulty', 'Unknown')
-            save_metrics_to_csv(metrics, difficulty)
-            
-            return jsonify({
-                "solution": solved_board,
-                "metrics": metrics,
-                "message": "Sudoku solved successfully!"
-            })
-        else:
-            return jsonify({
-                "error": "No solution exists for the given Sudoku board.",
-                "board_received": board,
-                "metrics": metrics
-            }), 422
+        return {
+            "solution": solved_board,
+            "metrics": metrics,
+            "message": "Sudoku solved successfully!"
+        }, 200
+    elif metrics.get('status') == 'budget_exceeded':
+        return {
+            "error": f"Solver budget exceeded ({metrics['budget_reason']}) before a solution was found.",
+            "status": "budget_exceeded",
+            "budget": budget.to_dict(),
+            "metrics": metrics
+        }, 422
+    else:
+        return {
+            "error": "No solution exists for the given Sudoku board.",
+            "board_received": board,
+            "metrics": metrics
+        }, 422
+
+def run_solve(board, algorithm, budget, metrics_level, use_cache=False, profile=False):
+    """
+    Solve a /solve-sudoku board, optionally under cProfile.
+    
+    Profiled solves bypass the solution cache even if use_cache is set, so
+    the profile always covers the solver itself.
+    
+    Returns:
+        Tuple (outcome, profile): the (solved_board, metrics, success) tuple
+        and the profile summary, or None when not profiling
+    """
+    # Solve a mutable copy of the board
+    args = ([row[:] for row in board], algorithm, use_cache and not profile, budget, None, metrics_level)
+    if profile:
+        return profile_call(solve_sudoku_board, *args)
+    return solve_sudoku_board(*args), None
+
+@app.route('/solve-sudoku', methods=['POST'])
+def handle_solve_sudoku():
+    """
+    Solve one board.
+    
+    The body is JSON, or a compact puzzle (see wire.py) with the other fields
+    in the query string; a solved compact request gets its solution back in
+    the same format, with the metrics as JSON in the X-Sudoku-Metrics header.
+    Errors are always JSON.
+    """
+    try:
+        data, mimetype = read_solve_body()
+        board, algorithm, budget, metrics_level = parse_solve_request(data, validated=mimetype is not None)
+        use_cache = parse_cache_flag(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        outcome, profile = run_solve(board, algorithm, budget, metrics_level, use_cache, bool(data.get('profile')))
+        payload, status = solve_response(data, board, budget, outcome)
+        if mimetype is not None and status == 200:
+            return compact_response(mimetype, payload)
+        if profile is not None:
+            payload["profile"] = profile
+        return jsonify(payload), status
     except Exception as e:
         return jsonify({"error": f"Solver error: {str(e)}"}), 500
 
-@app.route('/compare-algorithms', methods=['POST'])
-def compare_algorithms():
+def parse_count_request(data):
+    """
+    Validate a /count-solutions request body.
+    
+    Returns:
+        Tuple (board, algorithm, budget, metrics_level, max_solutions)
+    
+    Raises:
+        ValueError: With the message for a 400 response
+    """
+    if data and 'algorithm' not in data:
+        data = {**data, 'algorithm': DEFAULT_COUNT_ALGORITHM}
+    board, algorithm, budget, metrics_level = parse_solve_request(data)
+    if algorithm not in COUNTING_SOLVERS:
+        raise ValueError(f"'algorithm' must be one of: {', '.join(COUNTING_SOLVERS.keys())}.")
+    
+    max_solutions = data.get('max_solutions', DEFAULT_MAX_SOLUTIONS)
+    if isinstance(max_solutions, bool) or not isinstance(max_solutions, int) or max_solutions < 1:
+        raise ValueError("'max_solutions' must be a positive integer.")
+    return board, algorithm, budget, metrics_level, max_solutions
+
+def run_count(board, algorithm, budget, metrics_level, max_solutions):
+    """Count the solutions of a /count-solutions board, returning the (board, metrics, success) outcome."""
+    return solve_sudoku_board([row[:] for row in board], algorithm, budget=budget,
+                              metrics_level=metrics_level, max_solutions=max_solutions)
+
+def count_response(budget, outcome):
+    """
+    Build a /count-solutions response.
+    
+    'complete' is true when the search space was exhausted below the limit,
+    so 'solutions' is the exact count; 'unique' is only known when the limit
+    allowed a second solution to be looked for.
+    
+    Returns:
+        Tuple (payload, status_code)
+    """
+    first_solution, metrics, success = outcome
+    if metrics.get('status') == 'budget_exceeded':
+        return {
+            "error": f"Solver budget exceeded ({metrics['budget_reason']}) before the count finished.",
+            "status": "budget_exceeded",
+            "solutions": metrics.get('solutions', 0),
+            "budget": budget.to_dict(),
+            "metrics": metrics
+        }, 422
+    
+    solutions = metrics['solutions']
+    max_solutions = metrics['max_solutions']
+    complete = solutions < max_solutions
+    return {
+        "solutions": solutions,
+        "max_solutions": max_solutions,
+        "complete": complete,
+        "unique": solutions == 1 if complete or solutions > 1 else None,
+        "solution": first_solution if success else None,
+        "metrics": metrics
+    }, 200
+
+@app.route('/count-solutions', methods=['POST'])
+def handle_count_solutions():
+    """
+    Count the solutions of a board, stopping once 'max_solutions' (default 2) are found.
+    
+    Takes the /solve-sudoku body; 'algorithm' is one of the counting
+    algorithms and defaults to DancingLinks.
+    """
     data = request.get_json()
+    try:
+        board, algorithm, budget, metrics_level, max_solutions = parse_count_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
+    try:
+        payload, status = count_response(budget, run_count(board, algorithm, budget, metrics_level, max_solutions))
+        return jsonify(payload), status
+    except Exception as e:
+        return jsonify({"error": f"Solver error: {str(e)}"}), 500
+
+@app.route('/generate', methods=['GET'])
+def generate():
+    """
+    Serve a unique-solution puzzle of the requested 'difficulty' (default Medium).
+    
+    Puzzles come from the pre-generated pools, which start filling when the
+    server starts (see asgi.py and wsgi.py); 'difficulty' is the graded
+    difficulty, with the grading details in 'grade'. While the requested
+    pool is empty the answer is 503 with a Retry-After header, rather than
+    generating a puzzle inside the request.
+    """
+    difficulty = request.args.get('difficulty', 'Medium')
+    if difficulty not in DIFFICULTIES:
+        return jsonify({"error": f"'difficulty' must be one of: {', '.join(DIFFICULTIES)}."}), 400
+    
+    puzzle = puzzle_pool.take(difficulty)
+    if puzzle is None:
+        return jsonify({
+            "error": f"No {difficulty} puzzle is ready yet.",
+            "pool_sizes": puzzle_pool.sizes()
+        }), 503, {"Retry-After": str(GENERATE_RETRY_AFTER)}
+    return jsonify({**puzzle, "source": "pool"})
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def parse_stream_request(data, query=False):
+    """
+    Validate a /solve-sudoku/stream request.
+    
+    Args:
+        data: The JSON body of a POST, or the query parameters of a GET
+        query: Whether data holds query parameters, with the board as a
+            'puzzle' string
+    
+    Returns:
+        Tuple (board, algorithm, difficulty, every, budget, use_cache)
+    
+    Raises:
+        ValueError: With the message for a 400 response
+    """
+    if query:
+        boards = parse_puzzles(data.get('puzzle', ''))
+        if len(boards) != 1:
+            raise ValueError("Invalid request: 'puzzle' must be one 81-character puzzle.")
+        board = boards[0]
+        budget_data = {}
+    else:
+        if not data or 'board' not in data:
+            raise ValueError("Invalid request: 'board' is required.")
+        board = data['board']
+        error = validate_board(board)
+        if error:
+            raise ValueError(error)
+        budget_data = data
+    
+    algorithm = data.get('algorithm', 'Naive')
+    if algorithm not in SOLVERS:
+        raise ValueError(f"Unknown algorithm: {algorithm}.")
+    try:
+        every = int(data.get('every', DEFAULT_EVERY))
+        if every <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError("'every' must be a positive integer number of nodes.")
+    return (board, algorithm, data.get('difficulty', 'Unknown'), every, parse_budget(budget_data),
+            parse_cache_flag(data))
+
+def run_stream_solve(board, algorithm, budget, every, events, stop, use_cache=False):
+    """
+    Solve a /solve-sudoku/stream board, putting its ("progress", event) pairs on events.
+    
+    Under ASGI this runs in a solver pool worker, with events and stop
+    shared through a multiprocessing manager. Once stop is set no more
+    events are sent and the solver stops at its next one.
+    
+    Returns:
+        The (solved_board, metrics, success) outcome
+    """
+    def forward(event):
+        if stop.is_set():
+            listener.cancel()
+        else:
+            events.put(("progress", event))
+    
+    listener = ProgressListener(forward, every)
+    return solve_sudoku_board([row[:] for row in board], algorithm, use_cache, budget, progress=listener)
+
+def stream_result(difficulty, outcome):
+    """Record a /solve-sudoku/stream outcome and build the payload of its 'result' event."""
+    solved_board, metrics, success = outcome
+    if success and metrics.get('status') != 'cached':
+        get_metrics_store().add(metrics, difficulty)
+    return {
+        "solution": solved_board if success else None,
+        "metrics": metrics,
+        "success": success,
+        "status": metrics.get('status', "solved" if success else "unsolvable")
+    }
+
+@app.route('/solve-sudoku/stream', methods=['GET', 'POST'])
+def stream_solve_sudoku():
+    """
+    Solve a board while streaming progress as server-sent events.
+    
+    POST takes the same JSON body as /solve-sudoku plus an optional 'every';
+    GET (for EventSource) takes 'puzzle' as an 81-character string and
+    'algorithm', 'difficulty', 'every' and 'cache' as query parameters. 'progress'
+    events carry nodes, depth, backtracks and the partial board every
+    'every' nodes; one 'result' (or 'error') event ends the stream.
+    """
+    query = request.method == 'GET'
+    data = request.args.to_dict() if query else request.get_json()
+    try:
+        board, algorithm, difficulty, every, budget, use_cache = parse_stream_request(data, query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    events = queue.Queue()
+    stop = threading.Event()
+    
+    def run():
+        try:
+            outcome = run_stream_solve(board, algorithm, budget, every, events, stop, use_cache)
+        except Exception as e:
+            events.put(("error", {"error": f"Solver error: {str(e)}"}))
+            return
+        events.put(("result", stream_result(difficulty, outcome)))
+    
+    def generate():
+        # The solver runs in its own thread so events reach the client as they happen
+        threading.Thread(target=run, daemon=True).start()
+        try:
+            while True:
+                event, payload = events.get()
+                yield sse_event(event, payload)
+                if event != "progress":
+                    return
+        finally:
+            # Stops the solver at its next event if the client went away
+            stop.set()
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def parse_batch_request(data):
+    """
+    Validate a /solve-batch request body.
+    
+    Puzzles may come as a list of boards of one size or as newline-delimited
+    81-char strings of 9x9 puzzles; solutions are returned in the same form they were sent.
+    
+    Returns:
+        Tuple (boards, as_strings, algorithm, budget, metrics_level, use_cache)
+    
+    Raises:
+        ValueError: With the message for a 400 response
+    """
+    if not data or ('boards' not in data and 'puzzles' not in data):
+        raise ValueError("Invalid request: 'boards' or 'puzzles' is required.")
+    
+    as_strings = 'puzzles' in data
+    if as_strings:
+        if not isinstance(data['puzzles'], str):
+            raise ValueError("'puzzles' must be a newline-delimited string of 81-character puzzles.")
+        boards = parse_puzzles(data['puzzles'])
+    else:
+        boards = data['boards']
+        if not isinstance(boards, list):
+            raise ValueError("'boards' must be a list of boards.")
+        for index, board in enumerate(boards):
+            error = validate_board(board)
+            if not error and len(board) != len(boards[0]):
+                error = "Boards in a batch must all have the same size."
+            if error:
+                raise ValueError(f"Board {index}: {error}")
+    
+    if len(boards) > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch too large: at most {MAX_BATCH_SIZE} puzzles per request.")
+    return (boards, as_strings, data.get('algorithm', 'Naive'), parse_budget(data), parse_metrics_level(data),
+            parse_cache_flag(data))
+
+def batch_response(data, as_strings, outcomes):
+    """Record the outcomes of a /solve-batch call and build its response payload."""
+    results = []
+    solved = 0
+    exceeded = 0
+    solved_metrics = []
+    for solved_board, metrics, success in outcomes:
+        exceeded += metrics.get('status') == 'budget_exceeded'
+        if success:
+            solved += 1
+            # Cache hits did not run the solver, so they are not recorded
+            if metrics.get('status') != 'cached':
+                solved_metrics.append(metrics)
+        results.append({
+            "solution": (format_puzzle(solved_board) if as_strings else solved_board) if success else None,
+            "metrics": metrics,
+            "success": success
+        })
+    
+    # One bulk write for the whole batch
+    get_metrics_store().add_many(solved_metrics, data.get('difficulty', 'Unknown'))
+    
+    return {
+        "results": results,
+        "solved": solved,
+        "failed": len(results) - solved,
+        "budget_exceeded": exceeded,
+        "total_time": sum(m['time'] for _, m, _ in outcomes),
+        "message": f"Solved {solved} of {len(results)} puzzles."
+    }
+
+@app.route('/solve-batch', methods=['POST'])
+def handle_solve_batch():
+    data = request.get_json()
+    try:
+        boards, as_strings, algorithm, budget, metrics_level, use_cache = parse_batch_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        outcomes = solve_sudoku_batch(boards, algorithm, use_cache, budget, metrics_level)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Solver error: {str(e)}"}), 500
+    
+    return jsonify(batch_response(data, as_strings, outcomes))
+
+def parse_compare_request(data, validated=False):
+    """
+    Validate a /compare-algorithms request body.
+    
+    validated skips the board check for boards already validated in a
+    compact wire form.
+    
+    Returns:
+        Tuple (board, algorithms, difficulty, timeout, budget)
+    
+    Raises:
+        ValueError: With the message for a 400 response
+    """
     if not data or 'board' not in data:
-        return jsonify({"error": "Invalid request: 'board' is required."}), 400
+        raise ValueError("Invalid request: 'board' is required.")
     
     board = data['board']
-    algorithms = data.get('algorithms', ['Naive', 'MRV', 'Degree', 'Combined', 'ForwardChecking', 'MAC', 'RandomRestart', 'DancingLinks'])
-    difficulty = data.get('difficulty', 'Unknown')
+    algorithms = data.get('algorithms', list(SOLVERS.keys()))
+    timeout = data.get('timeout', DEFAULT_TIMEOUT)
     
+    error = None if validated else validate_board(board)
+    if error:
+        raise ValueError(error)
+    unknown = [algorithm for algorithm in algorithms if algorithm not in SOLVERS]
+    if unknown:
+        raise ValueError(f"Unknown algorithms: {', '.join(unknown)}.")
+    if not isinstance(timeout, (int, float)) or timeout <= 0:
+        raise ValueError("'timeout' must be a positive number of seconds.")
+    # Solvers stop on their own once the timeout passes, unless the budget is tighter
+    budget = Budget.from_dict(data.get('budget') or {})
+    return board, algorithms, data.get('difficulty', 'Unknown'), timeout, budget
+
+def compare_response(difficulty, comparison):
+    """Record the successful solves of a /compare-algorithms comparison and build its response."""
     results = []
-    for algorithm in algorithms:
-        board_copy = [row[:] for row in board]
-        solved_board, metrics, success = solve_sudoku_board(board_copy, algorithm)
-        
-        if success:
+    budget_exceeded = {}
+    for algorithm, (solved_board, metrics, success) in comparison['outcomes']:
+        if metrics.get('status') == 'budget_exceeded':
+            budget_exceeded[algorithm] = metrics
+        elif success:
             metrics['difficulty'] = difficulty
-            save_metrics_to_csv(metrics, difficulty)
+            get_metrics_store().add(metrics, difficulty)
             results.append(metrics)
     
-    return jsonify({
+    return {
         "results": results,
+        "timed_out": comparison['timed_out'],
+        "errors": comparison['errors'],
+        "budget_exceeded": budget_exceeded,
+        "wall_time": comparison['wall_time'],
+        "cpu_time": comparison['cpu_time'],
         "message": f"Compared {len(results)} algorithms successfully!"
-    })
+    }
+
+@app.route('/compare-algorithms', methods=['POST'])
+def compare_algorithms():
+    """Run several algorithms on one board; the body may be compact, as for /solve-sudoku."""
+    try:
+        data, mimetype = read_solve_body()
+        board, algorithms, difficulty, timeout, budget = parse_compare_request(data, validated=mimetype is not None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Solvers run concurrently in the shared process pool
+    return jsonify(compare_response(difficulty, run_comparison(board, algorithms, timeout, budget)))
 
 @app.route('/plot-image/<filename>', methods=['GET'])
 def get_plot_image(filename):
@@ -95,74 +700,86 @@ def get_plot_image(filename):
 
 @app.route('/visualize', methods=['GET'])
 def visualize_metrics():
-    # Check if results.csv exists
-    results_file = os.path.join(RESULTS_DIR, 'results.csv')
-    if not os.path.exists(results_file):
+    # Make sure queued writes are visible before reading the history
+    metrics_store = get_metrics_store()
+    metrics_store.flush()
+    fingerprint = metrics_store.fingerprint()
+    if fingerprint is None:
         return jsonify({"error": "No results data available for visualization."}), 404
     
-    # Generate visualizations using pandas/matplotlib
+    # Plots are redrawn only when metrics were added since they were last rendered
     try:
-        df = pd.read_csv(results_file)
+        paths, rendered = load_plotter().plot_all_metrics(
+            metrics_store.summarize, RESULTS_DIR, VISUALIZED_METRICS, fingerprint=fingerprint
+        )
         
-        # Create time vs difficulty visualization
-        plt.figure(figsize=(10, 6))
-        for solver in df['algorithm'].unique():
-            sub = df[df['algorithm'] == solver]
-            plt.plot(sub['difficulty'], sub['time'], marker='o', label=solver)
-        plt.xlabel('Difficulty')
-        plt.ylabel('Time (seconds)')
-        plt.title('Solver Time vs Difficulty')
-        plt.legend()
-        time_plot_path = os.path.join(RESULTS_DIR, 'time_vs_difficulty.png')
-        plt.savefig(time_plot_path)
-        print(f"Generated plot: {time_plot_path}")  # Debug output
-        
-        # Create nodes vs difficulty visualization
-        plt.figure(figsize=(10, 6))
-        for solver in df['algorithm'].unique():
-            sub = df[df['algorithm'] == solver]
-            plt.plot(sub['difficulty'], sub['nodes'], marker='o', label=solver)
-        plt.xlabel('Difficulty')
-        plt.ylabel('Nodes')
-        plt.title('Solver Nodes vs Difficulty')
-        plt.legend()
-        nodes_plot_path = os.path.join(RESULTS_DIR, 'nodes_vs_difficulty.png')
-        plt.savefig(nodes_plot_path)
-        print(f"Generated plot: {nodes_plot_path}")  # Debug output
-        
-        # Return URLs that use our dedicated image endpoint
+        # Return URLs that use our dedicated image endpoint; the fingerprint
+        # in the query string keeps browsers from showing a stale cached plot
         return jsonify({
-            "message": "Visualizations generated successfully!",
-            "plots": [
-                f"/plot-image/time_vs_difficulty.png",
-                f"/plot-image/nodes_vs_difficulty.png"
-            ]
+            "message": "Visualizations generated successfully!" if rendered else "Visualizations are up to date.",
+            "plots": [f"/plot-image/{os.path.basename(path)}?v={fingerprint}" for path in paths],
+            "rendered": rendered
         })
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": f"Visualization error: {str(e)}"}), 500
 
-def save_metrics_to_csv(metrics, difficulty):
-    metrics_dict = metrics.copy()
-    metrics_dict['difficulty'] = difficulty
+@app.route('/results', methods=['GET'])
+def get_results():
+    """
+    Page through stored metrics.
     
-    # Create or append to the CSV file
-    results_file = os.path.join(RESULTS_DIR, 'results.csv')
-    mode = 'a' if os.path.exists(results_file) else 'w'
+    Query parameters: algorithm and difficulty filter the rows, limit sets the
+    page size and after is the cursor returned as next_after by the previous page.
+    """
+    try:
+        limit = int(request.args.get('limit', RESULTS_PAGE_SIZE))
+        after = request.args.get('after')
+        after = int(after) if after is not None else None
+    except ValueError:
+        return jsonify({"error": "'limit' and 'after' must be integers."}), 400
+    if not 1 <= limit <= MAX_RESULTS_PAGE_SIZE:
+        return jsonify({"error": f"'limit' must be between 1 and {MAX_RESULTS_PAGE_SIZE}."}), 400
+    
+    rows = get_metrics_store().query(
+        algorithm=request.args.get('algorithm'),
+        difficulty=request.args.get('difficulty'),
+        limit=limit,
+        after=after
+    )
     
-    df = pd.DataFrame([metrics_dict])
-    df.to_csv(results_file, mode=mode, header=(mode=='w'), index=False)
+    return jsonify({
+        "results": rows,
+        "next_after": rows[-1]['id'] if len(rows) == limit else None
+    })
 
-@app.route('/results', methods=['GET'])
-def get_results():
-    # Return the results CSV as JSON
-    results_file = os.path.join(RESULTS_DIR, 'results.csv')
-    if not os.path.exists(results_file):
-        return jsonify({"error": "No results data available."}), 404
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    """
+    Aggregated solver statistics per (algorithm, difficulty).
     
-    df = pd.read_csv(results_file)
-    return jsonify({"results": df.to_dict(orient='records')})
+    Each group has its row count, the mean, p50, p95 and p99 of the solve
+    time in seconds and the totals of nodes, backtracks and prunes. The
+    optional algorithm and difficulty query parameters select groups. The
+    statistics are kept up to date as metrics are stored, so the answer does
+    not grow with the history; quantiles are estimates within
+    quantile_accuracy (relative) of a recorded time.
+    """
+    # Make sure this process's queued rows are counted
+    metrics_store = get_metrics_store()
+    metrics_store.flush()
+    stats = metrics_store.stats(
+        algorithm=request.args.get('algorithm'),
+        difficulty=request.args.get('difficulty')
+    )
+    return jsonify({
+        "stats": stats,
+        "count": sum(group['count'] for group in stats),
+        "quantile_accuracy": STATS_RELATIVE_ACCURACY
+    })
 
 if __name__ == '__main__':
+    prepare_solvers()
+    puzzle_pool.start()
     app.run(debug=True, port=5001)
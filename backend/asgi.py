@@ -0,0 +1,361 @@
+"""
+ASGI serving mode.
+
+    uvicorn backend.asgi:app --port 5001
+
+/solve-sudoku, /count-solutions, /solve-batch, /compare-algorithms and
+/solve-sudoku/stream are handled asynchronously here: their solves run in a
+bounded SolverPool, so a slow solve occupies one worker process instead of
+the server, and once every worker is busy and the queue is full further
+solves are refused with 429. A comparison takes one place per algorithm,
+and a stream's progress events come back from its worker through a
+multiprocessing manager queue, read in the default thread pool because
+every manager call is a blocking round trip. /health reports the queue
+depth and worker utilization. Every other route is served by the Flask app
+through asgiref's WSGI adapter. The /generate puzzle pools start filling at
+startup.
+
+SOLVER_WORKERS and SOLVER_MAX_QUEUE set the pool size and backlog (default:
+one worker per CPU and four queued solves per worker).
+
+Startup starts the pool's workers, which are spawned rather than forked
+(see parallel.SPAWN), and each of them prebuilds the solver tables and,
+with SOLVER_WARMUP=1, runs the solver warm-up (see app.prepare_solvers)
+before taking its first solve.
+"""
+import asyncio
+import json
+import os
+import queue
+import time
+from urllib.parse import parse_qsl
+from asgiref.wsgi import WsgiToAsgi
+from .app import (app as flask_app, puzzle_pool, prepare_solvers, parse_solve_request, run_solve, solve_response, parse_batch_request,
+                  batch_response, parse_count_request, run_count, count_response, read_compact_request,
+                  parse_cache_flag, parse_compare_request, compare_response, parse_stream_request, run_stream_solve, stream_result,
+                  sse_event)
+from .parallel import (PoolFull, SolverPool, SPAWN, collect_comparison, comparison_budget, sweep_comparison,
+                       timed_solve)
+from .solver import solve_sudoku_batch
+from .wire import METRICS_HEADER, compact_type, encode_board
+
+# Seconds a client refused with 429 is asked to wait before retrying
+RETRY_AFTER = 1
+
+# Seconds between checks of a stream's worker for progress events
+STREAM_POLL_INTERVAL = 0.05
+
+def _env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+async def read_body(receive):
+    """Read the whole request body."""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+async def read_json(receive):
+    """Read the whole request body and decode it as JSON, or None if it is not valid JSON."""
+    try:
+        return json.loads(await read_body(receive))
+    except ValueError:
+        return None
+
+async def read_solve_body(scope, receive):
+    """
+    The body of a solve request as a dict, and its compact format (None for JSON).
+
+    Raises:
+        ValueError: With the message for a 400 response
+    """
+    mimetype = compact_type(header(scope, b"content-type"))
+    if mimetype is None:
+        return await read_json(receive), None
+    args = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+    return read_compact_request(mimetype, await read_body(receive), args), mimetype
+
+def drain_events(events):
+    """Take every event waiting in a stream's manager queue; each get is a round trip to the manager."""
+    drained = []
+    try:
+        while True:
+            drained.append(events.get_nowait())
+    except queue.Empty:
+        return drained
+
+async def wait_disconnect(receive):
+    """Wait until the client goes away, once the request body has been read."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+def header(scope, name):
+    """The value of a request header (name in lower case), or None."""
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+async def send_bytes(send, body, content_type, status=200, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+            # Same policy as flask_cors on the Flask routes
+            (b"access-control-allow-origin", b"*"),
+            *headers
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def send_json(send, payload, status=200, headers=()):
+    await send_bytes(send, json.dumps(payload).encode(), "application/json", status, headers)
+
+async def send_event(send, event, payload):
+    """Send one server-sent event of a streamed response."""
+    await send({"type": "http.response.body", "body": sse_event(event, payload).encode(), "more_body": True})
+
+class SolverApp:
+    """ASGI application serving the solve endpoints from a SolverPool."""
+
+    def __init__(self, wsgi_app, max_workers=None, max_queue=None):
+        self.fallback = WsgiToAsgi(wsgi_app)
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = None
+        self._manager = None
+        self.routes = {
+            ("POST", "/solve-sudoku"): self.solve_sudoku,
+            ("POST", "/count-solutions"): self.count_solutions,
+            ("POST", "/solve-batch"): self.solve_batch,
+            ("POST", "/compare-algorithms"): self.compare_algorithms,
+            ("GET", "/solve-sudoku/stream"): self.solve_stream,
+            ("POST", "/solve-sudoku/stream"): self.solve_stream,
+            ("GET", "/health"): self.health
+        }
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = SolverPool(self.max_workers, self.max_queue, initializer=prepare_solvers)
+        return self._pool
+
+    @property
+    def manager(self):
+        """Multiprocessing manager whose queues carry progress events back from the pool's workers."""
+        if self._manager is None:
+            self._manager = SPAWN.Manager()
+        return self._manager
+
+    def stream_channel(self):
+        """A new manager queue for a stream's events and event to stop its solve."""
+        return self.manager.Queue(), self.manager.Event()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        handler = self.routes.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if handler is None:
+            await self.fallback(scope, receive, send)
+            return
+        await handler(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                prepare_solvers()
+                await self.pool.start()
+                # Manager calls block, so streams make them off the event loop
+                await asyncio.get_running_loop().run_in_executor(None, lambda: self.manager)
+                # Fill the /generate pools before the first request asks for one
+                puzzle_pool.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._pool is not None:
+                    self._pool.shutdown()
+                if self._manager is not None:
+                    self._manager.shutdown()
+                puzzle_pool.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def refuse(self, send, error):
+        """Answer 429 for a solve the full pool refused."""
+        await send_json(send, {"error": str(error), "health": self.pool.stats()}, 429,
+                        [(b"retry-after", str(RETRY_AFTER).encode())])
+
+    async def dispatch(self, send, fn, *args):
+        """Run a solve in the pool, answering 429 and returning None if the queue is full."""
+        try:
+            future = self.pool.submit(fn, *args)
+        except PoolFull as e:
+            await self.refuse(send, e)
+            return None
+        return await future
+
+    async def solve_sudoku(self, scope, receive, send):
+        try:
+            data, mimetype = await read_solve_body(scope, receive)
+            board, algorithm, budget, metrics_level = parse_solve_request(data, validated=mimetype is not None)
+            use_cache = parse_cache_flag(data)
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, 400)
+            return
+
+        try:
+            solved = await self.dispatch(send, run_solve, board, algorithm, budget, metrics_level, use_cache,
+                                         bool(data.get('profile')))
+            if solved is None:
+                return
+            outcome, profile = solved
+            payload, status = solve_response(data, board, budget, outcome)
+            compact = mimetype is not None and status == 200
+            if compact:
+                body = encode_board(mimetype, payload["solution"])
+                metrics_header = (METRICS_HEADER.lower().encode(), json.dumps(payload["metrics"]).encode())
+            if profile is not None:
+                payload["profile"] = profile
+        except Exception as e:
+            await send_json(send, {"error": f"Solver error: {str(e)}"}, 500)
+            return
+        if compact:
+            await send_bytes(send, body, mimetype, headers=[metrics_header])
+        else:
+            await send_json(send, payload, status)
+
+    async def count_solutions(self, scope, receive, send):
+        data = await read_json(receive)
+        try:
+            board, algorithm, budget, metrics_level, max_solutions = parse_count_request(data)
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, 400)
+            return
+
+        try:
+            outcome = await self.dispatch(send, run_count, board, algorithm, budget, metrics_level, max_solutions)
+            if outcome is None:
+                return
+            payload, status = count_response(budget, outcome)
+        except Exception as e:
+            await send_json(send, {"error": f"Solver error: {str(e)}"}, 500)
+            return
+        await send_json(send, payload, status)
+
+    async def solve_batch(self, scope, receive, send):
+        data = await read_json(receive)
+        try:
+            boards, as_strings, algorithm, budget, metrics_level, use_cache = parse_batch_request(data)
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, 400)
+            return
+
+        try:
+            outcomes = await self.dispatch(send, solve_sudoku_batch, boards, algorithm, use_cache, budget,
+                                           metrics_level)
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, 400)
+            return
+        except Exception as e:
+            await send_json(send, {"error": f"Solver error: {str(e)}"}, 500)
+            return
+        if outcomes is not None:
+            await send_json(send, batch_response(data, as_strings, outcomes))
+
+    async def compare_algorithms(self, scope, receive, send):
+        try:
+            data, mimetype = await read_solve_body(scope, receive)
+            board, algorithms, difficulty, timeout, budget = parse_compare_request(data, validated=mimetype is not None)
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, 400)
+            return
+
+        budget = comparison_budget(timeout, budget)
+        start_log = self.pool.start_log
+        start_time = time.perf_counter()
+        tokens = [start_log.token() for _ in algorithms]
+        try:
+            futures = self.pool.submit_all([(timed_solve, [row[:] for row in board], algorithm, budget, token)
+                                            for algorithm, token in zip(algorithms, tokens)])
+        except PoolFull as e:
+            await self.refuse(send, e)
+            return
+        # Each algorithm's timeout runs from when a worker takes it, so solves
+        # queued behind other clients' are not reported as timed out. A solver
+        # still running past it stops on its own when its budget's max_time
+        # runs out, and keeps its place in the pool until then
+        pending = dict(zip(futures, tokens))
+        not_done = set()
+        while pending:
+            overdue, wait_time = sweep_comparison(pending, start_log, timeout)
+            not_done.update(overdue)
+            if pending:
+                await asyncio.wait(list(pending), timeout=wait_time, return_when=asyncio.FIRST_COMPLETED)
+        start_log.forget(tokens)
+        await send_json(send, compare_response(difficulty, collect_comparison(algorithms, futures, not_done,
+                                                                              start_time)))
+
+    async def solve_stream(self, scope, receive, send):
+        query = scope["method"] == "GET"
+        if query:
+            data = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        else:
+            data = await read_json(receive)
+        try:
+            board, algorithm, difficulty, every, budget, use_cache = parse_stream_request(data, query)
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, 400)
+            return
+
+        loop = asyncio.get_running_loop()
+        events, stop = await loop.run_in_executor(None, self.stream_channel)
+        try:
+            future = self.pool.submit(run_stream_solve, board, algorithm, budget, every, events, stop, use_cache)
+        except PoolFull as e:
+            await self.refuse(send, e)
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+                (b"access-control-allow-origin", b"*")
+            ]
+        })
+
+        disconnected = asyncio.ensure_future(wait_disconnect(receive))
+        try:
+            while True:
+                finished = future.done()
+                # Events put before the solve returned are all queued by now
+                for event in await loop.run_in_executor(None, drain_events, events):
+                    await send_event(send, *event)
+                if finished or disconnected.done():
+                    break
+                await asyncio.wait([future, disconnected], timeout=STREAM_POLL_INTERVAL,
+                                   return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                # Stops the solver at its next event; the client is gone
+                await loop.run_in_executor(None, stop.set)
+                return
+            try:
+                await send_event(send, "result", stream_result(difficulty, future.result()))
+            except Exception as e:
+                await send_event(send, "error", {"error": f"Solver error: {str(e)}"})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            disconnected.cancel()
+
+    async def health(self, scope, receive, send):
+        await send_json(send, {"status": "ok", **self.pool.stats()})
+
+app = SolverApp(flask_app, _env_int("SOLVER_WORKERS"), _env_int("SOLVER_MAX_QUEUE"))
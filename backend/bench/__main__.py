@@ -0,0 +1,185 @@
+"""
+Benchmark every registered solver over the bundled puzzle corpora.
+
+For each (algorithm, corpus) pair this reports median and p95 solve latency,
+puzzles per second, search nodes per second and peak traced memory, prints a
+table and optionally writes a JSON report that can be diffed between commits.
+
+    python -m backend.bench [--algorithms MRV,MAC] [--corpora easy,hard]
+                            [--output report.json] [--compare old.json]
+
+Each pair runs in its own process so a solver that takes too long on a
+corpus can be stopped after --cell-timeout seconds; it is then reported
+with status "timeout" and no measurements.
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from ..solver import SOLVERS
+from .corpus import available_corpora, load_corpus
+
+# Corpora run by default, from easiest to hardest
+DEFAULT_CORPORA = ["easy", "medium", "hard", "17-clue"]
+
+# Report fields compared by --compare, and whether larger is better
+COMPARED_FIELDS = {
+    "median_ms": False,
+    "p95_ms": False,
+    "puzzles_per_sec": True,
+    "nodes_per_sec": True,
+    "peak_memory_kb": False
+}
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def measure(algorithm, corpus, memory_sample):
+    """Time one solver over one corpus, then trace peak memory on the first memory_sample puzzles."""
+    solve = SOLVERS[algorithm]
+    boards = load_corpus(corpus)
+
+    latencies = []
+    nodes = 0
+    solved = 0
+    for board in boards:
+        start = time.perf_counter()
+        _, metrics, success = solve(board)
+        latencies.append(time.perf_counter() - start)
+        nodes += metrics.get("nodes", 0)
+        solved += bool(success)
+
+    peak = 0
+    tracemalloc.start()
+    for board in boards[:memory_sample]:
+        tracemalloc.reset_peak()
+        solve(board)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "algorithm": algorithm,
+        "corpus": corpus,
+        "status": "ok",
+        "puzzles": len(boards),
+        "solved": solved,
+        "median_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "puzzles_per_sec": len(boards) / total if total else None,
+        "nodes_per_sec": nodes / total if total else None,
+        "peak_memory_kb": peak / 1024
+    }
+
+def _measure_worker(connection, algorithm, corpus, memory_sample):
+    connection.send(measure(algorithm, corpus, memory_sample))
+    connection.close()
+
+def run_cell(algorithm, corpus, memory_sample, timeout):
+    """Run measure() in a child process, giving up after timeout seconds."""
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_measure_worker, args=(sender, algorithm, corpus, memory_sample))
+    process.start()
+    sender.close()
+    if receiver.poll(timeout):
+        result = receiver.recv()
+        process.join()
+        return result
+    process.terminate()
+    process.join()
+    return {"algorithm": algorithm, "corpus": corpus, "status": "timeout"}
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def format_row(row):
+    if row["status"] != "ok":
+        return f"{row['algorithm']:<16} {row['corpus']:<9} {row['status']}"
+    return (f"{row['algorithm']:<16} {row['corpus']:<9} {row['solved']:>4}/{row['puzzles']:<4} "
+            f"{row['median_ms']:>10.2f} {row['p95_ms']:>10.2f} {row['puzzles_per_sec']:>10.1f} "
+            f"{row['nodes_per_sec']:>12.0f} {row['peak_memory_kb']:>10.1f}")
+
+def print_comparison(rows, baseline):
+    """Print the change of every compared field against an earlier report."""
+    previous = {(row["algorithm"], row["corpus"]): row for row in baseline["results"]}
+    print(f"\nChange vs {baseline.get('commit') or 'baseline'} (new / old):")
+    for row in rows:
+        old = previous.get((row["algorithm"], row["corpus"]))
+        if row["status"] != "ok" or not old or old["status"] != "ok":
+            continue
+        changes = []
+        for field, higher_is_better in COMPARED_FIELDS.items():
+            if row[field] and old[field]:
+                ratio = row[field] / old[field]
+                better = ratio > 1 if higher_is_better else ratio < 1
+                changes.append(f"{field} {ratio:.2f}x{'' if better or ratio == 1 else ' (worse)'}")
+        print(f"  {row['algorithm']:<16} {row['corpus']:<9} " + ", ".join(changes))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.bench", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--algorithms", default=",".join(SOLVERS),
+                        help="comma-separated algorithms (default: every registered solver)")
+    parser.add_argument("--corpora", default=",".join(DEFAULT_CORPORA),
+                        help=f"comma-separated corpora (available: {', '.join(available_corpora())})")
+    parser.add_argument("--cell-timeout", type=float, default=60.0,
+                        help="seconds allowed per algorithm and corpus (default: 60)")
+    parser.add_argument("--memory-sample", type=int, default=5,
+                        help="puzzles per corpus traced for peak memory (default: 5)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    algorithms = [name for name in args.algorithms.split(",") if name]
+    corpora = [name for name in args.corpora.split(",") if name]
+    unknown = [name for name in algorithms if name not in SOLVERS]
+    if unknown:
+        parser.error(f"unknown algorithms: {', '.join(unknown)}")
+    missing = [name for name in corpora if name not in available_corpora()]
+    if missing:
+        parser.error(f"unknown corpora: {', '.join(missing)}")
+
+    print(f"{'algorithm':<16} {'corpus':<9} {'solved':<9} {'median ms':>10} {'p95 ms':>10} "
+          f"{'puzzles/s':>10} {'nodes/s':>12} {'peak KiB':>10}")
+    rows = []
+    for algorithm in algorithms:
+        for corpus in corpora:
+            row = run_cell(algorithm, corpus, args.memory_sample, args.cell_timeout)
+            rows.append(row)
+            print(format_row(row), flush=True)
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cell_timeout": args.cell_timeout,
+        "results": rows
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(rows, json.load(f))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
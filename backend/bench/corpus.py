@@ -0,0 +1,17 @@
+import os
+from ..solver import parse_puzzles
+
+# Puzzle corpora bundled with the benchmarks, one 81-character puzzle per line
+CORPORA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpora")
+
+def available_corpora():
+    """Names of the bundled corpora."""
+    return sorted(name[:-4] for name in os.listdir(CORPORA_DIR) if name.endswith(".txt"))
+
+def load_corpus(name):
+    """Load a bundled corpus as a list of 9x9 boards."""
+    path = os.path.join(CORPORA_DIR, f"{name}.txt")
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown corpus: {name}. Available corpora: {', '.join(available_corpora())}")
+    with open(path) as f:
+        return parse_puzzles(f.read())
@@ -0,0 +1,77 @@
+"""
+Metrics overhead benchmark: cost of each counting level per event and per solve.
+
+Times a tight loop of count_node() calls, and one mixing count_node() with
+count_check() the way a backtracking search does, at every Metrics level
+against an empty loop, then times the solvers whose inner loops call
+the counters most (Naive, Degree, MRV by default) over a corpus at each
+level and reports them relative to level "off".
+
+    python -m backend.bench.metrics_overhead [--corpus sample] [--repeat 3]
+                                             [--algorithms Naive,Degree,MRV]
+"""
+import argparse
+from ..metrics import LEVELS, OFF, Metrics
+from ..solver import SOLVERS
+from .corpus import load_corpus
+from .timing import best_time
+
+# Events per per-event measurement
+EVENTS = 1_000_000
+
+# Checks per node in the mixed measurement, about what Naive issues
+CHECKS_PER_NODE = 9
+
+def node_loop(metrics):
+    for _ in range(EVENTS):
+        metrics.count_node()
+
+def mixed_loop(metrics):
+    # Attribute lookups on every call, as in the solvers, so swapped-out counters are seen
+    for _ in range(EVENTS // (CHECKS_PER_NODE + 1)):
+        metrics.count_node()
+        for _ in range(CHECKS_PER_NODE):
+            metrics.count_check()
+
+def empty_loop():
+    for _ in range(EVENTS // (CHECKS_PER_NODE + 1)):
+        for _ in range(CHECKS_PER_NODE + 1):
+            pass
+
+def event_overhead(level, loop, repeat):
+    """Nanoseconds per event of loop at this level, net of the cost of an empty loop."""
+    elapsed = best_time(lambda: loop(Metrics("Benchmark", level=level)), repeat)
+    return (elapsed - best_time(empty_loop, repeat)) / EVENTS * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default="sample", help="bundled corpus to run (default: sample)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, best is kept")
+    parser.add_argument("--algorithms", default="Naive,Degree,MRV",
+                        help="comma-separated solvers to time (default: Naive,Degree,MRV)")
+    args = parser.parse_args()
+
+    algorithms = [name for name in args.algorithms.split(",") if name]
+    unknown = [name for name in algorithms if name not in SOLVERS]
+    if unknown:
+        parser.error(f"unknown algorithms: {', '.join(unknown)}")
+    boards = load_corpus(args.corpus)
+
+    print(f"Per-event overhead, ns/event over {EVENTS} events "
+          f"(mixed: 1 count_node to {CHECKS_PER_NODE} count_check):")
+    print(f"  {'level':<9} {'count_node':>11} {'mixed':>9}")
+    for level in LEVELS:
+        print(f"  {level:<9} {event_overhead(level, node_loop, args.repeat):>11.1f} "
+              f"{event_overhead(level, mixed_loop, args.repeat):>9.1f}")
+
+    print(f"Full solves over {len(boards)} puzzles ({args.corpus}), ms and relative to '{OFF}':")
+    for name in algorithms:
+        solve = SOLVERS[name]
+        times = {}
+        for level in LEVELS:
+            times[level] = best_time(lambda: [solve(board, level=level) for board in boards], args.repeat)
+        print(f"  {name:<16} " + "  ".join(
+            f"{level} {times[level] * 1000:9.2f} ({times[level] / times[OFF]:.2f}x)" for level in LEVELS))
+
+if __name__ == "__main__":
+    main()
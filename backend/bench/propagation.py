@@ -0,0 +1,79 @@
+"""
+Constraint propagation benchmark: per-call neighbour sets vs. the PEERS table.
+
+Runs the all-arcs AC-3 pass that MAC performs before search over a fixed
+corpus, once rebuilding each cell's neighbour set for every queued arc (as
+forward_checking and mac used to) and once reading the import-time PEERS
+table, then times the ForwardChecking and MAC solvers on the same puzzles.
+
+    python -m backend.bench.propagation [--corpus sample] [--repeat 20]
+"""
+import argparse
+from collections import deque
+from ..algorithms import forward_checking, mac
+from ..algorithms.board_state import PEERS
+from .corpus import load_corpus
+from .timing import best_time
+
+def rebuilt_peers(cell):
+    """Neighbours of a cell as a fresh set of flat indices, rebuilt on every call."""
+    r, c = divmod(cell, 9)
+    related = set()
+    for j in range(9):
+        if j != c:
+            related.add(r * 9 + j)
+    for i in range(9):
+        if i != r:
+            related.add(i * 9 + c)
+    box_row, box_col = 3 * (r // 3), 3 * (c // 3)
+    for i in range(box_row, box_row + 3):
+        for j in range(box_col, box_col + 3):
+            if i != r or j != c:
+                related.add(i * 9 + j)
+    return related
+
+def table_peers(cell):
+    return PEERS[cell]
+
+def initial_arc_consistency(board, peers):
+    """MAC's initial AC-3 pass over all arcs, looking neighbours up with peers(cell)."""
+    domains = [{v} if v else set(range(1, 10)) for row in board for v in row]
+    queue = deque((cell, neighbor) for cell in range(81) for neighbor in peers(cell))
+    while queue:
+        xi, xj = queue.popleft()
+        if len(domains[xj]) == 1:
+            value = next(iter(domains[xj]))
+            if value in domains[xi]:
+                domains[xi].remove(value)
+                if not domains[xi]:
+                    return False
+                for xk in peers(xi):
+                    if xk != xj:
+                        queue.append((xk, xi))
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default="sample", help="bundled corpus to run (default: sample)")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement, best is kept")
+    args = parser.parse_args()
+
+    boards = load_corpus(args.corpus)
+
+    def ac3_with(peers):
+        return lambda: [initial_arc_consistency(board, peers) for board in boards]
+
+    rebuilt = best_time(ac3_with(rebuilt_peers), args.repeat)
+    table = best_time(ac3_with(table_peers), args.repeat)
+    print(f"Initial AC-3 over {len(boards)} puzzles ({args.corpus}):")
+    print(f"  rebuilt neighbour sets  {rebuilt * 1000:9.2f} ms")
+    print(f"  PEERS table             {table * 1000:9.2f} ms")
+    print(f"  speedup                 {rebuilt / table:9.2f}x")
+
+    print("Full solves:")
+    for name, solve in (("ForwardChecking", forward_checking.solve), ("MAC", mac.solve)):
+        elapsed = best_time(lambda: [solve(board) for board in boards], args.repeat)
+        print(f"  {name:<22}  {elapsed * 1000:9.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Scaling benchmark: how each solver's time and search effort grow with board order.
+
+Builds random puzzles for every board size (4x4 up to 25x25) by blanking a
+fraction of the cells of a shuffled complete grid, solves them with every
+algorithm under a per-solve time budget, and prints the median time and
+nodes per (algorithm, size) over the solved puzzles, with the number of
+solves that ran out of budget or failed alongside.
+
+    python -m backend.bench.scaling [--sizes 4,9,16,25] [--algorithms MRV,MAC]
+                                    [--puzzles 3] [--holes 0.5] [--max-time 10]
+"""
+import argparse
+import random
+import statistics
+import time
+from ..algorithms.board_state import SIZES, geometry
+from ..budget import Budget
+from ..solver import SOLVERS, run_solver
+
+def random_grid(size, rng):
+    """A complete size x size grid: the banded pattern grid with its rows, columns and digits shuffled."""
+    order = geometry(size).order
+
+    def line_order():
+        return [band * order + line for band in rng.sample(range(order), order)
+                for line in rng.sample(range(order), order)]
+
+    relabel = [0] + rng.sample(range(1, size + 1), size)
+    rows, cols = line_order(), line_order()
+    return [[relabel[(order * (r % order) + r // order + c) % size + 1] for c in cols] for r in rows]
+
+def random_puzzle(size, rng, holes):
+    """A random grid with the given fraction of its cells blanked (not necessarily unique)."""
+    board = random_grid(size, rng)
+    for cell in rng.sample(range(size * size), round(holes * size * size)):
+        board[cell // size][cell % size] = 0
+    return board
+
+def measure(algorithm, boards, max_time):
+    """Solve every board under a max_time budget, returning the row reported for this cell."""
+    times = []
+    nodes = []
+    exceeded = 0
+    failed = 0
+    for board in boards:
+        start = time.perf_counter()
+        _, metrics, success = run_solver(board, algorithm, Budget(max_time=max_time))
+        elapsed = time.perf_counter() - start
+        if metrics.get("status") == "budget_exceeded":
+            exceeded += 1
+            continue
+        if not success:
+            failed += 1
+            continue
+        times.append(elapsed)
+        nodes.append(metrics.get("nodes") or 0)
+    return {
+        "median_ms": statistics.median(times) * 1000 if times else None,
+        "median_nodes": statistics.median(nodes) if nodes else None,
+        "exceeded": exceeded,
+        "failed": failed
+    }
+
+def format_cell(row):
+    text = "-" if row["median_ms"] is None else f"{row['median_ms']:.1f} ms / {row['median_nodes']:.0f} nodes"
+    if row["exceeded"]:
+        text += f" ({row['exceeded']} over)"
+    if row["failed"]:
+        text += f" ({row['failed']} failed)"
+    return text
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help=f"comma-separated board sizes (default: {','.join(map(str, SIZES))})")
+    parser.add_argument("--algorithms", default=",".join(SOLVERS),
+                        help="comma-separated algorithms (default: every registered solver)")
+    parser.add_argument("--puzzles", type=int, default=3, help="puzzles per size (default: 3)")
+    parser.add_argument("--holes", type=float, default=0.5,
+                        help="fraction of cells blanked in each puzzle (default: 0.5)")
+    parser.add_argument("--max-time", type=float, default=10.0,
+                        help="seconds allowed per solve (default: 10)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the puzzles (default: 0)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    unsupported = [size for size in sizes if size not in SIZES]
+    if unsupported:
+        parser.error(f"unsupported sizes: {', '.join(map(str, unsupported))}")
+    algorithms = [name for name in args.algorithms.split(",") if name]
+    unknown = [name for name in algorithms if name not in SOLVERS]
+    if unknown:
+        parser.error(f"unknown algorithms: {', '.join(unknown)}")
+
+    rng = random.Random(args.seed)
+    boards = {size: [random_puzzle(size, rng, args.holes) for _ in range(args.puzzles)] for size in sizes}
+
+    print(f"Median solve time and nodes, {args.puzzles} puzzles per size with {args.holes:.0%} of "
+          f"cells blank, {args.max_time:g} s budget per solve:")
+    print(f"  {'algorithm':<16} " + "  ".join(f"{f'{size}x{size}':<32}" for size in sizes))
+    for algorithm in algorithms:
+        cells = []
+        for size in sizes:
+            cells.append(format_cell(measure(algorithm, boards[size], args.max_time)))
+        print(f"  {algorithm:<16} " + "  ".join(f"{cell:<32}" for cell in cells), flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Search engine benchmark: the shared iterative engine against recursion.
+
+Times every solver built on algorithms.search over a corpus twice, once
+with run_search switched to the explicit-stack depth_first engine and once
+to recursive_depth_first (its default for every supported board size),
+and reports the search nodes per second of each and their ratio. Both
+engines visit the same nodes, which is checked.
+
+    python -m backend.bench.search [--corpus hard] [--repeat 3]
+                                   [--algorithms MRV,DancingLinks]
+"""
+import argparse
+from ..algorithms import search
+from ..solver import SOLVERS
+from .corpus import load_corpus
+from .timing import best_time
+
+# Solvers whose search runs on algorithms.search (RandomRestart does too, but its
+# random value order makes the engines visit different nodes)
+DEFAULT_ALGORITHMS = ["MRV", "Combined", "ForwardChecking", "MAC", "DancingLinks", "Propagation"]
+
+ENGINES = {
+    "iterative": search.depth_first,
+    "recursive": search.recursive_depth_first
+}
+
+def run_engine(engine, solve, boards, repeat):
+    """Best time of solving every board with run_search switched to engine, and the nodes visited."""
+    previous = search.engine
+    search.engine = engine
+    try:
+        nodes = sum(solve(board)[1]["nodes"] for board in boards)
+        return best_time(lambda: [solve(board) for board in boards], repeat), nodes
+    finally:
+        search.engine = previous
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default="hard", help="bundled corpus to run (default: hard)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, best is kept")
+    parser.add_argument("--algorithms", default=",".join(DEFAULT_ALGORITHMS),
+                        help=f"comma-separated solvers to time (default: {','.join(DEFAULT_ALGORITHMS)})")
+    args = parser.parse_args()
+
+    algorithms = [name for name in args.algorithms.split(",") if name]
+    unknown = [name for name in algorithms if name not in SOLVERS]
+    if unknown:
+        parser.error(f"unknown algorithms: {', '.join(unknown)}")
+    boards = load_corpus(args.corpus)
+
+    print(f"Search nodes per second over {len(boards)} puzzles ({args.corpus}), best of {args.repeat}:")
+    print(f"  {'algorithm':<16} {'nodes':>9} " + " ".join(f"{name + ' nodes/s':>20}" for name in ENGINES)
+          + f" {'iterative/recursive':>20}")
+    for name in algorithms:
+        rates = {}
+        visited = set()
+        for engine_name, engine in ENGINES.items():
+            elapsed, nodes = run_engine(engine, SOLVERS[name], boards, args.repeat)
+            rates[engine_name] = nodes / elapsed if elapsed else 0.0
+            visited.add(nodes)
+        if len(visited) != 1:
+            raise SystemExit(f"{name}: the engines visited different numbers of nodes: {sorted(visited)}")
+        print(f"  {name:<16} {visited.pop():>9} " + " ".join(f"{rates[engine]:>20.0f}" for engine in ENGINES)
+              + f" {rates['iterative'] / rates['recursive']:>19.2f}x", flush=True)
+
+if __name__ == "__main__":
+    main()
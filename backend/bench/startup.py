@@ -0,0 +1,94 @@
+"""
+Startup benchmark: backend import time and first-solve latency in fresh processes.
+
+Each run starts a new interpreter that imports backend.app, optionally
+runs app.prepare_solvers() (prebuilt tables, or tables plus warm-up), and
+then solves one puzzle, timing each step. Reports the medians per mode and
+fails (exit status 1) if the median import time is over --target-ms or if
+importing the app loaded matplotlib.
+
+    python -m backend.bench.startup [--runs 5] [--target-ms 1500]
+                                    [--algorithm DancingLinks]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules importing backend.app must not load; /visualize imports matplotlib on first use
+HEAVY_MODULES = ("matplotlib",)
+
+# Environment of each mode; "cold" leaves every table to the first solve
+MODES = {
+    "cold": None,
+    "prebuilt": {"SOLVER_WARMUP": "0"},
+    "warm": {"SOLVER_WARMUP": "1"}
+}
+
+# Puzzle solved first in every run (the first puzzle of the sample corpus)
+FIRST_PUZZLE = "003020600900305001001806400008102900700000008006708200002609500800203009005010300"
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from backend import app
+imported = time.perf_counter()
+heavy = [name for name in {heavy!r} if name in sys.modules]
+if {prepare!r}:
+    app.prepare_solvers()
+prepared = time.perf_counter()
+from backend.solver import parse_puzzles, solve_sudoku_board
+_, _, success = solve_sudoku_board(parse_puzzles({puzzle!r})[0], {algorithm!r})
+solved = time.perf_counter()
+print(json.dumps({{"import_ms": (imported - start) * 1000, "prepare_ms": (prepared - imported) * 1000,
+                  "first_solve_ms": (solved - prepared) * 1000, "heavy": heavy, "success": success}}))
+"""
+
+def run_once(mode, algorithm):
+    """Time one fresh process in the given mode, returning the child's measurements."""
+    env = dict(os.environ)
+    if MODES[mode]:
+        env.update(MODES[mode])
+    code = CHILD.format(heavy=HEAVY_MODULES, prepare=MODES[mode] is not None, puzzle=FIRST_PUZZLE,
+                        algorithm=algorithm)
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per mode, median is kept")
+    parser.add_argument("--target-ms", type=float, default=1500.0,
+                        help="largest acceptable median import time of backend.app (default: 1500)")
+    parser.add_argument("--algorithm", default="DancingLinks", help="algorithm of the first solve")
+    args = parser.parse_args()
+
+    print(f"Medians over {args.runs} fresh processes, ms:")
+    print(f"  {'mode':<9} {'import':>8} {'prepare':>9} {'first solve':>12}")
+    failures = []
+    for mode in MODES:
+        runs = [run_once(mode, args.algorithm) for _ in range(args.runs)]
+        medians = {field: statistics.median(run[field] for run in runs)
+                   for field in ("import_ms", "prepare_ms", "first_solve_ms")}
+        print(f"  {mode:<9} {medians['import_ms']:>8.1f} {medians['prepare_ms']:>9.1f} "
+              f"{medians['first_solve_ms']:>12.1f}", flush=True)
+        heavy = sorted({name for run in runs for name in run["heavy"]})
+        if heavy:
+            failures.append(f"{mode}: importing backend.app loaded {', '.join(heavy)}")
+        if not all(run["success"] for run in runs):
+            failures.append(f"{mode}: the first solve failed")
+        if medians["import_ms"] > args.target_ms:
+            failures.append(f"{mode}: median import time {medians['import_ms']:.1f} ms "
+                            f"is over the {args.target_ms:g} ms target")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print(f"OK: backend.app imports in under {args.target_ms:g} ms without {' or '.join(HEAVY_MODULES)}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+import time
+
+def best_time(fn, repeat):
+    """Best wall-clock time of repeat runs of fn(), in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
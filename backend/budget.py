@@ -0,0 +1,69 @@
+import os
+
+class BudgetExceeded(Exception):
+    """Raised from inside a solver when its budget runs out."""
+
+    def __init__(self, reason, metrics):
+        super().__init__(f"Solver budget exceeded: {reason}")
+        self.reason = reason
+        self.metrics = metrics
+
+class Budget:
+    """
+    Resource limits for a single solve.
+    
+    Any limit left as None is not enforced. max_memory bounds the growth of
+    the process's resident memory during the solve, in bytes.
+    """
+    
+    # Wall time and memory are checked about every CHECK_PERIOD seconds of solver
+    # work; the node limit is exact. The number of nodes and ticks between checks
+    # adapts to their measured cost, up to MAX_CHECK_INTERVAL
+    CHECK_PERIOD = 0.005
+    MAX_CHECK_INTERVAL = 1024
+    
+    # Names of the limits, as accepted by from_dict
+    LIMITS = ("max_time", "max_nodes", "max_memory")
+    
+    def __init__(self, max_time=None, max_nodes=None, max_memory=None):
+        self.max_time = max_time
+        self.max_nodes = max_nodes
+        self.max_memory = max_memory
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a budget from a request's JSON object.
+        
+        Raises:
+            ValueError: If a limit is not a positive number
+        """
+        if not isinstance(data, dict):
+            raise ValueError("'budget' must be an object.")
+        limits = {}
+        for key in cls.LIMITS:
+            value = data.get(key)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                raise ValueError(f"Budget '{key}' must be a positive number.")
+            limits[key] = value
+        return cls(**limits)
+    
+    def to_dict(self):
+        return {"max_time": self.max_time, "max_nodes": self.max_nodes, "max_memory": self.max_memory}
+
+def current_memory():
+    """Resident memory of this process in bytes, or None where it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS, in KiB on Linux and bytes on macOS
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if os.uname().sysname == "Darwin" else usage * 1024
+    except (ImportError, AttributeError):
+        return None
@@ -0,0 +1,158 @@
+import threading
+from collections import OrderedDict
+from itertools import groupby, permutations, product
+
+# Number of canonical solutions kept by the shared cache
+DEFAULT_CACHE_SIZE = 10000
+
+# Maximum line arrangements tried per orientation when canonicalizing a board
+MAX_TIE_CANDIDATES = 256
+
+class SolutionCache:
+    """Thread-safe LRU map from canonical puzzle strings to canonical solutions."""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached solution for key, or None on a miss."""
+        with self._lock:
+            solution = self._entries.get(key)
+            if solution is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return solution
+
+    def put(self, key, solution):
+        with self._lock:
+            self._entries[key] = solution
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_evictions": self.evictions,
+            "cache_size": len(self._entries)
+        }
+
+class Transform:
+    """
+    A Sudoku symmetry: optional transposition, then a row and column
+    permutation that keeps bands and stacks together, then a digit relabeling.
+    """
+
+    def __init__(self, transpose, row_order, col_order, relabel):
+        self.transpose = transpose
+        self.row_order = row_order  # row_order[i] is the source row of row i
+        self.col_order = col_order  # col_order[j] is the source column of column j
+        self.relabel = relabel      # relabel[d] is the new label of digit d (relabel[0] == 0)
+
+    def apply(self, board):
+        """Map a board from the caller's orientation into canonical form."""
+        grid = [list(col) for col in zip(*board)] if self.transpose else board
+        relabel = self.relabel
+        return [[relabel[grid[r][c]] for c in self.col_order] for r in self.row_order]
+
+    def invert(self, board):
+        """Map a canonical board back into the caller's orientation."""
+        unlabel = [0] * 10
+        for digit, label in enumerate(self.relabel):
+            unlabel[label] = digit
+        grid = [[0] * 9 for _ in range(9)]
+        for i, r in enumerate(self.row_order):
+            for j, c in enumerate(self.col_order):
+                grid[r][c] = unlabel[board[i][j]]
+        return [list(col) for col in zip(*grid)] if self.transpose else grid
+
+def _tied_permutations(items, key):
+    """All orderings of items sorted by key, permuting only items whose keys tie."""
+    items = sorted(items, key=key)
+    groups = [list(group) for _, group in groupby(items, key=key)]
+    return [[item for part in parts for item in part]
+            for parts in product(*(permutations(group) for group in groups))]
+
+def _line_orders(keys):
+    """Candidate orders of the nine lines of one axis, keeping bands (or stacks) together."""
+    band_orders = _tied_permutations(range(3), lambda b: sorted(keys[3 * b:3 * b + 3]))
+    line_orders = [_tied_permutations(range(3 * b, 3 * b + 3), lambda i: keys[i]) for b in range(3)]
+    return [[line for part in parts for line in part]
+            for bands in band_orders
+            for parts in product(*(line_orders[b] for b in bands))]
+
+def _relabeled_key(grid, row_order, col_order):
+    """Canonical string of a rearranged grid, relabeling digits by first appearance."""
+    relabel = [0] * 10
+    next_label = 1
+    cells = []
+    for r in row_order:
+        row = grid[r]
+        for c in col_order:
+            d = row[c]
+            if d and not relabel[d]:
+                relabel[d] = next_label
+                next_label += 1
+            cells.append(relabel[d])
+    return ''.join(map(str, cells)), relabel
+
+def _canonical_candidate(grid, transpose):
+    # Line keys only depend on which cells hold givens per band/stack, so they
+    # are unchanged by digit relabeling and by permutations of the other axis
+    row_keys = [(sum(1 for v in grid[r] if v),
+                 sorted(sum(1 for v in grid[r][3 * s:3 * s + 3] if v) for s in range(3)))
+                for r in range(9)]
+    col_keys = [(sum(1 for r in range(9) if grid[r][c]),
+                 sorted(sum(1 for r in range(3 * b, 3 * b + 3) if grid[r][c]) for b in range(3)))
+                for c in range(9)]
+    row_orders = _line_orders(row_keys)
+    col_orders = _line_orders(col_keys)
+
+    # Lines that tie on their keys are resolved by trying every arrangement of
+    # them, unless there are too many; then the first arrangement is kept
+    if len(row_orders) * len(col_orders) > MAX_TIE_CANDIDATES:
+        row_orders, col_orders = row_orders[:1], col_orders[:1]
+
+    best = None
+    for row_order in row_orders:
+        for col_order in col_orders:
+            key, relabel = _relabeled_key(grid, row_order, col_order)
+            if best is None or key < best[0]:
+                best = (key, row_order, col_order, relabel)
+
+    key, row_order, col_order, relabel = best
+    # Digits absent from the puzzle take the remaining labels in ascending order
+    next_label = max(relabel) + 1
+    for d in range(1, 10):
+        if not relabel[d]:
+            relabel[d] = next_label
+            next_label += 1
+    return key, Transform(transpose, row_order, col_order, relabel)
+
+def canonicalize(board):
+    """
+    Reduce a board to a canonical form under the Sudoku symmetry group.
+
+    Bands, stacks and the lines inside them are ordered by given-count
+    invariants, lines that tie are arranged to give the smallest string,
+    digits are relabeled by first appearance, and the smaller of the board
+    and its transpose is kept. Boards with too many ties to enumerate may
+    still canonicalize differently from their variants; that only costs a
+    cache miss, since the returned transform always maps exactly between
+    the two forms.
+
+    Returns:
+        Tuple (key, transform) where key is the canonical 81-character string
+    """
+    transposed = [list(col) for col in zip(*board)]
+    return min(_canonical_candidate(board, False), _canonical_candidate(transposed, True),
+               key=lambda candidate: candidate[0])
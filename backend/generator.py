@@ -0,0 +1,255 @@
+"""
+Puzzle generator with a uniqueness guarantee and effort-based grading.
+
+generate_candidate digs givens out of a random complete grid one at a time,
+keeping a removal only while DancingLinks in count mode still finds exactly
+one solution. grade_puzzle rates a puzzle by the work the Propagation
+solver needs for it: which of its inference rules have to fire, and whether
+search is still needed once they stop. Below the requested difficulty's
+target number of givens, every removal is graded: digging stops once the
+puzzle grades as requested, and removals that would make it grade harder
+are put back. The grade is what the puzzle is labelled with.
+
+PuzzlePool keeps a stock of graded puzzles per difficulty, refilled by a
+background thread, so serving a puzzle is a deque pop.
+"""
+import random
+import threading
+from collections import deque
+from .algorithms import dancing_links, propagation
+from .cache import Transform
+from .metrics import OFF
+
+# Difficulty levels, easiest first (the same names as the client generator)
+DIFFICULTIES = ("Easy", "Medium", "Hard", "Expert")
+
+# Givens left before digging for each difficulty starts grading its removals.
+# Dug to a fixed count, at most about 15% of puzzles grade Hard whatever the
+# count, and random digging rarely gets below 24 givens. With the grading
+# steering the rest of the dig, candidates grade as requested about 98%
+# (Easy), 90% (Medium), 20-30% (Hard) and 35% (Expert) of the time.
+TARGET_GIVENS = {"Easy": 40, "Medium": 32, "Hard": 30, "Expert": 26}
+
+# Propagation rules beyond singles; a puzzle needing any of them is at least Hard
+ADVANCED_RULES = ("naked_pairs", "hidden_pairs", "pointing", "claiming")
+
+# Candidates generate_puzzle tries before settling for an off-grade one
+MAX_ATTEMPTS = 20
+
+# Graded puzzles kept per difficulty, and puzzles generated per second, by PuzzlePool
+DEFAULT_POOL_SIZE = 20
+DEFAULT_RATE = 1.0
+
+def random_solution(rng):
+    """
+    A random complete grid.
+
+    Fills the three diagonal boxes, which constrain nothing between them,
+    with shuffled digits, completes the grid with DancingLinks and applies a
+    random symmetry so every cell of the result is randomized.
+    """
+    board = [[0] * 9 for _ in range(9)]
+    for box in (0, 3, 6):
+        digits = rng.sample(range(1, 10), 9)
+        for i in range(9):
+            board[box + i // 3][box + i % 3] = digits[i]
+    solution, _, _ = dancing_links.solve(board, level=OFF)
+
+    def line_order():
+        return [band * 3 + line for band in rng.sample(range(3), 3) for line in rng.sample(range(3), 3)]
+
+    relabel = [0] + rng.sample(range(1, 10), 9)
+    return Transform(rng.random() < 0.5, line_order(), line_order(), relabel).apply(solution)
+
+def has_unique_solution(board):
+    """True if board has exactly one solution."""
+    _, metrics, _ = dancing_links.solve(board, level=OFF, max_solutions=2)
+    return metrics["solutions"] == 1
+
+def dig(solution, rng, target_givens, grade_as=None):
+    """
+    Remove givens from a complete grid in random order while the puzzle stays unique.
+
+    Args:
+        solution: Complete grid to dig
+        rng: random.Random choosing the order of the removals
+        target_givens: Givens to dig down to
+        grade_as: Optional difficulty to steer towards. Removals that leave
+            target_givens or fewer givens are graded: digging stops at the
+            first puzzle graded grade_as, and a removal that makes the
+            puzzle grade harder than that is put back.
+
+    Returns:
+        The puzzle, with target_givens givens (or, with grade_as, as many as
+        it took to reach that grade) or, if no further given can be removed
+        before then, as few as uniqueness and the grade allow
+    """
+    rank = DIFFICULTIES.index(grade_as) if grade_as is not None else None
+    puzzle = [row[:] for row in solution]
+    givens = 81
+    cells = list(range(81))
+    rng.shuffle(cells)
+    for cell in cells:
+        if givens <= target_givens and rank is None:
+            break
+        r, c = divmod(cell, 9)
+        digit = puzzle[r][c]
+        puzzle[r][c] = 0
+        if not has_unique_solution(puzzle):
+            puzzle[r][c] = digit
+            continue
+        if rank is not None and givens - 1 <= target_givens:
+            graded = DIFFICULTIES.index(grade_puzzle(puzzle)[0])
+            if graded > rank:
+                puzzle[r][c] = digit
+                continue
+            if graded == rank:
+                break
+        givens -= 1
+    return puzzle
+
+def grade_puzzle(puzzle):
+    """
+    Grade a puzzle by the effort the Propagation solver spends on it.
+
+    Easy puzzles fall to naked singles alone, Medium ones also need hidden
+    singles, Hard ones need pairs or pointing/claiming, and Expert ones need
+    search once the rules are exhausted.
+
+    Returns:
+        Tuple (difficulty, grade) where grade holds the givens, the search
+        nodes and backtracks, and the firings of every rule
+    """
+    _, metrics, _ = propagation.solve(puzzle)
+    grade = {
+        "givens": sum(1 for row in puzzle for cell in row if cell),
+        "nodes": metrics["nodes"],
+        "backtracks": metrics["backtracks"],
+        **{rule: metrics[rule] for rule in propagation.RULES}
+    }
+    if metrics["nodes"] > 1:
+        difficulty = "Expert"
+    elif any(metrics[rule] for rule in ADVANCED_RULES):
+        difficulty = "Hard"
+    elif metrics["hidden_singles"]:
+        difficulty = "Medium"
+    else:
+        difficulty = "Easy"
+    return difficulty, grade
+
+def generate_candidate(difficulty, rng):
+    """
+    Generate one unique puzzle dug for difficulty, graded as whatever it turned out to be.
+
+    Returns:
+        Dict with the puzzle, its solution, its graded difficulty and the grade details
+    """
+    solution = random_solution(rng)
+    puzzle = dig(solution, rng, TARGET_GIVENS[difficulty], difficulty)
+    graded, grade = grade_puzzle(puzzle)
+    return {"puzzle": puzzle, "solution": solution, "difficulty": graded, "grade": grade}
+
+def generate_puzzle(difficulty, rng=None, max_attempts=MAX_ATTEMPTS):
+    """
+    Generate a unique puzzle of the given difficulty.
+
+    Args:
+        difficulty: One of DIFFICULTIES
+        rng: Optional random.Random to draw from
+        max_attempts: Candidates to try; if none grades as difficulty, the
+            last one is returned with its actual grade
+
+    Returns:
+        Dict as returned by generate_candidate
+
+    Raises:
+        ValueError: If difficulty is unknown
+    """
+    if difficulty not in TARGET_GIVENS:
+        raise ValueError(f"Unknown difficulty: {difficulty}. Available difficulties: {', '.join(DIFFICULTIES)}")
+    rng = rng or random.Random()
+    for _ in range(max_attempts):
+        candidate = generate_candidate(difficulty, rng)
+        if candidate["difficulty"] == difficulty:
+            break
+    return candidate
+
+class PuzzlePool:
+    """
+    Pre-generated puzzles per difficulty, refilled by a background thread.
+
+    The thread works on the difficulty with the fewest puzzles in stock,
+    files each candidate under its graded difficulty if that pool has room,
+    and sleeps while every pool is full. rate caps the puzzles it generates
+    per second, so refilling leaves CPU time for the solve endpoints.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, rate=DEFAULT_RATE, seed=None):
+        self.size = size
+        self.rate = rate
+        self._rng = random.Random(seed)
+        self._pools = {difficulty: deque() for difficulty in DIFFICULTIES}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the refill thread if it is not already running."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refill, name="puzzle-pool", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join()
+
+    def take(self, difficulty):
+        """
+        Pop a pooled puzzle of the given difficulty.
+
+        Returns:
+            Dict as returned by generate_candidate, or None if that pool is empty
+
+        Raises:
+            ValueError: If difficulty is unknown
+        """
+        if difficulty not in self._pools:
+            raise ValueError(f"Unknown difficulty: {difficulty}. Available difficulties: {', '.join(DIFFICULTIES)}")
+        with self._lock:
+            pool = self._pools[difficulty]
+            puzzle = pool.popleft() if pool else None
+        self._wake.set()
+        return puzzle
+
+    def sizes(self):
+        with self._lock:
+            return {difficulty: len(pool) for difficulty, pool in self._pools.items()}
+
+    def _most_needed(self):
+        """The difficulty with the fewest pooled puzzles, or None if every pool is full."""
+        with self._lock:
+            difficulty = min(DIFFICULTIES, key=lambda name: len(self._pools[name]))
+            return difficulty if len(self._pools[difficulty]) < self.size else None
+
+    def _refill(self):
+        while not self._stop.is_set():
+            difficulty = self._most_needed()
+            if difficulty is None:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            candidate = generate_candidate(difficulty, self._rng)
+            with self._lock:
+                pool = self._pools[candidate["difficulty"]]
+                if len(pool) < self.size:
+                    pool.append(candidate)
+            if self.rate:
+                self._stop.wait(1 / self.rate)
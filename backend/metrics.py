@@ -1,5 +1,46 @@
+import time
+from .budget import Budget, BudgetExceeded, current_memory
+
+# Counting levels: every event, one node in SAMPLE_EVERY (extrapolated), or nothing
+FULL = "full"
+SAMPLED = "sampled"
+OFF = "off"
+LEVELS = (FULL, SAMPLED, OFF)
+SAMPLE_EVERY = 16
+
+# Board side length assumed unless a solver reports another with set_board_size
+STANDARD_SIZE = 9
+
+# Counters other than nodes, which the levels below FULL sample or skip
+EVENT_COUNTERS = ("backtracks", "prunes", "checks", "assignments")
+
 class Metrics:
-    def __init__(self, algorithm_name):
+    """
+    Search counters of one solve.
+    
+    Metrics(..., level=...) builds the class for the requested counting level,
+    so the solvers' count_* call sites are the same at every level:
+    
+    - FULL (this class) records every event.
+    - SAMPLED records every node, but the other events only while one node in
+      SAMPLE_EVERY is being expanded, and extrapolates them to the whole
+      search. Events before the first node (setup, initial propagation) are
+      counted in full.
+    - OFF records nothing and reports the counters as None, except that nodes
+      are still counted when a budget or progress listener needs them.
+    """
+    
+    level = FULL
+    
+    def __new__(cls, algorithm_name, budget=None, progress=None, level=None):
+        if cls is Metrics:
+            level = level or FULL
+            if level not in LEVEL_CLASSES:
+                raise ValueError(f"Unknown metrics level: {level}. Available levels: {', '.join(LEVELS)}")
+            cls = LEVEL_CLASSES[level]
+        return super().__new__(cls)
+    
+    def __init__(self, algorithm_name, budget=None, progress=None, level=None):
         self.algorithm = algorithm_name
         self.time = 0.0
         self.nodes = 0
@@ -8,9 +49,122 @@ class Metrics:
         self.checks = 0
         self.assignments = 0
         self.extra = {}  # For algorithm-specific metrics
+        self.budget = budget
+        self.progress = progress
+        # count_node only leaves its fast path when someone watches the search
+        self._watched = budget is not None or progress is not None
+        self._board_source = None
+        self._givens = 0
+        self.board_size = STANDARD_SIZE
+        # Nanoseconds spent in each phase of the solve (see start_phase)
+        self.phases = {}
+        self._phase = None
+        self._phase_start = None
+        self._clock_start = None
+        if self._watched:
+            self._start = time.perf_counter()
+            self._start_memory = current_memory() if budget is not None and budget.max_memory is not None else None
+            # Nodes and ticks left until the next time and memory check, and how many to allow after it
+            self._check_countdown = 1
+            self._check_interval = 1
+            self._last_check = self._start
     
     def count_node(self):
         self.nodes += 1
+        if self._watched:
+            self._on_node()
+    
+    def _on_node(self):
+        if self.budget is not None:
+            self.check_budget()
+        if self.progress is not None and self.nodes % self.progress.every == 0:
+            self.report_progress()
+    
+    def check_budget(self):
+        """Raise BudgetExceeded if the solve has used up its budget."""
+        budget = self.budget
+        if budget.max_nodes is not None and self.nodes > budget.max_nodes:
+            raise BudgetExceeded("max_nodes", self)
+        self._check_countdown -= 1
+        if not self._check_countdown:
+            self.check_limits()
+    
+    def tick(self):
+        """
+        Count a unit of work done outside the search nodes towards the budget's checks.
+        
+        Solvers call it from setup and propagation loops, which can run for a
+        long time between two nodes; without a budget it does nothing.
+        """
+        if self.budget is not None:
+            self._check_countdown -= 1
+            if not self._check_countdown:
+                self.check_limits()
+    
+    def check_limits(self):
+        """
+        Check the wall time and memory limits now, raising BudgetExceeded if one is exceeded.
+        
+        Then schedule the next check: the nodes and ticks allowed until then are
+        scaled so that, at the rate they went since the last check, it comes
+        about Budget.CHECK_PERIOD seconds from now. The count at most doubles
+        per check, so a run of cheap ticks cannot postpone the check much when
+        expensive ones follow.
+        """
+        budget = self.budget
+        now = time.perf_counter()
+        if budget.max_time is not None and now - self._start > budget.max_time:
+            raise BudgetExceeded("max_time", self)
+        if budget.max_memory is not None and self._start_memory is not None:
+            memory = current_memory()
+            if memory is not None and memory - self._start_memory > budget.max_memory:
+                raise BudgetExceeded("max_memory", self)
+        
+        interval = self._check_interval
+        since = now - self._last_check
+        scaled = round(interval * Budget.CHECK_PERIOD / since) if since > 0 else 2 * interval
+        self._check_interval = max(1, min(scaled, 2 * interval, Budget.MAX_CHECK_INTERVAL))
+        self._check_countdown = self._check_interval
+        self._last_check = now
+    
+    def set_board_size(self, size):
+        """Record the side length of the board being solved (reported when not 9)."""
+        self.board_size = size
+    
+    def set_board_source(self, get_board):
+        """
+        Register a function returning the solver's current partial board.
+        
+        It is only called when a progress event goes out; the cells filled at
+        registration are taken as the givens when computing the search depth.
+        """
+        self._board_source = get_board
+        if self.progress is not None:
+            self._givens = sum(1 for row in get_board() for cell in row if cell)
+    
+    def report_progress(self):
+        """Send a progress event to the listener, or stop the solve if it was cancelled."""
+        progress = self.progress
+        if progress.cancelled:
+            raise BudgetExceeded("cancelled", self)
+        if not progress.wants_event():
+            return
+        event = {
+            "algorithm": self.algorithm,
+            "nodes": self.nodes,
+            "backtracks": self.backtracks,
+            "assignments": self.assignments,
+            "elapsed": self.elapsed()
+        }
+        if self._board_source is not None:
+            board = [row[:] for row in self._board_source()]
+            event["depth"] = sum(1 for row in board for cell in row if cell) - self._givens
+            event["board"] = board
+        progress.emit(event)
+    
+    def elapsed(self):
+        """Seconds since the metrics were created, when a budget or listener is attached."""
+        return time.perf_counter() - self._start
     
     def count_backtrack(self):
         self.backtracks += 1
@@ -27,18 +181,145 @@ class Metrics:
     def set_time(self, time_in_seconds):
         self.time = time_in_seconds
     
+    def start_phase(self, name):
+        """
+        End the current phase, if any, and start timing phase name.
+        
+        Solvers use "setup", "propagation", "search" and "decode"; a phase
+        entered several times accumulates. The first call also starts the
+        clock that finish() reads for the total time.
+        """
+        now = time.perf_counter_ns()
+        if self._phase is not None:
+            self.phases[self._phase] = self.phases.get(self._phase, 0) + now - self._phase_start
+        elif self._clock_start is None:
+            self._clock_start = now
+        self._phase = name
+        self._phase_start = now
+    
+    def end_phase(self):
+        """Stop timing the current phase."""
+        if self._phase is not None:
+            now = time.perf_counter_ns()
+            self.phases[self._phase] = self.phases.get(self._phase, 0) + now - self._phase_start
+            self._phase = None
+    
+    def add_phase_time(self, name, nanoseconds):
+        """Add time measured elsewhere (e.g. a share of a batch) to a phase."""
+        self.phases[name] = self.phases.get(name, 0) + nanoseconds
+    
+    def finish(self):
+        """End the current phase and set the total time since the first start_phase()."""
+        self.end_phase()
+        if self._clock_start is not None:
+            self.time = (time.perf_counter_ns() - self._clock_start) / 1e9
+    
     def add_extra(self, key, value):
         self.extra[key] = value
     
+    def counters(self):
+        """Node and event counters as recorded at this level."""
+        return {"nodes": self.nodes, **{name: getattr(self, name) for name in EVENT_COUNTERS}}
+    
     def to_dict(self):
         result = {
             "algorithm": self.algorithm,
             "time": self.time,
-            "nodes": self.nodes,
-            "backtracks": self.backtracks,
-            "prunes": self.prunes,
-            "checks": self.checks,
-            "assignments": self.assignments
+            **self.counters()
         }
+        if self.phases:
+            result["phases"] = {name: ns / 1e9 for name, ns in self.phases.items()}
+        if self.level != FULL:
+            result["metrics_level"] = self.level
+        if self.board_size != STANDARD_SIZE:
+            result["board_size"] = self.board_size
         result.update(self.extra)
         return result
+
+class SampledMetrics(Metrics):
+    """Metrics at level SAMPLED; see Metrics."""
+    
+    level = SAMPLED
+    
+    def __init__(self, algorithm_name, budget=None, progress=None, level=None):
+        super().__init__(algorithm_name, budget, progress)
+        self._recording = True
+        self._countdown = 1  # Nodes until the next sampled one; the first node is sampled
+        self._sampled_nodes = 0
+        self._setup_counts = None
+    
+    def count_node(self):
+        self.nodes += 1
+        self._countdown -= 1
+        if not self._countdown:
+            self._start_sample()
+        elif self._recording:
+            self._recording = False
+        if self._watched:
+            self._on_node()
+    
+    def _start_sample(self):
+        """Record the events of the node being expanded; called for one node in SAMPLE_EVERY."""
+        if self._setup_counts is None:
+            self._setup_counts = {name: getattr(self, name) for name in EVENT_COUNTERS}
+        self._sampled_nodes += 1
+        self._countdown = SAMPLE_EVERY
+        self._recording = True
+    
+    def count_backtrack(self):
+        if self._recording:
+            self.backtracks += 1
+    
+    def count_prune(self):
+        if self._recording:
+            self.prunes += 1
+    
+    def count_check(self):
+        if self._recording:
+            self.checks += 1
+    
+    def count_assignment(self):
+        if self._recording:
+            self.assignments += 1
+    
+    def counters(self):
+        """Node counts, with the other events extrapolated from the sampled nodes."""
+        counts = super().counters()
+        if self._sampled_nodes:
+            scale = self.nodes / self._sampled_nodes
+            for name, setup in self._setup_counts.items():
+                counts[name] = setup + round((counts[name] - setup) * scale)
+        return counts
+    
+    def to_dict(self):
+        result = super().to_dict()
+        result["sample_every"] = SAMPLE_EVERY
+        return result
+
+class OffMetrics(Metrics):
+    """Metrics at level OFF; see Metrics."""
+    
+    level = OFF
+    
+    def count_node(self):
+        if self._watched:
+            self.nodes += 1
+            self._on_node()
+    
+    def count_backtrack(self):
+        pass
+    
+    def count_prune(self):
+        pass
+    
+    def count_check(self):
+        pass
+    
+    def count_assignment(self):
+        pass
+    
+    def counters(self):
+        """None for every counter, except nodes when they were counted for a budget or listener."""
+        return {"nodes": self.nodes if self._watched else None, **dict.fromkeys(EVENT_COUNTERS)}
+
+LEVEL_CLASSES = {FULL: Metrics, SAMPLED: SampledMetrics, OFF: OffMetrics}
@@ -0,0 +1,363 @@
+import atexit
+import csv
+import json
+import os
+import queue
+import sqlite3
+import threading
+from .stats import TOTALED_METRICS, RollingStats
+
+# Metrics stored in their own columns; anything else a solver reports goes into the extra JSON column
+METRIC_COLUMNS = ['time', 'nodes', 'backtracks', 'prunes', 'checks', 'assignments']
+
+class MetricsStore:
+    """
+    Interface for persisting solver metrics.
+
+    Rows are the metrics dicts returned by the solvers plus a 'difficulty' label.
+    """
+
+    def add(self, metrics, difficulty):
+        self.add_many([metrics], difficulty)
+
+    def add_many(self, metrics_list, difficulty):
+        raise NotImplementedError
+
+    def query(self, algorithm=None, difficulty=None, limit=100, after=None):
+        """
+        Return stored rows in insertion order.
+
+        Args:
+            algorithm: Only return rows for this algorithm
+            difficulty: Only return rows with this difficulty label
+            limit: Maximum number of rows, or None for all matching rows
+            after: Only return rows whose id is greater than this cursor
+
+        Returns:
+            List of metrics dicts, each with an 'id' usable as the next cursor
+        """
+        raise NotImplementedError
+
+    def summarize(self):
+        """
+        Aggregate the stored rows per (algorithm, difficulty).
+
+        Returns:
+            List of dicts with the algorithm, the difficulty, the row count and
+            the mean of every METRIC_COLUMNS metric (None where no row has it)
+        """
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """A value that changes whenever rows are added, for caching what is derived from them."""
+        raise NotImplementedError
+
+    def stats(self, algorithm=None, difficulty=None):
+        """
+        Rolling per-(algorithm, difficulty) statistics of the stored rows.
+
+        Args:
+            algorithm: Only return the groups of this algorithm
+            difficulty: Only return the groups with this difficulty label
+
+        Returns:
+            List of dicts as returned by stats.RollingStats.snapshot
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        """Block until every row added so far is persisted."""
+
+    def close(self):
+        self.flush()
+
+class SQLiteMetricsStore(MetricsStore):
+    """
+    Metrics store backed by SQLite in WAL mode.
+
+    Writes are queued and committed in batches by a background thread, so the
+    request path never waits on disk. Rows are indexed by algorithm and
+    difficulty, and queries page with an id cursor instead of OFFSET so every
+    page is an index range scan.
+
+    The rolling statistics live in the database as well: the writer adds
+    the rows it inserts to the stats_groups and stats_buckets aggregates in
+    the same transaction, and stats_state records the last row they cover.
+    Every process sharing the database therefore reports the same
+    statistics, and stats() only reads the aggregates. Rows stored before
+    the aggregates existed are added by the writer at startup, BATCH_SIZE at
+    a time between writes, so neither opening the store nor a request scans
+    the history.
+    """
+
+    # Maximum number of queued rows committed in one transaction
+    BATCH_SIZE = 1000
+
+    def __init__(self, path, legacy_csv=None):
+        self.path = path
+        self._queue = queue.Queue()
+        self._local = threading.local()
+
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                algorithm TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                time REAL,
+                nodes INTEGER,
+                backtracks INTEGER,
+                prunes INTEGER,
+                checks INTEGER,
+                assignments INTEGER,
+                extra TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_metrics_algorithm ON metrics (algorithm, id);
+            CREATE INDEX IF NOT EXISTS idx_metrics_difficulty ON metrics (difficulty, id);
+            CREATE INDEX IF NOT EXISTS idx_metrics_algorithm_difficulty ON metrics (algorithm, difficulty, id);
+            CREATE TABLE IF NOT EXISTS stats_groups (
+                algorithm TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                timed INTEGER NOT NULL,
+                time_sum REAL NOT NULL,
+                zeros INTEGER NOT NULL,
+                nodes INTEGER NOT NULL,
+                backtracks INTEGER NOT NULL,
+                prunes INTEGER NOT NULL,
+                PRIMARY KEY (algorithm, difficulty)
+            );
+            CREATE TABLE IF NOT EXISTS stats_buckets (
+                algorithm TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (algorithm, difficulty, bucket)
+            );
+            CREATE TABLE IF NOT EXISTS stats_state (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                last_id INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO stats_state (id, last_id) VALUES (0, 0);
+        """)
+        empty = conn.execute("SELECT NOT EXISTS (SELECT 1 FROM metrics)").fetchone()[0]
+        if empty and legacy_csv and os.path.exists(legacy_csv):
+            self._import_csv(conn, legacy_csv)
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def add_many(self, metrics_list, difficulty):
+        for metrics in metrics_list:
+            self._queue.put(self._to_row(metrics, difficulty))
+
+    def query(self, algorithm=None, difficulty=None, limit=100, after=None):
+        clauses = []
+        params = []
+        if algorithm is not None:
+            clauses.append("algorithm = ?")
+            params.append(algorithm)
+        if difficulty is not None:
+            clauses.append("difficulty = ?")
+            params.append(difficulty)
+        if after is not None:
+            clauses.append("id > ?")
+            params.append(after)
+
+        sql = "SELECT id, algorithm, difficulty, " + ", ".join(METRIC_COLUMNS) + ", extra FROM metrics"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return [self._from_row(row) for row in self._reader().execute(sql, params)]
+
+    def summarize(self):
+        sql = ("SELECT algorithm, difficulty, COUNT(*), " + ", ".join(f"AVG({column})" for column in METRIC_COLUMNS) +
+               " FROM metrics GROUP BY algorithm, difficulty ORDER BY algorithm, difficulty")
+        summaries = []
+        for algorithm, difficulty, count, *means in self._reader().execute(sql):
+            summary = {"algorithm": algorithm, "difficulty": difficulty, "count": count}
+            summary.update(zip(METRIC_COLUMNS, means))
+            summaries.append(summary)
+        return summaries
+
+    def fingerprint(self):
+        # Rows are only ever appended, so the last id identifies the contents
+        return self._reader().execute("SELECT MAX(id) FROM metrics").fetchone()[0]
+
+    def stats(self, algorithm=None, difficulty=None):
+        clauses = []
+        params = []
+        if algorithm is not None:
+            clauses.append("algorithm = ?")
+            params.append(algorithm)
+        if difficulty is not None:
+            clauses.append("difficulty = ?")
+            params.append(difficulty)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+
+        stats = RollingStats()
+        conn = self._reader()
+        # One read transaction, so the groups and their buckets are from the same commit
+        conn.execute("BEGIN")
+        try:
+            sql = ("SELECT algorithm, difficulty, count, timed, time_sum, zeros, " + ", ".join(TOTALED_METRICS) +
+                   " FROM stats_groups" + where)
+            for algorithm_, difficulty_, count, timed, time_sum, zeros, *totals in conn.execute(sql, params):
+                aggregate = stats.aggregate(algorithm_, difficulty_)
+                aggregate.count = count
+                aggregate.time_sum = time_sum
+                aggregate.times.count = timed
+                aggregate.times.zeros = zeros
+                aggregate.totals = dict(zip(TOTALED_METRICS, totals))
+            for algorithm_, difficulty_, bucket, count in conn.execute(
+                    "SELECT algorithm, difficulty, bucket, count FROM stats_buckets" + where, params):
+                stats.aggregate(algorithm_, difficulty_).times.buckets[bucket] = count
+        finally:
+            conn.rollback()
+        return stats.snapshot()
+
+    def flush(self):
+        self._queue.join()
+
+    def _reader(self):
+        """Per-thread read connection (sqlite3 connections cannot be shared across threads)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _write_loop(self):
+        # Transactions are begun explicitly, IMMEDIATE so that processes sharing
+        # the database take turns adding rows to the aggregates
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Until the aggregates cover every stored row, each pass adds a batch of
+        # the older rows instead of waiting for new ones
+        behind = True
+        while True:
+            # Block for the first row, then drain whatever else is already queued
+            rows = []
+            try:
+                rows.append(self._queue.get(block=not behind))
+            except queue.Empty:
+                pass
+            while rows and len(rows) < self.BATCH_SIZE:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._insert(conn, rows)
+                    # The rows just inserted plus at most a batch of older ones
+                    limit = len(rows) + self.BATCH_SIZE
+                    behind = self._aggregate(conn, limit) == limit
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                print(f"Failed to write {len(rows)} metrics rows: {e}")
+                behind = False
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _aggregate(conn, limit):
+        """
+        Add up to limit stored rows that the statistics do not cover yet to them.
+
+        Returns:
+            The number of rows added
+        """
+        last_id = conn.execute("SELECT last_id FROM stats_state").fetchone()[0]
+        sql = ("SELECT id, algorithm, difficulty, time, " + ", ".join(TOTALED_METRICS) +
+               " FROM metrics WHERE id > ? ORDER BY id LIMIT ?")
+        rows = conn.execute(sql, (last_id, limit)).fetchall()
+        if not rows:
+            return 0
+
+        batch = RollingStats()
+        for _, algorithm, difficulty, time, *totals in rows:
+            batch.add(dict(zip(TOTALED_METRICS, totals), algorithm=algorithm, time=time), difficulty)
+        totaled = ", ".join(TOTALED_METRICS)
+        for (algorithm, difficulty), aggregate in batch.items():
+            conn.execute(
+                f"INSERT INTO stats_groups (algorithm, difficulty, count, timed, time_sum, zeros, {totaled}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (algorithm, difficulty) DO UPDATE SET "
+                "count = count + excluded.count, timed = timed + excluded.timed, "
+                "time_sum = time_sum + excluded.time_sum, zeros = zeros + excluded.zeros, " +
+                ", ".join(f"{metric} = {metric} + excluded.{metric}" for metric in TOTALED_METRICS),
+                (algorithm, difficulty, aggregate.count, aggregate.times.count, aggregate.time_sum,
+                 aggregate.times.zeros, *(aggregate.totals[metric] for metric in TOTALED_METRICS))
+            )
+            conn.executemany(
+                "INSERT INTO stats_buckets (algorithm, difficulty, bucket, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (algorithm, difficulty, bucket) DO UPDATE SET count = count + excluded.count",
+                [(algorithm, difficulty, bucket, count) for bucket, count in aggregate.times.buckets.items()]
+            )
+        conn.execute("UPDATE stats_state SET last_id = ?", (rows[-1][0],))
+        return len(rows)
+
+    @staticmethod
+    def _insert(conn, rows):
+        if not rows:
+            return
+        conn.executemany(
+            "INSERT INTO metrics (algorithm, difficulty, " + ", ".join(METRIC_COLUMNS) + ", extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+
+    @staticmethod
+    def _to_row(metrics, difficulty):
+        extra = {k: v for k, v in metrics.items()
+                 if k not in METRIC_COLUMNS and k not in ('algorithm', 'difficulty') and v is not None}
+        return (
+            metrics.get('algorithm'),
+            difficulty,
+            *(metrics.get(column) for column in METRIC_COLUMNS),
+            json.dumps(extra) if extra else None
+        )
+
+    @staticmethod
+    def _from_row(row):
+        row_id, algorithm, difficulty, *values, extra = row
+        result = {"id": row_id, "algorithm": algorithm}
+        result.update(zip(METRIC_COLUMNS, values))
+        if extra:
+            result.update(json.loads(extra))
+        result['difficulty'] = difficulty
+        return result
+
+    def _import_csv(self, conn, csv_file):
+        """Seed an empty database with the rows of the old results.csv."""
+        def number(value):
+            if value in (None, ''):
+                return None
+            try:
+                return int(value)
+            except ValueError:
+                try:
+                    return float(value)
+                except ValueError:
+                    return value
+
+        with open(csv_file, newline='') as f:
+            rows = []
+            for record in csv.DictReader(f):
+                difficulty = record.pop('difficulty', None) or 'Unknown'
+                metrics = {k: (v if k == 'algorithm' else number(v)) for k, v in record.items()}
+                rows.append(self._to_row(metrics, difficulty))
+        with conn:
+            self._insert(conn, rows)
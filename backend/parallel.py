@@ -0,0 +1,330 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from .budget import Budget
+from .solver import solve_sudoku_board
+
+# Seconds an algorithm may run in /compare-algorithms before it is reported as timed out
+DEFAULT_TIMEOUT = 30.0
+
+# Extra seconds granted past the timeout for solvers to notice their budget ran out
+# before they are reported as timed out
+STOP_GRACE = 1.0
+
+# Longest wait between checks of a comparison for solves that started or overran
+START_POLL_INTERVAL = 0.05
+
+# Workers are started with spawn rather than fork: the server already runs
+# threads (the metrics writer, the /generate pool fillers) when a pool starts,
+# and a process forked while another thread holds a lock can deadlock on it
+SPAWN = multiprocessing.get_context("spawn")
+
+# Queue on which timed_solve reports its start, set in every worker of a pool by init_worker
+_starts = None
+
+class StartLog:
+    """
+    The times at which a pool's workers started the solves they were given a token for.
+
+    A solve may wait in the pool's queue for a long time before a worker
+    takes it, so a comparison measures each algorithm's timeout from the
+    start its worker reports here rather than from when it was submitted.
+    The workers write to a SimpleQueue, whose put returns only once the
+    message is in the pipe, so a solve's start can be read as soon as its
+    result has arrived.
+    """
+
+    def __init__(self):
+        self.queue = SPAWN.SimpleQueue()
+        self.times = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    def token(self):
+        """A new token to pass to timed_solve."""
+        return next(self._tokens)
+
+    def started(self, token):
+        """The time.time() at which the solve of token started, or None if no worker has taken it yet."""
+        with self._lock:
+            self._drain()
+            return self.times.get(token)
+
+    def forget(self, tokens):
+        """Drop the start times of solves that have all started, once they are no longer waited for."""
+        with self._lock:
+            self._drain()
+            for token in tokens:
+                self.times.pop(token, None)
+
+    def _drain(self):
+        while not self.queue.empty():
+            key, start = self.queue.get()
+            self.times[key] = start
+
+def init_worker(starts, initializer=None):
+    """Pool worker initializer: keep the start log's queue, then run initializer."""
+    global _starts
+    _starts = starts
+    if initializer is not None:
+        initializer()
+
+_pool = None
+_start_log = None
+
+def get_pool():
+    """Return the shared solver process pool and its StartLog, creating them on first use."""
+    global _pool, _start_log
+    if _pool is None:
+        _start_log = StartLog()
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=SPAWN,
+                                    initializer=init_worker, initargs=(_start_log.queue,))
+    return _pool, _start_log
+
+def timed_solve(board, algorithm, budget=None, token=None):
+    """
+    Solve a board in a worker process, adding the CPU time it used to the metrics.
+
+    If token is given, the start of the solve is first reported to the
+    pool's StartLog under it.
+    """
+    if token is not None and _starts is not None:
+        _starts.put((token, time.time()))
+    cpu_start = time.process_time()
+    solved_board, metrics, success = solve_sudoku_board(board, algorithm, budget=budget)
+    metrics['cpu_time'] = time.process_time() - cpu_start
+    return solved_board, metrics, success
+
+def comparison_budget(timeout, budget=None):
+    """The budget of each solver in a comparison: budget with its max_time at most timeout."""
+    if budget is None:
+        return Budget(max_time=timeout)
+    if budget.max_time is None or budget.max_time > timeout:
+        return Budget(timeout, budget.max_nodes, budget.max_memory)
+    return budget
+
+def sweep_comparison(pending, start_log, timeout):
+    """
+    Drop the finished and the overdue solves from a comparison's pending ones.
+
+    A solve is overdue once it has run for timeout + STOP_GRACE seconds
+    since its worker started it; one still waiting for a worker is not.
+
+    Args:
+        pending: Dict of the future of each unfinished solve to its StartLog token
+        start_log: StartLog of the pool running the solves
+        timeout: Seconds each algorithm may run
+
+    Returns:
+        Tuple (overdue, wait): the overdue futures, and the longest time to
+        wait for the rest before sweeping again
+    """
+    now = time.time()
+    overdue = []
+    wait_time = START_POLL_INTERVAL
+    for future, token in list(pending.items()):
+        if future.done():
+            del pending[future]
+            continue
+        start = start_log.started(token)
+        if start is None:
+            continue
+        remaining = start + timeout + STOP_GRACE - now
+        if remaining <= 0:
+            overdue.append(future)
+            del pending[future]
+        else:
+            wait_time = min(wait_time, remaining)
+    return overdue, wait_time
+
+def collect_comparison(algorithms, futures, not_done, start_time):
+    """
+    Gather the results of a comparison's futures (one per algorithm, in order).
+
+    Args:
+        algorithms: Names of the algorithms compared
+        futures: The future of each algorithm's timed_solve
+        not_done: The futures that did not finish in time
+        start_time: time.perf_counter() when the comparison started
+
+    Returns:
+        The comparison dict run_comparison returns
+    """
+    outcomes = []
+    timed_out = []
+    errors = {}
+    for algorithm, future in zip(algorithms, futures):
+        if future in not_done:
+            timed_out.append(algorithm)
+        elif future.exception() is not None:
+            errors[algorithm] = str(future.exception())
+        else:
+            outcomes.append((algorithm, future.result()))
+
+    return {
+        "outcomes": outcomes,
+        "timed_out": timed_out,
+        "errors": errors,
+        "wall_time": time.perf_counter() - start_time,
+        "cpu_time": sum(metrics['cpu_time'] for _, (_, metrics, _) in outcomes)
+    }
+
+def run_comparison(board, algorithms, timeout=DEFAULT_TIMEOUT, budget=None):
+    """
+    Run several algorithms on the same board in parallel.
+
+    Args:
+        board: Square grid (9x9, or 4x4, 16x16 or 25x25) with 0s for empty cells
+        algorithms: Names of the algorithms to run
+        timeout: Seconds each algorithm may run, counted from when a worker
+            starts it; an algorithm still running STOP_GRACE seconds later is
+            reported as timed out
+        budget: Budget for every solver; its max_time is capped at timeout,
+            so solvers stop on their own and leave their worker free for the
+            next solve
+
+    Returns:
+        Dict with the per-algorithm outcomes (in the order requested), the
+        algorithms that timed out or raised, the wall-clock time of the
+        comparison and the CPU time summed over the finished solvers
+    """
+    budget = comparison_budget(timeout, budget)
+    pool, start_log = get_pool()
+    start_time = time.perf_counter()
+
+    tokens = [start_log.token() for _ in algorithms]
+    futures = [pool.submit(timed_solve, [row[:] for row in board], algorithm, budget, token)
+               for algorithm, token in zip(algorithms, tokens)]
+    pending = dict(zip(futures, tokens))
+    not_done = set()
+    while pending:
+        overdue, wait_time = sweep_comparison(pending, start_log, timeout)
+        not_done.update(overdue)
+        if pending:
+            wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
+    start_log.forget(tokens)
+    return collect_comparison(algorithms, futures, not_done, start_time)
+
+class PoolFull(Exception):
+    """Raised when a SolverPool already holds as many solves as it may queue."""
+
+class SolverPool:
+    """
+    Process pool with a bounded backlog, used by the ASGI server.
+
+    At most max_workers solves run at once and at most max_queue more wait
+    for a worker; submitting anything beyond that raises PoolFull so the
+    server can answer 429 instead of letting latency grow without bound. A
+    solve holds its place until its worker is done with it, even if nobody
+    waits for the result any more. If a worker dies (e.g. killed for running
+    out of memory) the executor is broken for good, so it is replaced by a
+    fresh one. The counters are only touched from the event loop thread.
+    Workers report the start of solves given a token to the pool's
+    start_log (see timed_solve).
+    """
+
+    def __init__(self, max_workers=None, max_queue=None, initializer=None):
+        """
+        Args:
+            max_workers: Worker processes (default: one per CPU)
+            max_queue: Solves that may wait for a worker (default: four per worker)
+            initializer: Called in every worker process as it starts
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = self.max_workers * 4 if max_queue is None else max_queue
+        self.initializer = initializer
+        self.start_log = StartLog()
+        self.executor = self._new_executor()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=SPAWN, initializer=init_worker,
+                                   initargs=(self.start_log.queue, self.initializer))
+
+    async def start(self):
+        """Start every worker now instead of on the first solves."""
+        await asyncio.gather(*self.submit_all([(os.getpid,)] * self.max_workers))
+
+    def submit(self, fn, *args):
+        """
+        Start fn(*args) in a worker process.
+
+        Returns:
+            An asyncio future of its result
+
+        Raises:
+            PoolFull: If the pool's backlog is full
+        """
+        return self.submit_all([(fn, *args)])[0]
+
+    def submit_all(self, calls):
+        """
+        Start several (fn, *args) calls, all of them or, if they do not all fit, none.
+
+        Returns:
+            The asyncio future of each call's result, in order
+
+        Raises:
+            PoolFull: If the pool's backlog cannot take every call
+        """
+        if self.in_flight + len(calls) > self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PoolFull(f"Solver queue is full ({self.max_queue} waiting).")
+        loop = asyncio.get_running_loop()
+        return [asyncio.wrap_future(self._submit(loop, call[0], call[1:]), loop=loop) for call in calls]
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in a worker process and return its result."""
+        return await self.submit(fn, *args)
+
+    def _submit(self, loop, fn, args):
+        executor = self.executor
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died since the last solve finished
+            executor = self._restart(executor)
+            future = executor.submit(fn, *args)
+        self.in_flight += 1
+        # Done callbacks run in the executor's thread; the counters belong to the loop's
+        future.add_done_callback(lambda done: loop.call_soon_threadsafe(self._finished, executor, done))
+        return future
+
+    def _finished(self, executor, future):
+        self.in_flight -= 1
+        self.completed += 1
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._restart(executor)
+
+    def _restart(self, broken):
+        """Replace a broken executor, unless that already happened; returns the current one."""
+        if self.executor is broken:
+            self.executor = self._new_executor()
+            self.restarts += 1
+            broken.shutdown(wait=False, cancel_futures=True)
+        return self.executor
+
+    def stats(self):
+        """Queue depth and worker utilization, for /health."""
+        busy = min(self.in_flight, self.max_workers)
+        return {
+            "workers": self.max_workers,
+            "busy_workers": busy,
+            "utilization": busy / self.max_workers,
+            "queue_depth": self.in_flight - busy,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "restarts": self.restarts
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,35 @@
+import cProfile
+import pstats
+
+# Functions listed in a profile summary
+DEFAULT_LIMIT = 25
+
+def profile_call(fn, *args, limit=DEFAULT_LIMIT):
+    """
+    Call fn(*args) under cProfile.
+
+    Returns:
+        Tuple (result, summary): summary holds the total profiled time and
+        the limit functions with the largest cumulative time, each with its
+        call counts, own time and cumulative time in seconds
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args)
+    stats = pstats.Stats(profiler)
+
+    functions = []
+    for (filename, line, name), (primitive_calls, calls, own_time, cumulative_time, _) in stats.stats.items():
+        functions.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "primitive_calls": primitive_calls,
+            "own_time": own_time,
+            "cumulative_time": cumulative_time
+        })
+    functions.sort(key=lambda entry: entry["cumulative_time"], reverse=True)
+
+    return result, {
+        "total_time": stats.total_tt,
+        "total_calls": stats.total_calls,
+        "functions": functions[:limit]
+    }
@@ -0,0 +1,35 @@
+import time
+
+# Default number of search nodes between progress events
+DEFAULT_EVERY = 1000
+
+# Events closer together than this many seconds are dropped
+DEFAULT_MIN_INTERVAL = 0.05
+
+class ProgressListener:
+    """
+    Receiver of a solver's progress events.
+
+    Metrics offers an event every `every` search nodes; the listener forwards
+    it to callback unless the previous one went out less than min_interval
+    seconds ago, so fast solvers cannot flood a slow consumer. Calling cancel()
+    makes the solver stop at its next event.
+    """
+
+    def __init__(self, callback, every=DEFAULT_EVERY, min_interval=DEFAULT_MIN_INTERVAL):
+        self.callback = callback
+        self.every = every
+        self.min_interval = min_interval
+        self.cancelled = False
+        self._last_emit = None
+
+    def wants_event(self):
+        """Whether an event offered now would pass the throttle."""
+        return self._last_emit is None or time.perf_counter() - self._last_emit >= self.min_interval
+
+    def emit(self, event):
+        self._last_emit = time.perf_counter()
+        self.callback(event)
+
+    def cancel(self):
+        self.cancelled = True
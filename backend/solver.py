@@ -1,31 +1,219 @@
-from .algorithms import naive, mrv, degree, combined, forward_checking, mac, random_restart, dancing_links
+import time
+from .algorithms import naive, mrv, degree, combined, forward_checking, mac, random_restart, dancing_links, propagation, vectorized_batch
+from .algorithms.board_state import geometry
+from .budget import BudgetExceeded
+from .cache import SolutionCache, canonicalize
+from .metrics import OFF
 
-def solve_sudoku_board(board, algorithm="Naive"):
+SOLVERS = {
+    "Naive": naive.solve,
+    "MRV": mrv.solve,
+    "Degree": degree.solve,
+    "Combined": combined.solve,
+    "ForwardChecking": forward_checking.solve,
+    "MAC": mac.solve,
+    "RandomRestart": random_restart.solve,
+    "DancingLinks": dancing_links.solve,
+    "Propagation": propagation.solve,
+    "VectorizedBatch": vectorized_batch.solve
+}
+
+# Algorithms that solve a whole batch at once instead of board by board
+BATCH_SOLVERS = {
+    "VectorizedBatch": vectorized_batch.solve_boards
+}
+
+# Algorithms supporting count mode (the max_solutions argument)
+COUNTING_SOLVERS = {
+    "MRV": mrv.solve,
+    "MAC": mac.solve,
+    "DancingLinks": dancing_links.solve
+}
+
+# Solutions shared by every algorithm, keyed by canonical puzzle form
+solution_cache = SolutionCache()
+
+# Tiny corpus pre-solved by warm_up(): half the cells of a solved grid are
+# blank, so every algorithm, Degree included, gets through it in well under a second
+WARM_UP_PUZZLES = (
+    "050806010702040806040103090107050602020604070604010908060407080405090301090501020",
+)
+
+def run_solver(board, algorithm, budget=None, progress=None, metrics_level=None, max_solutions=None):
+    """
+    Call a registered solver, turning a blown budget into an unsuccessful result.
+    
+    max_solutions, if given, runs one of the COUNTING_SOLVERS in count mode.
+    
+    Returns:
+        Tuple (board, metrics, success); when the budget runs out the board is
+        returned unchanged and the partial metrics carry status "budget_exceeded"
+        and the budget_reason that stopped the search
+    """
+    try:
+        if max_solutions is not None:
+            return COUNTING_SOLVERS[algorithm](board, budget, progress, metrics_level, max_solutions)
+        return SOLVERS[algorithm](board, budget, progress, metrics_level)
+    except BudgetExceeded as e:
+        e.metrics.finish()
+        metrics = e.metrics.to_dict()
+        metrics['status'] = "budget_exceeded"
+        metrics['budget_reason'] = e.reason
+        return [row[:] for row in board], metrics, False
+
+def solve_sudoku_board(board, algorithm="Naive", use_cache=False, budget=None, progress=None,
+                       metrics_level=None, max_solutions=None):
     """
     Solve a Sudoku board using the specified algorithm.
     
     Args:
-        board: 9x9 grid with 0s for empty cells
+        board: Square grid (9x9, or 4x4, 16x16 or 25x25) with 0s for empty cells
         algorithm: Algorithm to use (default is "Naive")
+        use_cache: Look the puzzle (or a symmetric variant of it) up in the
+            solution cache first, and cache the solution on a miss. Cache hits
+            skip the solver, whichever algorithm solved the puzzle before, so
+            their metrics have status "cached" and only carry the lookup time
+            and the cache counters, no search counters. Only 9x9 boards are cached.
+        budget: Optional Budget limiting the solver's time, nodes and memory
+        progress: Optional ProgressListener receiving throttled search events
+        metrics_level: Counting level of the solver's Metrics ("full", "sampled"
+            or "off"; default "full")
+        max_solutions: Count solutions instead of stopping at the first, up to
+            this many. Only algorithms in COUNTING_SOLVERS support it; the
+            metrics then carry "solutions" and "max_solutions", the board is
+            the first solution found, and the solution cache is not used.
     
     Returns:
         Tuple (solved_board, metrics, success)
-    """
-    SOLVERS = {
-        "Naive": naive.solve,
-        "MRV": mrv.solve,
-        "Degree": degree.solve,
-        "Combined": combined.solve,
-        "ForwardChecking": forward_checking.solve,
-        "MAC": mac.solve,
-        "RandomRestart": random_restart.solve,
-        "DancingLinks": dancing_links.solve
-    }
     
+    Raises:
+        ValueError: If the algorithm is unknown, or cannot count solutions
+            when max_solutions is given
+    """
     if algorithm not in SOLVERS:
         raise ValueError(f"Unknown algorithm: {algorithm}. Available algorithms: {', '.join(SOLVERS.keys())}")
     
+    if max_solutions is not None:
+        if algorithm not in COUNTING_SOLVERS:
+            raise ValueError(f"Algorithm {algorithm} cannot count solutions. "
+                             f"Counting algorithms: {', '.join(COUNTING_SOLVERS.keys())}")
+        # The cache holds one solution per puzzle, so it cannot answer a count
+        return run_solver(board, algorithm, budget, progress, metrics_level, max_solutions)
+    
+    # Canonical forms are defined for 9x9 boards only
+    if not use_cache or len(board) != 9:
+        return run_solver(board, algorithm, budget, progress, metrics_level)
+    
+    start_time = time.time()
+    key, transform = canonicalize(board)
+    cached = solution_cache.get(key)
+    if cached is not None:
+        metrics = {
+            "algorithm": algorithm,
+            "time": time.time() - start_time,
+            "status": "cached",
+            "cache": "hit",
+            **solution_cache.stats()
+        }
+        return transform.invert(cached), metrics, True
+    
     # Call the solver
-    solved_board, metrics, success = SOLVERS[algorithm](board)
+    solved_board, metrics, success = run_solver(board, algorithm, budget, progress, metrics_level)
+    
+    if success:
+        solution_cache.put(key, transform.apply(solved_board))
+    metrics['cache'] = "miss"
+    metrics.update(solution_cache.stats())
     
     return solved_board, metrics, success
+
+def solve_sudoku_batch(boards, algorithm="Naive", use_cache=False, budget=None, metrics_level=None):
+    """
+    Solve many Sudoku boards with the same algorithm in one call.
+    
+    Args:
+        boards: List of grids of one size, or a newline-delimited string of
+            81-character puzzles (see parse_puzzles)
+        algorithm: Algorithm to use (default is "Naive")
+        use_cache: Consult the solution cache for each board (see solve_sudoku_board).
+            Ignored by algorithms in BATCH_SOLVERS, which take the batch whole.
+        budget: Optional Budget applied to each board's solve separately
+        metrics_level: Counting level of the solvers' Metrics (see solve_sudoku_board)
+    
+    Returns:
+        List of (solved_board, metrics, success) tuples, in input order
+    """
+    if algorithm not in SOLVERS:
+        raise ValueError(f"Unknown algorithm: {algorithm}. Available algorithms: {', '.join(SOLVERS.keys())}")
+    
+    if isinstance(boards, str):
+        boards = parse_puzzles(boards)
+    
+    if algorithm in BATCH_SOLVERS:
+        return BATCH_SOLVERS[algorithm](boards, budget, level=metrics_level)
+    
+    return [solve_sudoku_board([row[:] for row in board], algorithm, use_cache, budget,
+                               metrics_level=metrics_level) for board in boards]
+
+def prebuild_tables(sizes=(9,)):
+    """
+    Build the lookup tables the solvers use for every board size in sizes.
+    
+    The unit and peer tables, the exact cover template and the batch masks
+    are otherwise built on the first solve of a size, inside a request.
+    
+    Raises:
+        ValueError: If a size is not supported
+    """
+    for size in sizes:
+        geometry(size)
+        dancing_links.template(size)
+        vectorized_batch.batch_tables(size)
+
+def warm_up(algorithms=None):
+    """
+    Pre-solve WARM_UP_PUZZLES with every algorithm, bypassing the cache and with metrics off.
+    
+    Runs each solver's code paths once so the first real request does not pay
+    for first-call costs such as lazily built tables.
+    
+    Returns:
+        Seconds spent
+    """
+    start = time.perf_counter()
+    boards = parse_puzzles("\n".join(WARM_UP_PUZZLES))
+    for algorithm in algorithms or SOLVERS:
+        for board in boards:
+            run_solver(board, algorithm, metrics_level=OFF)
+    return time.perf_counter() - start
+
+def parse_puzzles(text):
+    """
+    Parse newline-delimited 81-character puzzles into 9x9 grids.
+    
+    Digits 1-9 are givens; '0' or '.' mark empty cells. Blank lines are skipped.
+    
+    Raises:
+        ValueError: If a line is not a valid 81-character puzzle
+    """
+    boards = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) != 81:
+            raise ValueError(f"Line {line_number}: puzzle must have 81 characters, got {len(line)}.")
+        cells = []
+        for ch in line:
+            if ch == '.':
+                cells.append(0)
+            elif '0' <= ch <= '9':
+                cells.append(ord(ch) - 48)
+            else:
+                raise ValueError(f"Line {line_number}: invalid character {ch!r}.")
+        boards.append([cells[r * 9:r * 9 + 9] for r in range(9)])
+    return boards
+
+def format_puzzle(board):
+    """Encode a 9x9 grid as an 81-character string with '0' for empty cells."""
+    return ''.join(str(cell) for row in board for cell in row)
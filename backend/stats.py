@@ -0,0 +1,135 @@
+"""
+Rolling per-(algorithm, difficulty) solver statistics for /stats.
+
+Every stored metrics row is added to its group's aggregate: a row count,
+the solve time's sum and a quantile sketch, and running totals of the
+search counters. The metrics store keeps the aggregates next to the rows
+(see SQLiteMetricsStore), so answering /stats reads them and its cost
+depends on the number of groups, not on the number of rows behind them.
+
+The quantiles come from a DDSketch-style sketch: values are counted in
+logarithmic buckets whose width is a fixed fraction of their value, so any
+reported quantile is within RELATIVE_ACCURACY of a value of the right rank,
+and the sketch's size only grows with the range of the values (a few
+hundred buckets from a microsecond to an hour).
+"""
+import math
+import threading
+
+# Relative error bound of the reported quantiles
+RELATIVE_ACCURACY = 0.01
+
+# Quantiles of the solve time reported per group, with their response keys
+QUANTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+# Search counters whose totals are kept per group
+TOTALED_METRICS = ("nodes", "backtracks", "prunes")
+
+
+class QuantileSketch:
+    """Streaming quantile estimate of non-negative values in logarithmic buckets."""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        # Bucket i counts the values in (gamma^(i-1), gamma^i]; zeros are kept apart
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def quantile(self, q):
+        """The estimated q-quantile (0 <= q <= 1), or None if nothing was added."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Midpoint of the bucket in relative terms, within the accuracy of any value in it
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class Aggregate:
+    """Count, solve time mean and quantiles, and counter totals of one (algorithm, difficulty) group."""
+
+    def __init__(self):
+        self.count = 0
+        self.time_sum = 0.0
+        self.times = QuantileSketch()
+        self.totals = dict.fromkeys(TOTALED_METRICS, 0)
+
+    def add(self, metrics):
+        self.count += 1
+        time = metrics.get("time")
+        if time is not None:
+            self.time_sum += time
+            self.times.add(time)
+        for metric in TOTALED_METRICS:
+            # Counters are None in rows solved with metrics off
+            value = metrics.get(metric)
+            if value is not None:
+                self.totals[metric] += value
+
+    def to_dict(self):
+        timed = self.times.count
+        time = {"mean": self.time_sum / timed if timed else None}
+        for key, q in QUANTILES:
+            time[key] = self.times.quantile(q)
+        return {"count": self.count, "time": time, "totals": dict(self.totals)}
+
+
+class RollingStats:
+    """Thread-safe Aggregates keyed by (algorithm, difficulty)."""
+
+    def __init__(self):
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def add(self, metrics, difficulty):
+        with self._lock:
+            self._group(metrics.get("algorithm"), difficulty).add(metrics)
+
+    def aggregate(self, algorithm, difficulty):
+        """The Aggregate of a group, created empty if it has no rows yet."""
+        with self._lock:
+            return self._group(algorithm, difficulty)
+
+    def items(self):
+        """List of ((algorithm, difficulty), Aggregate) pairs of every group."""
+        with self._lock:
+            return list(self._groups.items())
+
+    def _group(self, algorithm, difficulty):
+        aggregate = self._groups.get((algorithm, difficulty))
+        if aggregate is None:
+            aggregate = self._groups[(algorithm, difficulty)] = Aggregate()
+        return aggregate
+
+    def snapshot(self, algorithm=None, difficulty=None):
+        """
+        The aggregates of every group, optionally only those of one algorithm and/or difficulty.
+
+        Returns:
+            List of dicts with the algorithm, the difficulty, the row count, the
+            solve time's mean, p50, p95 and p99 in seconds, and the totals of
+            TOTALED_METRICS, sorted by algorithm and difficulty
+        """
+        with self._lock:
+            groups = [
+                {"algorithm": key[0], "difficulty": key[1], **aggregate.to_dict()}
+                for key, aggregate in self._groups.items()
+                if (algorithm is None or key[0] == algorithm) and (difficulty is None or key[1] == difficulty)
+            ]
+        return sorted(groups, key=lambda group: (str(group["algorithm"]), str(group["difficulty"])))
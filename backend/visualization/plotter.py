@@ -1,71 +1,140 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import csv
 import os
+import threading
+import matplotlib
+matplotlib.use('Agg')  # Render to files only; set before importing plt
+import matplotlib.pyplot as plt
+
+# Metrics plot_all_metrics draws by default
+STANDARD_METRICS = ['time', 'nodes', 'backtracks', 'prunes', 'checks', 'assignments']
+
+# Difficulty labels in the order they are drawn along the x axis; any other label follows them
+DIFFICULTY_ORDER = ['Easy', 'Medium', 'Hard', 'Expert']
+
+# Axis label of metrics whose name alone does not give the unit
+LABELS = {'time': 'Time (seconds)'}
 
-def plot_metric(df, metric, output_dir="results"):
+# Fingerprint of the summaries each plot file was last rendered from
+_rendered = {}
+
+# pyplot keeps global state, so renders from concurrent requests take turns
+_render_lock = threading.Lock()
+
+def difficulty_key(difficulty):
+    if difficulty in DIFFICULTY_ORDER:
+        return (DIFFICULTY_ORDER.index(difficulty), '')
+    return (len(DIFFICULTY_ORDER), str(difficulty))
+
+def plot_metric(summaries, metric, output_dir="results"):
     """
-    Create a plot of the given metric versus difficulty.
+    Create a plot of the mean of the given metric versus difficulty.
     
     Args:
-        df: Pandas DataFrame with the metrics data
+        summaries: Per-(algorithm, difficulty) dicts with the mean of each metric
+            (see summarize_csv and MetricsStore.summarize)
         metric: Name of the metric to plot (e.g., 'time', 'nodes')
         output_dir: Directory to save the plot
     
     Returns:
         Path to the saved plot file
     """
-    plt.figure(figsize=(10, 6))
-    
-    for solver in df['algorithm'].unique():
-        sub = df[df['algorithm'] == solver]
-        plt.plot(sub['difficulty'], sub[metric], marker='o', label=solver)
+    series = {}
+    for summary in summaries:
+        if summary.get(metric) is not None:
+            series.setdefault(summary['algorithm'], []).append((summary['difficulty'], summary[metric]))
+    difficulties = sorted({difficulty for points in series.values() for difficulty, _ in points},
+                          key=difficulty_key)
     
-    plt.xlabel('Difficulty')
-    plt.ylabel(metric.capitalize())
-    plt.title(f'{metric.capitalize()} vs Difficulty')
-    plt.legend()
-    
-    # Ensure output directory exists
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    # Save the plot
-    filename = f"{metric}_vs_difficulty.png"
-    filepath = os.path.join(output_dir, filename)
-    plt.savefig(filepath)
-    plt.close()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    try:
+        for solver, points in series.items():
+            points.sort(key=lambda point: difficulty_key(point[0]))
+            ax.plot([difficulties.index(difficulty) for difficulty, _ in points],
+                    [value for _, value in points], marker='o', label=solver)
+        
+        ax.set_xticks(range(len(difficulties)))
+        ax.set_xticklabels(difficulties)
+        ax.set_xlabel('Difficulty')
+        ax.set_ylabel(LABELS.get(metric, f'Mean {metric}'))
+        ax.set_title(f'{metric.capitalize()} vs Difficulty')
+        if series:
+            ax.legend()
+        
+        # Ensure output directory exists
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Save the plot
+        filename = f"{metric}_vs_difficulty.png"
+        filepath = os.path.join(output_dir, filename)
+        fig.savefig(filepath)
+    finally:
+        # Release the figure so long-running servers do not accumulate them
+        plt.close(fig)
     
     return filepath
 
-def plot_all_metrics(csv_file="results/results.csv", output_dir="results"):
+def plot_all_metrics(summaries, output_dir="results", metrics=STANDARD_METRICS, fingerprint=None):
     """
-    Create plots for all key metrics in the results CSV.
+    Create plots for the given metrics, skipping the ones already rendered from the same data.
     
     Args:
-        csv_file: Path to the results CSV file
+        summaries: Per-(algorithm, difficulty) dicts with the mean of each metric,
+            or a function returning them, called only if a plot has to be redrawn
         output_dir: Directory to save the plots
+        metrics: Metrics to plot; ones no summary has a value for are left out
+            when drawing (a cached plot is kept)
+        fingerprint: Identifies the data behind summaries (e.g. MetricsStore.fingerprint()).
+            A plot whose file was last rendered with an equal fingerprint is
+            reused as is; None always renders.
     
     Returns:
-        List of paths to the saved plot files
+        Tuple (paths, rendered): the paths of the plot files and how many were redrawn
+    """
+    paths = []
+    rendered = 0
+    with _render_lock:
+        for metric in metrics:
+            filepath = os.path.join(output_dir, f"{metric}_vs_difficulty.png")
+            if fingerprint is None or _rendered.get(filepath) != fingerprint or not os.path.exists(filepath):
+                if callable(summaries):
+                    summaries = summaries()
+                if not any(summary.get(metric) is not None for summary in summaries):
+                    continue
+                plot_metric(summaries, metric, output_dir)
+                _rendered[filepath] = fingerprint
+                rendered += 1
+            paths.append(filepath)
+    return paths, rendered
+
+def summarize_csv(csv_file="results/results.csv"):
+    """
+    Aggregate a results CSV per (algorithm, difficulty) into the summaries plot_all_metrics takes.
+    
+    Raises:
+        FileNotFoundError: If the CSV file does not exist
     """
     if not os.path.exists(csv_file):
         raise FileNotFoundError(f"Results file not found: {csv_file}")
     
-    df = pd.read_csv(csv_file)
-    
-    # Plot standard metrics
-    plots = []
-    for metric in ['time', 'nodes', 'backtracks', 'prunes', 'checks', 'assignments']:
-        if metric in df.columns:
-            plot_path = plot_metric(df, metric, output_dir)
-            plots.append(plot_path)
+    groups = {}
+    with open(csv_file, newline='') as f:
+        for record in csv.DictReader(f):
+            group = groups.setdefault((record.get('algorithm'), record.get('difficulty') or 'Unknown'), [])
+            group.append(record)
     
-    return plots
+    summaries = []
+    for (algorithm, difficulty), records in sorted(groups.items(), key=lambda item: str(item[0])):
+        summary = {'algorithm': algorithm, 'difficulty': difficulty, 'count': len(records)}
+        for metric in STANDARD_METRICS:
+            values = [float(record[metric]) for record in records if record.get(metric) not in (None, '')]
+            summary[metric] = sum(values) / len(values) if values else None
+        summaries.append(summary)
+    return summaries
 
 if __name__ == "__main__":
     # This allows running the script directly to generate plots
     try:
-        plots = plot_all_metrics()
+        plots, _ = plot_all_metrics(summarize_csv())
         print(f"Generated plots: {plots}")
     except Exception as e:
         print(f"Error generating plots: {e}")
@@ -0,0 +1,90 @@
+"""
+Compact wire formats for 9x9 puzzles on the solve endpoints.
+
+Besides nested JSON lists, a board can be sent as the request body with
+one of these Content-Types, and the solution comes back in the same form:
+
+- text/x-sudoku: 81 characters in row-major order, digits 1-9 for givens
+  and '0' or '.' for empty cells (surrounding whitespace is ignored).
+- application/x-sudoku-packed: 41 bytes, two cells per byte with the
+  first cell in the high nibble; the low nibble of the last byte is 0.
+
+Both forms are validated while still encoded, with bytes.translate against
+tables of the valid bytes, so a malformed body is rejected without
+building a Python object per cell.
+"""
+
+TEXT_TYPE = "text/x-sudoku"
+PACKED_TYPE = "application/x-sudoku-packed"
+COMPACT_TYPES = (TEXT_TYPE, PACKED_TYPE)
+
+CELLS = 81
+PACKED_SIZE = (CELLS + 1) // 2
+
+# Response header carrying the metrics of a solve answered in a compact form
+METRICS_HEADER = "X-Sudoku-Metrics"
+
+# Valid text characters, and the cell value of each
+TEXT_CHARS = b"0123456789."
+TEXT_TO_CELL = bytes.maketrans(TEXT_CHARS, bytes(range(10)) + b"\0")
+CELL_TO_TEXT = bytes.maketrans(bytes(range(10)), b"0123456789")
+
+# Packed bytes whose two nibbles are both cell values, and the nibbles of every byte
+PACKED_BYTES = bytes(byte for byte in range(256) if byte >> 4 <= 9 and byte & 15 <= 9)
+HIGH_NIBBLE = bytes(byte >> 4 for byte in range(256))
+LOW_NIBBLE = bytes(byte & 15 for byte in range(256))
+
+def compact_type(content_type):
+    """The compact format named by a Content-Type header, or None for anything else (JSON)."""
+    if not content_type:
+        return None
+    mimetype = content_type.split(";", 1)[0].strip().lower()
+    return mimetype if mimetype in COMPACT_TYPES else None
+
+def validate_text(data):
+    """Return an error message if data is not an 81-character puzzle, else None."""
+    if len(data) != CELLS:
+        return f"Text puzzle must have {CELLS} characters, got {len(data)}."
+    if data.translate(None, TEXT_CHARS):
+        return "Text puzzle characters must be digits 0-9 or '.'."
+    return None
+
+def validate_packed(data):
+    """Return an error message if data is not a 41-byte packed puzzle, else None."""
+    if len(data) != PACKED_SIZE:
+        return f"Packed puzzle must have {PACKED_SIZE} bytes, got {len(data)}."
+    if data.translate(None, PACKED_BYTES):
+        return "Packed puzzle cells must be nibbles between 0 and 9."
+    if data[-1] & 15:
+        return "The last nibble of a packed puzzle must be 0."
+    return None
+
+def decode_board(content_type, data):
+    """
+    Validate a compact body and decode it into a 9x9 board.
+
+    Raises:
+        ValueError: If the body is not a valid puzzle in that format
+    """
+    if content_type == TEXT_TYPE:
+        data = data.strip()
+        error = validate_text(data)
+        if error:
+            raise ValueError(error)
+        cells = data.translate(TEXT_TO_CELL)
+    else:
+        error = validate_packed(data)
+        if error:
+            raise ValueError(error)
+        cells = bytearray(2 * PACKED_SIZE)
+        cells[0::2] = data.translate(HIGH_NIBBLE)
+        cells[1::2] = data.translate(LOW_NIBBLE)
+    return [list(cells[r * 9:r * 9 + 9]) for r in range(9)]
+
+def encode_board(content_type, board):
+    """Encode a 9x9 board in a compact format."""
+    cells = bytes(cell for row in board for cell in row)
+    if content_type == TEXT_TYPE:
+        return cells.translate(CELL_TO_TEXT)
+    cells += b"\0"
+    return bytes(high << 4 | low for high, low in zip(cells[0::2], cells[1::2]))
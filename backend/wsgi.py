@@ -0,0 +1,16 @@
+"""
+WSGI serving mode.
+
+    gunicorn backend.wsgi:app --bind 0.0.0.0:5001
+
+Each worker prebuilds the solver tables (and runs the warm-up with
+SOLVER_WARMUP=1, see app.prepare_solvers) and starts filling the /generate
+puzzle pools as it imports this module. Gunicorn imports it after forking
+its workers unless --preload is given, so the pool's refill thread belongs
+to the worker that serves from it; do not combine this module with
+--preload.
+"""
+from .app import app, prepare_solvers, puzzle_pool
+
+prepare_solvers()
+puzzle_pool.start()
@@ -0,0 +1,33 @@
+import random
+import time
+
+import pytest
+
+from backend.algorithms import dancing_links
+from backend.bench.scaling import random_puzzle
+from backend.budget import Budget
+from backend.solver import SOLVERS, run_solver
+
+# Seconds a solve may run past max_time: one check period plus the longest stretch of work between checks
+TOLERANCE = 0.25
+
+MAX_TIME = 0.5
+
+
+@pytest.fixture(scope="module")
+def board_25x25():
+    # Build the 25x25 exact cover template up front, as prebuild_tables() does at server startup
+    dancing_links.template(25)
+    return random_puzzle(25, random.Random(0), 0.6)
+
+
+@pytest.mark.parametrize("algorithm", list(SOLVERS))
+def test_25x25_solve_stops_near_max_time(board_25x25, algorithm):
+    start = time.perf_counter()
+    _, metrics, success = run_solver(board_25x25, algorithm, Budget(max_time=MAX_TIME))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < MAX_TIME + TOLERANCE
+    if not success:
+        assert metrics["status"] == "budget_exceeded"
+        assert metrics["budget_reason"] == "max_time"
@@ -0,0 +1,11 @@
+import pytest
+
+from backend.bench.corpus import available_corpora, load_corpus
+
+
+@pytest.mark.parametrize("name", available_corpora())
+def test_bundled_corpora_have_no_repeated_puzzles(name):
+    boards = [tuple(cell for row in board for cell in row) for board in load_corpus(name)]
+
+    assert boards
+    assert len(set(boards)) == len(boards)
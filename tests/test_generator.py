@@ -0,0 +1,24 @@
+import random
+
+import pytest
+
+from backend import app as app_module
+from backend.generator import DIFFICULTIES, PuzzlePool, generate_puzzle, grade_puzzle, has_unique_solution
+
+
+@pytest.mark.parametrize("difficulty", DIFFICULTIES)
+def test_every_difficulty_is_reachable(difficulty):
+    puzzle = generate_puzzle(difficulty, random.Random(0))
+
+    assert puzzle["difficulty"] == difficulty
+    assert grade_puzzle(puzzle["puzzle"])[0] == difficulty
+    assert has_unique_solution(puzzle["puzzle"])
+
+
+def test_generate_answers_503_while_the_pool_is_empty(monkeypatch):
+    monkeypatch.setattr(app_module, "puzzle_pool", PuzzlePool())
+    response = app_module.app.test_client().get("/generate?difficulty=Hard")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(app_module.GENERATE_RETRY_AFTER)
+    assert response.get_json()["pool_sizes"] == dict.fromkeys(DIFFICULTIES, 0)
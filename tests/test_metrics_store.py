@@ -0,0 +1,55 @@
+import random
+import sqlite3
+import time
+
+import pytest
+
+from backend.metrics_store import SQLiteMetricsStore
+from backend.stats import RollingStats
+
+
+def add_rows(stores, count, seed=0):
+    """Add random rows, alternating between stores, and return the statistics they should give."""
+    expected = RollingStats()
+    rng = random.Random(seed)
+    for i in range(count):
+        metrics = {"algorithm": rng.choice(["MRV", "DancingLinks"]), "time": rng.random() / 10,
+                   "nodes": rng.randint(1, 100), "backtracks": rng.randint(0, 10), "prunes": None}
+        difficulty = rng.choice(["Easy", "Hard"])
+        stores[i % len(stores)].add(metrics, difficulty)
+        expected.add(metrics, difficulty)
+    for store in stores:
+        store.flush()
+    return expected.snapshot()
+
+
+def assert_same_stats(actual, expected):
+    assert [(g["algorithm"], g["difficulty"], g["count"], g["totals"]) for g in actual] == \
+        [(g["algorithm"], g["difficulty"], g["count"], g["totals"]) for g in expected]
+    for got, want in zip(actual, expected):
+        assert got["time"] == pytest.approx(want["time"])
+
+
+def test_stores_sharing_a_database_report_the_same_stats(tmp_path):
+    path = str(tmp_path / "metrics.db")
+    stores = [SQLiteMetricsStore(path), SQLiteMetricsStore(path)]
+    expected = add_rows(stores, 3000)
+
+    for store in stores:
+        assert_same_stats(store.stats(), expected)
+    assert_same_stats(stores[0].stats(algorithm="MRV", difficulty="Hard"),
+                      [g for g in expected if g["algorithm"] == "MRV" and g["difficulty"] == "Hard"])
+
+
+def test_rows_stored_before_the_aggregates_are_added_in_the_background(tmp_path):
+    path = str(tmp_path / "metrics.db")
+    expected = add_rows([SQLiteMetricsStore(path)], 3000)
+    conn = sqlite3.connect(path)
+    conn.executescript("DROP TABLE stats_groups; DROP TABLE stats_buckets; DROP TABLE stats_state;")
+    conn.close()
+
+    store = SQLiteMetricsStore(path)
+    deadline = time.monotonic() + 10
+    while sum(group["count"] for group in store.stats()) < 3000 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert_same_stats(store.stats(), expected)
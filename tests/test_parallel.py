@@ -0,0 +1,23 @@
+import pytest
+
+from backend import parallel
+from backend.bench.corpus import load_corpus
+
+
+@pytest.fixture
+def two_workers(monkeypatch):
+    monkeypatch.setattr(parallel, "_pool", None)
+    monkeypatch.setattr(parallel.os, "cpu_count", lambda: 2)
+    yield
+    pool, _ = parallel.get_pool()
+    pool.shutdown()
+
+
+def test_queued_algorithms_get_their_own_timeout(two_workers):
+    board = load_corpus("17-clue")[0]
+    # Each run uses its whole budget, so six of them take three timeouts on two workers
+    comparison = parallel.run_comparison(board, ["Naive"] * 6, timeout=0.5)
+
+    assert comparison["timed_out"] == []
+    assert [metrics["status"] for _, (_, metrics, _) in comparison["outcomes"]] == ["budget_exceeded"] * 6
+    assert comparison["wall_time"] > 1.5
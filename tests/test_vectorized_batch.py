@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from backend.algorithms import vectorized_batch
+from backend.bench.corpus import load_corpus
+from backend.budget import Budget
+
+
+@pytest.fixture(scope="module")
+def puzzles():
+    return np.array([[cell for row in board for cell in row] for board in load_corpus("hard")], dtype=np.uint8)
+
+
+def test_chunked_propagation_matches_one_chunk(puzzles, monkeypatch):
+    whole, whole_metrics, whole_success = vectorized_batch.solve_batch(puzzles)
+    monkeypatch.setattr(vectorized_batch, "CHUNK_SIZE", 3)
+    chunked, chunked_metrics, chunked_success = vectorized_batch.solve_batch(puzzles)
+
+    assert (chunked == whole).all()
+    assert (chunked_success == whole_success).all()
+    assert [m["vector_rounds"] for m in chunked_metrics] == [m["vector_rounds"] for m in whole_metrics]
+
+
+def test_budget_stops_between_chunks(puzzles, monkeypatch):
+    monkeypatch.setattr(vectorized_batch, "CHUNK_SIZE", 1)
+    monkeypatch.setattr(vectorized_batch, "overrun", lambda budget, start_time, start_memory: "max_time")
+    _, metrics, success = vectorized_batch.solve_batch(puzzles, Budget(max_time=1))
+
+    # The first chunk always runs; every later one is skipped
+    assert metrics[0].get("status") != "budget_exceeded"
+    assert not success[1:].any()
+    assert all(m["status"] == "budget_exceeded" and m["budget_reason"] == "max_time" for m in metrics[1:])
+    assert all(m["vector_rounds"] == 0 for m in metrics[1:])